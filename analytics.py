@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+Tozalash va login analitikasi (/api/analytics)
+Grafiklar xom jadvallarni (cleanup_logs, login_attempts) skanerlamaydi -
+yig'indi jadvallaridan o'qiladi:
+- cleanup_weekly - hafta bo'yicha tozalashlar soni, xatoliklar va o'chirilganlar
+  (bino bo'yicha tozalashda bitta ishga tushirish - bitta run, cleanup_runs orqali)
+- login_daily - kun va IP bo'yicha muvaffaqiyatli/xato kirishlar
+
+Yig'indilar yozuv paytida, o'sha tranzaksiya ichida oshiriladi: CleanupLog
+yakunlanganda (status 'running' dan boshqasiga o'tganda) va LoginAttempt
+yozilganda (ORM yoki login_log.py dagi bulk INSERT). Retention xom
+yozuvlarni o'chirsa ham yig'indilar saqlanib qoladi. Kun va hafta
+CLEANUP_TIMEZONE bo'yicha.
+
+Mavjud tarixdan yig'indilarni qayta hisoblash (bir martalik):
+    python analytics.py
+"""
+
+import sys
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from flask import current_app
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import get_history
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WEEKS = 12
+DEFAULT_DAYS = 30
+MAX_WEEKS = 260
+MAX_DAYS = 366
+TOP_IPS = 10
+
+# Backfill yozuvlarini bitta INSERT da yuborish hajmi
+INSERT_CHUNK = 1000
+
+
+# ============================================
+# VAQT BO'LAKLARI
+# ============================================
+def local_day(moment):
+    """UTC (naive) vaqt -> CLEANUP_TIMEZONE dagi sana"""
+    from scheduler import _get_timezone
+
+    tz = _get_timezone(current_app.config.get('CLEANUP_TIMEZONE', 'Europe/Moscow'))
+    return moment.replace(tzinfo=timezone.utc).astimezone(tz).date()
+
+
+def week_start(day):
+    """Sana -> o'sha haftaning dushanbasi"""
+    return day - timedelta(days=day.weekday())
+
+
+# ============================================
+# YIG'INDILARNI OSHIRISH
+# ============================================
+def _upsert_insert(conn):
+    """ON CONFLICT qo'llab-quvvatlovchi insert() (SQLite/PostgreSQL), boshqalarda None"""
+    if conn.dialect.name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+        return insert
+    if conn.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+        return insert
+    return None
+
+
+def _increment(conn, model, keys, rows):
+    """Kalit bo'yicha qator bo'lsa hisoblagichlarga qo'shish, bo'lmasa yaratish.
+    rows - {kalit: qiymat, hisoblagich: qo'shiladigan son} lug'atlari"""
+    if not rows:
+        return
+    table = model.__table__
+    counters = [name for name in rows[0] if name not in keys]
+    # Parallel tranzaksiyalar qatorlarni bir xil tartibda qulflasin (deadlock bo'lmasin)
+    rows = sorted(rows, key=lambda row: tuple(row[key] for key in keys))
+
+    insert = _upsert_insert(conn)
+    if insert is not None:
+        statement = insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c[key] for key in keys],
+            set_={name: table.c[name] + statement.excluded[name] for name in counters}
+        )
+        conn.execute(statement, rows)
+        return
+
+    for row in rows:
+        updated = conn.execute(
+            table.update()
+            .where(*[table.c[key] == row[key] for key in keys])
+            .values({name: table.c[name] + row[name] for name in counters})
+        ).rowcount
+        if not updated:
+            conn.execute(table.insert(), row)
+
+
+def record_logins(conn, attempts):
+    """Login urinishlarini login_daily ga qo'shish.
+    attempts - attempt_time, ip_address, successful kalitli lug'atlar"""
+    from models import LoginDaily
+
+    totals = defaultdict(lambda: [0, 0])
+    for attempt in attempts:
+        counts = totals[(local_day(attempt['attempt_time']), attempt['ip_address'])]
+        counts[0 if attempt['successful'] else 1] += 1
+
+    _increment(conn, LoginDaily, ('day', 'ip_address'), [
+        {'day': day, 'ip_address': ip_address, 'success_count': success, 'failure_count': failure}
+        for (day, ip_address), (success, failure) in totals.items()
+    ])
+
+
+def _claim_run(conn, run_id, week):
+    """run_id birinchi marta ko'rilsa True (cleanup_runs ga yoziladi).
+    Parallel binolar tranzaksiyalarida ham bittasigina True oladi (unique run_id)."""
+    from models import CleanupRun
+
+    table = CleanupRun.__table__
+    insert = _upsert_insert(conn)
+    if insert is not None:
+        statement = insert(table).values(run_id=run_id, week=week).on_conflict_do_nothing(
+            index_elements=[table.c.run_id]
+        )
+        return conn.execute(statement).rowcount == 1
+
+    if conn.execute(select(table.c.run_id).where(table.c.run_id == run_id)).first() is not None:
+        return False
+    conn.execute(table.insert().values(run_id=run_id, week=week))
+    return True
+
+
+def record_cleanups(conn, logs):
+    """Yakunlangan tozalashlarni cleanup_weekly ga qo'shish.
+    logs - cleanup_time, status, records_deleted, run_id kalitli lug'atlar.
+    run_id si bor loglardan faqat birinchisi runs ga qo'shiladi."""
+    from models import CleanupWeekly
+
+    for log in logs:
+        log['new_run'] = log['run_id'] is None or _claim_run(
+            conn, log['run_id'], week_start(local_day(log['cleanup_time']))
+        )
+    _increment(conn, CleanupWeekly, ('week',), _weekly_rows(logs))
+
+
+def _weekly_rows(logs):
+    """logs - new_run kaliti bilan (shu log yangi ishga tushirishmi)"""
+    totals = defaultdict(lambda: [0, 0, 0])
+    for log in logs:
+        counts = totals[week_start(local_day(log['cleanup_time']))]
+        counts[0] += 1 if log['new_run'] else 0
+        counts[1] += 1 if log['status'] == 'error' else 0
+        counts[2] += log['records_deleted'] or 0
+
+    return [
+        {'week': week, 'runs': runs, 'errors': errors, 'records_deleted': deleted}
+        for week, (runs, errors, deleted) in totals.items()
+    ]
+
+
+def _finished_now(obj, is_new):
+    """CleanupLog shu flush'da yakunlandimi (status 'running' dan boshqasiga o'tdi)"""
+    if obj.status in (None, 'running'):
+        return False
+    return is_new or bool(get_history(obj, 'status').added)
+
+
+@event.listens_for(Session, 'after_flush')
+def _record_on_flush(db_session, flush_context):
+    from models import db, CleanupLog, LoginAttempt
+
+    attempts = [
+        {'attempt_time': obj.attempt_time, 'ip_address': obj.ip_address, 'successful': obj.successful}
+        for obj in db_session.new if isinstance(obj, LoginAttempt)
+    ]
+    logs = [
+        {
+            'cleanup_time': obj.cleanup_time,
+            'status': obj.status,
+            'records_deleted': obj.records_deleted,
+            'run_id': obj.run_id
+        }
+        for obj in list(db_session.new) + list(db_session.dirty)
+        if isinstance(obj, CleanupLog) and _finished_now(obj, obj in db_session.new)
+    ]
+    if not attempts and not logs:
+        return
+
+    # Yig'indilar har doim asosiy bazada (replikaga yo'naltirilmasin)
+    conn = db_session.connection(bind_arguments={'bind': db.engine})
+    record_logins(conn, attempts)
+    record_cleanups(conn, logs)
+
+
+# ============================================
+# O'QISH (/api/analytics)
+# ============================================
+def weekly_cleanups(weeks=DEFAULT_WEEKS):
+    """Oxirgi weeks hafta - bo'sh haftalar nol bilan"""
+    from models import CleanupWeekly
+
+    current = week_start(local_day(datetime.utcnow()))
+    since = current - timedelta(weeks=weeks - 1)
+    rows = {
+        row.week: row for row in
+        CleanupWeekly.query.filter(CleanupWeekly.week >= since).order_by(CleanupWeekly.week)
+    }
+
+    series = []
+    for offset in range(weeks):
+        week = since + timedelta(weeks=offset)
+        row = rows.get(week)
+        series.append({
+            'week': week.isoformat(),
+            'runs': row.runs if row else 0,
+            'errors': row.errors if row else 0,
+            'deleted': row.records_deleted if row else 0
+        })
+    return series
+
+
+def daily_logins(days=DEFAULT_DAYS, ip_address=None):
+    """Oxirgi days kun (barcha IP yoki bittasi) - bo'sh kunlar nol bilan"""
+    from models import db, LoginDaily
+
+    today = local_day(datetime.utcnow())
+    since = today - timedelta(days=days - 1)
+    query = db.session.query(
+        LoginDaily.day,
+        db.func.sum(LoginDaily.success_count),
+        db.func.sum(LoginDaily.failure_count)
+    ).filter(LoginDaily.day >= since)
+    if ip_address:
+        query = query.filter(LoginDaily.ip_address == ip_address)
+    rows = {day: (success, failure) for day, success, failure in query.group_by(LoginDaily.day)}
+
+    series = []
+    for offset in range(days):
+        day = since + timedelta(days=offset)
+        success, failure = rows.get(day, (0, 0))
+        series.append({'day': day.isoformat(), 'success': int(success or 0), 'failure': int(failure or 0)})
+    return series
+
+
+def top_failed_ips(days=DEFAULT_DAYS, limit=TOP_IPS):
+    """Oxirgi days kunda eng ko'p xato kirish bo'lgan IP lar"""
+    from models import db, LoginDaily
+
+    since = local_day(datetime.utcnow()) - timedelta(days=days - 1)
+    failures = db.func.sum(LoginDaily.failure_count).label('failures')
+    rows = db.session.query(LoginDaily.ip_address, failures).filter(
+        LoginDaily.day >= since,
+        LoginDaily.failure_count > 0
+    ).group_by(LoginDaily.ip_address).order_by(failures.desc()).limit(limit)
+    return [{'ip_address': ip_address, 'failures': int(count)} for ip_address, count in rows]
+
+
+def summary(weeks=DEFAULT_WEEKS, days=DEFAULT_DAYS, ip_address=None):
+    return {
+        'timezone': current_app.config.get('CLEANUP_TIMEZONE', 'Europe/Moscow'),
+        'cleanup_weekly': weekly_cleanups(weeks),
+        'logins_daily': daily_logins(days, ip_address),
+        'top_failed_ips': top_failed_ips(days),
+        'ip_address': ip_address
+    }
+
+
+# ============================================
+# BACKFILL (bir martalik)
+# ============================================
+def backfill():
+    """Yig'indilarni mavjud cleanup_logs, login_attempts va login_attempts_hourly
+    dan qaytadan hisoblash (bitta tranzaksiyada). Ilova konteksti ichida."""
+    from models import db, CleanupLog, CleanupRun, LoginAttempt, LoginAttemptHourly, CleanupWeekly, LoginDaily
+    from retention import _hour_bucket, _as_datetime
+
+    with db.engine.begin() as conn:
+        # 1. Haftalik tozalashlar: run_id bo'yicha birinchi (eng eski) log run hisoblanadi
+        logs = []
+        run_weeks = {}
+        for row in conn.execute(
+            db.select(CleanupLog.cleanup_time, CleanupLog.status, CleanupLog.records_deleted, CleanupLog.run_id)
+            .where(CleanupLog.status != 'running')
+            .order_by(CleanupLog.cleanup_time, CleanupLog.id)
+        ):
+            log = dict(row._mapping)
+            log['new_run'] = log['run_id'] is None or log['run_id'] not in run_weeks
+            if log['run_id'] is not None and log['new_run']:
+                run_weeks[log['run_id']] = week_start(local_day(log['cleanup_time']))
+            logs.append(log)
+        weekly_rows = _weekly_rows(logs)
+        run_rows = [{'run_id': run_id, 'week': week} for run_id, week in run_weeks.items()]
+
+        # 2. Kunlik loginlar: xom yozuvlar soat bo'yicha, eskilari soatlik jadvaldan
+        totals = defaultdict(lambda: [0, 0])
+        bucket = _hour_bucket(db, LoginAttempt.attempt_time)
+        raw = conn.execute(
+            db.select(
+                bucket,
+                LoginAttempt.ip_address,
+                db.func.sum(db.case((LoginAttempt.successful == True, 1), else_=0)),
+                db.func.sum(db.case((LoginAttempt.successful == True, 0), else_=1))
+            ).group_by(bucket, LoginAttempt.ip_address)
+        )
+        hourly = conn.execute(
+            db.select(
+                LoginAttemptHourly.hour,
+                LoginAttemptHourly.ip_address,
+                db.func.sum(LoginAttemptHourly.success_count),
+                db.func.sum(LoginAttemptHourly.failure_count)
+            ).group_by(LoginAttemptHourly.hour, LoginAttemptHourly.ip_address)
+        )
+        for rows in (raw, hourly):
+            for hour, ip_address, success, failure in rows:
+                counts = totals[(local_day(_as_datetime(hour)), ip_address)]
+                counts[0] += int(success or 0)
+                counts[1] += int(failure or 0)
+        daily_rows = [
+            {'day': day, 'ip_address': ip_address, 'success_count': success, 'failure_count': failure}
+            for (day, ip_address), (success, failure) in totals.items()
+        ]
+
+        # 3. Eski yig'indilar o'rniga
+        conn.execute(CleanupWeekly.__table__.delete())
+        conn.execute(CleanupRun.__table__.delete())
+        conn.execute(LoginDaily.__table__.delete())
+        for model, rows in ((CleanupWeekly, weekly_rows), (CleanupRun, run_rows), (LoginDaily, daily_rows)):
+            for start in range(0, len(rows), INSERT_CHUNK):
+                conn.execute(model.__table__.insert(), rows[start:start + INSERT_CHUNK])
+
+    logger.info(f"📈 Analitika qayta hisoblandi: {len(weekly_rows)} ta hafta, {len(daily_rows)} ta kun/IP")
+    return {'weeks': len(weekly_rows), 'login_days': len(daily_rows)}
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    from models import create_db_app
+
+    app = create_db_app()
+
+    with app.app_context():
+        report = backfill()
+
+    print(f"🗓️  Haftalik tozalash yozuvlari: {report['weeks']} ta")
+    print(f"🔐 Kunlik login yozuvlari (kun/IP): {report['login_days']} ta")
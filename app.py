@@ -1,160 +1,129 @@
 import os
-from flask import Flask, render_template, jsonify, request, redirect, url_for, flash, session
-from flask_sqlalchemy import SQLAlchemy
+from flask import Flask, Blueprint, Response, current_app, render_template, jsonify, request, redirect, url_for, flash, session, stream_with_context
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
+from markupsafe import Markup
 import hashlib
+import json
+
+import analytics
+import assets
+import auth
+import data_version
+import events
+import heartbeat
+import jobs
+import login_log
+import metrics
+import models
+import pool_stats
+import rate_limit
+import replicas
+import scheduler
+import search
+import sqlite_mode
+from stats import get_stats_snapshot
+from config import config
 
 # .env faylini yuklash
 load_dotenv()
 
-app = Flask(__name__)
-
 # ============================================
-# 1. KONFIGURATSIYA (.env DAN)
+# 1. KONFIGURATSIYA (config.py DAN)
 # ============================================
-app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL')
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'fallback-secret-key')
-app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(
-    minutes=int(os.getenv('SESSION_TIMEOUT_MINUTES', '30'))
-)
-
-# Login cheklovlari
-MAX_LOGIN_ATTEMPTS = int(os.getenv('MAX_LOGIN_ATTEMPTS', '3'))
-BLOCK_DURATION_MINUTES = int(os.getenv('BLOCK_DURATION_MINUTES', '3'))
-
-db = SQLAlchemy(app)
+# Ilova create_app() ichida yaratiladi, route'lar unga keyin ulanadi
+bp = Blueprint('main', __name__)
 
 # ============================================
-# 2. MODELLAR
+# 2. MODELLAR (models.py)
 # ============================================
-class User(db.Model):
-    __tablename__ = 'users'
-    
-    id = db.Column(db.Integer, primary_key=True)
-    full_name = db.Column(db.String(100), nullable=False)
-    room_number = db.Column(db.String(10), nullable=False, unique=True)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    last_active_at = db.Column(db.DateTime, default=datetime.utcnow)
-    
-    def __repr__(self):
-        return f"<User {self.room_number}: {self.full_name}>"
-    
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'full_name': self.full_name,
-            'room_number': self.room_number,
-            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S') if self.created_at else None,
-            'last_active_at': self.last_active_at.strftime('%Y-%m-%d %H:%M:%S') if self.last_active_at else None
-        }
-
-class CleanupLog(db.Model):
-    __tablename__ = 'cleanup_logs'
-    
-    id = db.Column(db.Integer, primary_key=True)
-    cleanup_time = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
-    records_deleted = db.Column(db.Integer, nullable=False)
-    status = db.Column(db.String(50), default='success')
-    details = db.Column(db.Text)
-
-class LoginAttempt(db.Model):
-    """Foydalanuvchi kirish urinishlarini kuzatish"""
-    __tablename__ = 'login_attempts'
-    
-    id = db.Column(db.Integer, primary_key=True)
-    username = db.Column(db.String(100), nullable=False)
-    ip_address = db.Column(db.String(45), nullable=False)
-    attempt_time = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
-    successful = db.Column(db.Boolean, default=False)
-    
-    def __repr__(self):
-        status = "Muvaffaqiyatli" if self.successful else "Noto'g'ri"
-        return f"<LoginAttempt {self.username} - {status} at {self.attempt_time}>"
+# `from app import db, User, ...` eski importlar uchun ham ishlaydi
+from models import (
+    db, User, CleanupLog, LoginAttempt, LoginAttemptHourly, SchedulerLock, USER_COLUMNS
+)
 
 # ============================================
 # 3. YORDAMCHI FUNKSIYALAR
 # ============================================
-def get_admin_credentials():
-    """Admin login ma'lumotlarini .env dan o'qish"""
-    admin_username = os.getenv('ADMIN_USERNAME')
-    admin_password = os.getenv('ADMIN_PASSWORD')
+def check_admin_credentials(username, password):
+    """Admin login ma'lumotlarini tekshirish (auth.py - tuzli xesh, constant-time)"""
+    return auth.get_registry().verify(username, password)
+
+def check_login_attempts(ip_address):
+    """IP manzil uchun kirish urinishlarini tekshirish (LOGIN_LIMITER_BACKEND orqali)"""
+    return rate_limit.get_limiter().check(ip_address)
+
+def log_login_attempt(username, ip_address, successful, sync=False):
+    """Kirish urinishini bazaga yozish
     
-    admin_users_str = os.getenv('ADMIN_USERS', '')
-    admin_credentials = {}
+    Odatda yozuv navbatga qo'shiladi va fonda bulk INSERT bilan saqlanadi.
+    sync=True yoki limiter bazadan hisoblasa (muvaffaqiyatsiz urinishlar),
+    yozuv darhol commit qilinadi - bloklash hisobi kechikmasligi uchun.
+    """
+    attempt_time = datetime.utcnow()
+    limiter = rate_limit.get_limiter()
+    writer = login_log.get_writer()
     
-    if admin_users_str:
-        for user_pass in admin_users_str.split(','):
-            if ':' in user_pass:
-                username, password = user_pass.split(':', 1)
-                admin_credentials[username.strip()] = password.strip()
+    if writer is not None and not sync and (successful or not limiter.reads_database):
+        writer.add({
+            'username': username,
+            'ip_address': ip_address,
+            'attempt_time': attempt_time,
+            'successful': successful
+        })
     else:
-        admin_credentials[admin_username] = admin_password
+        attempt = LoginAttempt(
+            username=username,
+            ip_address=ip_address,
+            attempt_time=attempt_time,
+            successful=successful
+        )
+        db.session.add(attempt)
+        db.session.commit()
     
-    return admin_credentials
+    if not successful:
+        limiter.record_failure(ip_address, attempt_time)
 
-def check_admin_credentials(username, password):
-    """Admin login ma'lumotlarini tekshirish"""
-    admin_credentials = get_admin_credentials()
+# ============================================
+# 4. ILOVA FABRIKASI
+# ============================================
+def create_app(config_name=None):
+    """Flask ilovasini config.py dagi muhit sozlamalari bilan yaratish
+    (development / production / testing)"""
+    config_name = config_name or os.getenv('FLASK_CONFIG', 'default')
     
-    if username not in admin_credentials:
-        return False
+    app = Flask(__name__)
+    app.config.from_object(config[config_name])
     
-    expected_password = admin_credentials[username]
-    return password == expected_password
-
-def check_login_attempts(ip_address):
-    """IP manzil uchun kirish urinishlarini tekshirish"""
-    one_hour_ago = datetime.utcnow() - timedelta(hours=1)
+    models.configure_db(app)
+    auth.init_app(app)
+    rate_limit.init_app(app)
+    login_log.init_app(app)
+    heartbeat.init_app(app)
+    events.init_app(app)
+    jobs.init_app(app)
+    assets.init_app(app)
+    app.register_blueprint(bp)
     
-    not_successful_attempts = LoginAttempt.query.filter(
-        LoginAttempt.ip_address == ip_address,
-        LoginAttempt.successful == False,
-        LoginAttempt.attempt_time > one_hour_ago
-    ).all()
+    with app.app_context():
+        models.setup_engines(app)
+        metrics.init_app(app, db.engines)
+        replicas.init_app(app, db)
+        # Sxema versiyasi mos bo'lsa bitta SELECT (migratsiya har deploy'da bir marta)
+        models.ensure_schema(app)
     
-    if len(not_successful_attempts) >= MAX_LOGIN_ATTEMPTS:
-        last_failed_time = max(attempt.attempt_time for attempt in not_successful_attempts)
-        block_until = last_failed_time + timedelta(minutes=BLOCK_DURATION_MINUTES)
-        
-        if datetime.utcnow() < block_until:
-            remaining_seconds = int((block_until - datetime.utcnow()).total_seconds())
-            minutes = remaining_seconds // 60
-            seconds = remaining_seconds % 60
-            return False, f"IP manzilingiz {BLOCK_DURATION_MINUTES} daqiqaga bloklangan. {minutes} daqiqa {seconds} soniya qoldi."
+    scheduler.init_app(app)
     
-    return True, ""
-
-def log_login_attempt(username, ip_address, successful):
-    """Kirish urinishini bazaga yozish"""
-    attempt = LoginAttempt(
-        username=username,
-        ip_address=ip_address,
-        successful=successful
-    )
-    db.session.add(attempt)
-    db.session.commit()
-
-# ============================================
-# 4. ILOVA BOSHLANGANDA
-# ============================================
-with app.app_context():
-    try:
-        db.create_all()
-        user_count = User.query.count()
-        
-    except Exception as e:
-        pass
+    return app
 
 # ============================================
 # 5. ROUTE'LAR (LOGIN)
 # ============================================
-@app.route('/login', methods=['GET', 'POST'])
+@bp.route('/login', methods=['GET', 'POST'])
 def login():
     """Login sahifasi"""
     if 'user_id' in session:
-        return redirect(url_for('dashboard'))
+        return redirect(url_for('main.dashboard'))
     
     error = None
     
@@ -178,7 +147,7 @@ def login():
                 session.permanent = True
                 
                 flash('Muvaffaqiyatli kirdingiz!', 'success')
-                return redirect(url_for('dashboard'))
+                return redirect(url_for('main.dashboard'))
             else:
                 log_login_attempt(username, ip_address, False)
                 
@@ -187,32 +156,23 @@ def login():
                 if not is_allowed_again:
                     error = block_message_again
                 else:
-                    one_hour_ago = datetime.utcnow() - timedelta(hours=1)
-                    failed_count = LoginAttempt.query.filter(
-                        LoginAttempt.ip_address == ip_address,
-                        LoginAttempt.successful == False,
-                        LoginAttempt.attempt_time > one_hour_ago
-                    ).count()
-                    
-                    remaining_attempts = MAX_LOGIN_ATTEMPTS - failed_count
                     error = f"Noto'g'ri login yoki parol!"
     
-    admin_credentials = get_admin_credentials()
-    admin_users = list(admin_credentials.keys())
+    admin_users = list(auth.get_registry().usernames())
     
     return render_template('login.html', 
                          error=error, 
-                         max_attempts=MAX_LOGIN_ATTEMPTS, 
-                         block_duration=BLOCK_DURATION_MINUTES,
+                         max_attempts=current_app.config['MAX_LOGIN_ATTEMPTS'], 
+                         block_duration=current_app.config['BLOCK_DURATION_MINUTES'],
                          admin_users=admin_users)
 
-@app.route('/logout')
+@bp.route('/logout')
 def logout():
     """Chiqish"""
     username = session.get('username', 'Noma\'lum')
     session.clear()
     flash(f'{username} tizimdan chiqdingiz.', 'info')
-    return redirect(url_for('login'))
+    return redirect(url_for('main.login'))
 
 # ============================================
 # 6. DASHBOARD ROUTE'LARI
@@ -225,112 +185,274 @@ def login_required(f):
     def decorated_function(*args, **kwargs):
         if 'user_id' not in session:
             flash('Iltimos, avval tizimga kiring.', 'warning')
-            return redirect(url_for('login'))
+            return redirect(url_for('main.login'))
         return f(*args, **kwargs)
     
     return decorated_function
 
-@app.route('/')
-@app.route('/dashboard')
+@bp.route('/')
+@bp.route('/dashboard')
 @login_required
+@replicas.read_only
+@data_version.conditional('users', 'cleanup_logs', vary=lambda: ','.join(auth.get_registry().usernames()))
 def dashboard():
-    """Asosiy dashboard sahifasi"""
+    """Asosiy dashboard sahifasi.
+    Jadval va tarix bo'laklari data_version bo'yicha keshlanadi - ma'lumot
+    o'zgarmagan bo'lsa sahifa bazaga murojaatsiz yig'iladi."""
     try:
-        users = User.query.order_by(User.created_at.desc()).limit(100).all()
-        logs = CleanupLog.query.order_by(CleanupLog.cleanup_time.desc()).limit(20).all()
-        total_users = User.query.count()
-        last_cleanup = CleanupLog.query.order_by(CleanupLog.cleanup_time.desc()).first()
+        users_table = Markup(data_version.cached_fragment('users_table', ('users',), lambda: render_template(
+            '_users_table.html',
+            users=User.query.order_by(User.created_at.desc()).limit(100).all()
+        )))
+        cleanup_history = Markup(data_version.cached_fragment('cleanup_history', ('cleanup_logs',), lambda: render_template(
+            '_cleanup_history.html',
+            logs=CleanupLog.query.order_by(CleanupLog.cleanup_time.desc()).limit(20).all()
+        )))
+        snapshot = get_stats_snapshot()
+        total_users = snapshot['total_users']
+        last_cleanup = snapshot['last_cleanup']
         
-        login_history = LoginAttempt.query.order_by(LoginAttempt.attempt_time.desc()).limit(10).all()
-        
-        admin_credentials = get_admin_credentials()
-        admin_users = list(admin_credentials.keys())
+        admin_users = list(auth.get_registry().usernames())
         
     except Exception as e:
-        users = []
-        logs = []
+        users_table = Markup(render_template('_users_table.html', users=[]))
+        cleanup_history = Markup(render_template('_cleanup_history.html', logs=[]))
         total_users = 0
         last_cleanup = None
-        login_history = []
         admin_users = []
     
     return render_template(
         'dashboard.html',
-        users=users,
-        logs=logs,
+        users_table=users_table,
+        cleanup_history=cleanup_history,
         total_users=total_users,
         last_cleanup=last_cleanup,
-        login_history=login_history,
         admin_users=admin_users,
         now=datetime.now(),
         username=session.get('username', 'Foydalanuvchi'),
-        max_attempts=MAX_LOGIN_ATTEMPTS,
-        block_duration=BLOCK_DURATION_MINUTES
+        max_attempts=current_app.config['MAX_LOGIN_ATTEMPTS'],
+        block_duration=current_app.config['BLOCK_DURATION_MINUTES']
     )
 
-@app.route('/api/users')
+def _format_time(value):
+    return value.isoformat(sep=' ', timespec='seconds') if value else None
+
+def serialize_user_row(row):
+    """Ustunli qatorni User.to_dict() bilan bir xil ko'rinishga keltirish"""
+    return {
+        'id': row.id,
+        'full_name': row.full_name,
+        'room_number': row.room_number,
+        'created_at': _format_time(row.created_at),
+        'last_active_at': _format_time(row.last_active_at)
+    }
+
+def fetch_user_page(after=None, limit=50):
+    """room_number bo'yicha keyset sahifa: after dan keyingi limit ta qator"""
+    query = db.session.query(*USER_COLUMNS)
+    if after:
+        query = query.filter(User.room_number > after)
+    return query.order_by(User.room_number).limit(limit).all()
+
+def iter_user_rows(after=None, limit=None, chunk_size=1000):
+    """Foydalanuvchilarni bo'laklab o'qish - xotira jadval hajmiga bog'liq emas"""
+    sent = 0
+    while limit is None or sent < limit:
+        size = chunk_size if limit is None else min(chunk_size, limit - sent)
+        rows = fetch_user_page(after, size)
+        if not rows:
+            break
+        for row in rows:
+            yield row
+        sent += len(rows)
+        after = rows[-1].room_number
+        if len(rows) < size:
+            break
+
+@bp.route('/api/users')
 @login_required
+@replicas.read_only
+@data_version.conditional('users')
 def get_users():
-    """Foydalanuvchilar ro'yxati (JSON) - Faqat login qilganlar"""
+    """Foydalanuvchilar ro'yxati (JSON) - Faqat login qilganlar
+    
+    ?after=<room_number>&limit=N - keyset sahifalash
+    ?format=ndjson (yoki Accept: application/x-ndjson) - qatorma-qator oqim
+    """
     try:
-        users = User.query.order_by(User.room_number).all()
-        return jsonify([user.to_dict() for user in users])
+        after = request.args.get('after') or None
+        limit = request.args.get('limit', type=int)
+        max_limit = current_app.config.get('USERS_MAX_PAGE_SIZE', 1000)
+        if limit is not None:
+            limit = max(1, min(limit, max_limit))
+        
+        wants_ndjson = (
+            request.args.get('format') == 'ndjson'
+            or request.accept_mimetypes.best == 'application/x-ndjson'
+        )
+        
+        if wants_ndjson:
+            chunk_size = current_app.config.get('USERS_STREAM_CHUNK_SIZE', 1000)
+            
+            def generate():
+                for row in iter_user_rows(after, limit, chunk_size):
+                    yield json.dumps(serialize_user_row(row), ensure_ascii=False) + '\n'
+            
+            return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+        
+        if after is None and limit is None:
+            # Eski format: butun ro'yxat bitta JSON massivida
+            rows = db.session.query(*USER_COLUMNS).order_by(User.room_number).all()
+            return jsonify([serialize_user_row(row) for row in rows])
+        
+        limit = limit or current_app.config.get('USERS_PER_PAGE', 50)
+        rows = fetch_user_page(after, limit)
+        return jsonify({
+            'users': [serialize_user_row(row) for row in rows],
+            'limit': limit,
+            'next_after': rows[-1].room_number if len(rows) == limit else None
+        })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/stats')
+@bp.route('/api/users/search')
 @login_required
+@replicas.read_only
+@data_version.conditional('users')
+def search_users():
+    """room_number / full_name prefiksi bo'yicha qidiruv - Faqat login qilganlar
+    
+    ?q=<matn>&limit=N (standart 20, eng ko'pi 100)
+    """
+    try:
+        query = (request.args.get('q') or '').strip()
+        limit = max(1, min(request.args.get('limit', 20, type=int), 100))
+        if not query:
+            return jsonify({'error': 'q parametri kerak'}), 400
+        
+        rows = search.search_users(query, limit)
+        return jsonify({
+            'query': query,
+            'backend': search.get_backend(),
+            'users': [serialize_user_row(row) for row in rows]
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/users/bulk', methods=['POST'])
+@login_required
+def bulk_users():
+    """CSV yoki NDJSON dan ommaviy yuklash (room_number bo'yicha upsert) - Faqat login qilganlar
+    
+    Tana: fayl (multipart 'file') yoki to'g'ridan-to'g'ri oqim.
+    ?format=csv|ndjson - aks holda Content-Type / fayl nomidan aniqlanadi.
+    ?batch_size=N - bitta bo'lakdagi qatorlar
+    """
+    import io
+    from ingest import FORMATS, detect_format, ingest
+    
+    try:
+        upload = request.files.get('file')
+        if upload is not None:
+            raw, fmt = upload.stream, detect_format(upload.mimetype, upload.filename)
+        else:
+            raw, fmt = request.stream, detect_format(request.mimetype)
+        fmt = request.args.get('format') or fmt
+        if fmt not in FORMATS:
+            return jsonify({'error': f"Noma'lum format: {fmt}"}), 400
+        
+        batch_size = request.args.get('batch_size', type=int) or current_app.config.get('USERS_BULK_BATCH_SIZE', 5000)
+        batch_size = max(1, min(batch_size, 50000))
+        
+        stream = io.TextIOWrapper(raw, encoding='utf-8-sig', newline='')
+        report = ingest(stream, fmt, batch_size)
+        status_code = 200 if not any('error' in batch for batch in report['batches']) else 207
+        return jsonify(report), status_code
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/heartbeat', methods=['POST'])
+def user_heartbeat():
+    """Mehmon faolligi: {"room_number": "101"} yoki {"rooms": ["101", "102"]}
+    
+    last_active_at darhol yozilmaydi - HEARTBEAT_FLUSH_INTERVAL ichida bitta UPDATE bilan.
+    Login qilganlar yoki HEARTBEAT_TOKEN (Bearer) bilan.
+    """
+    if not heartbeat.is_authorized():
+        return jsonify({'error': 'Ruxsat yo\'q'}), 401
+    
+    data = request.get_json(silent=True) or {}
+    rooms = data.get('rooms') or ([data['room_number']] if data.get('room_number') else [])
+    if not isinstance(rooms, list) or not rooms:
+        return jsonify({'error': 'room_number yoki rooms kerak'}), 400
+    
+    buffer = heartbeat.get_buffer()
+    now = datetime.utcnow()
+    for room_number in rooms:
+        buffer.touch(str(room_number), now)
+    
+    return jsonify({'accepted': len(rooms), 'pending': buffer.pending()}), 202
+
+@bp.route('/api/stats')
+@login_required
+@replicas.read_only
+@data_version.conditional('users', 'cleanup_logs', ttl_config='STATS_CACHE_TTL')
 def get_stats():
     """Statistika - Faqat login qilganlar"""
     try:
-        total_users = User.query.count()
-        last_cleanup = CleanupLog.query.order_by(CleanupLog.cleanup_time.desc()).first()
-        
-        week_ago = datetime.utcnow() - timedelta(days=7)
-        active_users = User.query.filter(User.last_active_at >= week_ago).count()
+        snapshot = get_stats_snapshot()
+        last_cleanup = snapshot['last_cleanup']
         
         stats = {
-            'total_users': total_users,
-            'active_users': active_users,
-            'inactive_users': total_users - active_users,
-            'last_cleanup': last_cleanup.cleanup_time.strftime('%Y-%m-%d %H:%M:%S') if last_cleanup else 'Hech qachon',
-            'records_deleted_last': last_cleanup.records_deleted if last_cleanup else 0,
-            'status': last_cleanup.status if last_cleanup else 'N/A'
+            'total_users': snapshot['total_users'],
+            'active_users': snapshot['active_users'],
+            'inactive_users': snapshot['inactive_users'],
+            'last_cleanup': last_cleanup['cleanup_time'].strftime('%Y-%m-%d %H:%M:%S') if last_cleanup else 'Hech qachon',
+            'records_deleted_last': last_cleanup['records_deleted'] if last_cleanup else 0,
+            'status': last_cleanup['status'] if last_cleanup else 'N/A'
         }
         return jsonify(stats)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/cleanup/manual', methods=['POST'])
+@bp.route('/api/cleanup/manual', methods=['POST'])
 @login_required
 def manual_cleanup():
-    """Qo'lda tozalash - Faqat login qilganlar"""
+    """Qo'lda tozalash - fon vazifasi sifatida navbatga qo'yiladi (jobs.py) - Faqat login qilganlar
+    
+    Javob darhol: 202 + job_id; holat /api/cleanup/jobs/<id> da.
+    Vazifa allaqachon ishlayotgan bo'lsa - 409 va o'sha vazifa id si.
+    """
     try:
-        count_before = User.query.count()
+        from policies import parse_policy
         
-        if count_before == 0:
-            return jsonify({
-                'success': True,
-                'message': 'Tozalash uchun foydalanuvchi yo\'q',
-                'deleted': 0
-            })
+        # Ixtiyoriy: {"policy": "inactive:30"} - aks holda CLEANUP_POLICY
+        policy = (request.get_json(silent=True) or {}).get('policy')
+        if policy:
+            try:
+                parse_policy(policy)
+            except ValueError as e:
+                return jsonify({'success': False, 'message': str(e)}), 400
         
-        deleted_count = db.session.query(User).delete()
+        job, created = jobs.get_runner().submit(policy=policy, requested_by=session.get('username'))
+        status_url = url_for('main.cleanup_job_status', job_id=job.id)
         
-        log = CleanupLog(
-            cleanup_time=datetime.utcnow(),
-            records_deleted=deleted_count,
-            status='manual',
-            details=f"Qo'lda tozalash. {deleted_count} ta foydalanuvchi o'chirildi. Admin: {session.get('username')}"
-        )
-        db.session.add(log)
-        db.session.commit()
+        if not created:
+            return jsonify({
+                'success': False,
+                'message': 'Tozalash allaqachon bajarilmoqda',
+                'job_id': job.id,
+                'status_url': status_url
+            }), 409
         
         return jsonify({
             'success': True,
-            'message': f'{deleted_count} ta foydalanuvchi o\'chirildi',
-            'deleted': deleted_count
-        })
+            'message': 'Tozalash navbatga qo\'yildi',
+            'job_id': job.id,
+            'status': job.status,
+            'status_url': status_url
+        }), 202
         
     except Exception as e:
         db.session.rollback()
@@ -339,35 +461,136 @@ def manual_cleanup():
             'message': f'Xatolik: {str(e)}'
         }), 500
 
-@app.route('/api/users/active-count')
+@bp.route('/api/cleanup/jobs/<job_id>')
 @login_required
+def cleanup_job_status(job_id):
+    """Qo'lda tozalash vazifasi holati: o'chirilganlar, tezlik va ETA"""
+    try:
+        data = jobs.job_status(job_id)
+        if data is None:
+            return jsonify({'error': 'Vazifa topilmadi'}), 404
+        return jsonify(data)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/cleanup/dry-run')
+@login_required
+def cleanup_dry_run():
+    """Tozalash siyosatini sinash: nechta qator o'chadi va so'rov rejasi (o'chirmaydi)"""
+    from policies import dry_run
+    
+    try:
+        return jsonify(dry_run(request.args.get('policy') or current_app.config.get('CLEANUP_POLICY')))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/events')
+@login_required
+def event_stream():
+    """Server-Sent Events: statistika o'zgarganda 'stats' hodisasi - Faqat login qilganlar"""
+    broker = events.get_broker()
+    subscriber = broker.subscribe()
+    if subscriber is None:
+        return jsonify({'error': 'Ulanishlar soni chegarasiga yetildi'}), 503
+    
+    response = Response(
+        events.stream(
+            broker, subscriber,
+            current_app.config.get('EVENTS_HEARTBEAT_SECONDS', 15),
+            current_app.config.get('EVENTS_MAX_STREAM_SECONDS', 300)
+        ),
+        mimetype='text/event-stream'
+    )
+    # Mijoz birinchi xabardan oldin uzilsa generator ishga tushmaydi va uning finally'si ham -
+    # navbat baribir bo'shatiladi (EVENTS_MAX_CLIENTS to'lib qolmasin)
+    response.call_on_close(lambda: broker.unsubscribe(subscriber))
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@bp.route('/api/users/active-count')
+@login_required
+@replicas.read_only
+@data_version.conditional('users', ttl_config='STATS_CACHE_TTL')
 def active_users_count():
     """Oxirgi 7 kunda faol bo'lgan foydalanuvchilar soni - Faqat login qilganlar"""
     try:
-        week_ago = datetime.utcnow() - timedelta(days=7)
-        active_count = User.query.filter(User.last_active_at >= week_ago).count()
-        total_count = User.query.count()
+        snapshot = get_stats_snapshot()
         
         return jsonify({
-            'active_users': active_count,
-            'inactive_users': total_count - active_count,
-            'total_users': total_count
+            'active_users': snapshot['active_users'],
+            'inactive_users': snapshot['inactive_users'],
+            'total_users': snapshot['total_users']
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/cleanup/count')
+@bp.route('/api/cleanup/count')
 @login_required
+@replicas.read_only
+@data_version.conditional('cleanup_logs')
 def cleanup_count():
     """Tozalashlar soni"""
     try:
-        count = CleanupLog.query.count()
+        count = get_stats_snapshot()['cleanup_count']
         return jsonify({'count': count})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@bp.route('/api/analytics')
+@login_required
+@replicas.read_only
+@data_version.conditional('cleanup_logs', ttl_config='STATS_CACHE_TTL')
+def analytics_summary():
+    """Haftalik tozalash va kunlik login seriyalari (yig'indi jadvallaridan) - Faqat login qilganlar
+    
+    ?weeks=N (standart 12) &days=N (standart 30) &ip=<ip> - bitta IP ning login seriyasi
+    """
+    try:
+        weeks = request.args.get('weeks', analytics.DEFAULT_WEEKS, type=int)
+        days = request.args.get('days', analytics.DEFAULT_DAYS, type=int)
+        return jsonify(analytics.summary(
+            weeks=max(1, min(weeks, analytics.MAX_WEEKS)),
+            days=max(1, min(days, analytics.MAX_DAYS)),
+            ip_address=request.args.get('ip') or None
+        ))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/pool/stats')
+@login_required
+def pool_statistics():
+    """Shu worker'ning connection pool statistikasi - Faqat login qilganlar"""
+    try:
+        data = pool_stats.collect(db.engine)
+        writer = sqlite_mode.writer_stats(db.engine)
+        if writer is not None:
+            # SQLite: yagona yozuvchi navbatini kutish
+            data['sqlite_writer'] = writer
+        router = replicas.get_router()
+        if router is not None:
+            # Har bir bind (asosiy + replikalar) alohida pool
+            data['binds'] = {key or 'primary': pool_stats.collect(engine) for key, engine in db.engines.items()}
+            data['replicas'] = router.status()
+        return jsonify(data)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/metrics')
+def metrics_endpoint():
+    """Prometheus metrikalari - login qilganlar yoki METRICS_TOKEN (Bearer) bilan"""
+    if not metrics.is_authorized():
+        return jsonify({'error': 'Ruxsat yo\'q'}), 401
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 # ============================================
 # 7. ISHGA TUSHIRISH
 # ============================================
+# gunicorn app:app va cleanup.py uchun: FLASK_CONFIG berilmasa production
+# (DEBUG va SQL log o'chiq); python app.py - development
+app = create_app(os.getenv('FLASK_CONFIG') or ('development' if __name__ == '__main__' else 'production'))
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
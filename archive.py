@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Tozalashdan oldin foydalanuvchilarni arxivlash
+run_cleanup() o'chirishdan oldin siyosatga mos qatorlarni server-side cursor
+bilan bo'laklab o'qiydi va CLEANUP_ARCHIVE_DIR ga gzip NDJSON faylga yozadi
+(xotira jadval hajmiga bog'liq emas). sha256 arxiv yonidagi '<arxiv>.sha256'
+faylga (sha256sum formatida) yoziladi - CleanupLog qatorlari retention bilan
+o'chirilsa ham arxivni tekshirish mumkin; CleanupLog esa yo'l va checksum indeksi.
+
+    python archive.py verify archives/cleanup-000042-20260105-000000.ndjson.gz
+    python archive.py restore archives/cleanup-000042-20260105-000000.ndjson.gz
+"""
+
+import os
+import sys
+import gzip
+import json
+import hashlib
+import logging
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+logger = logging.getLogger(__name__)
+
+READ_CHUNK = 1024 * 1024
+CHECKSUM_SUFFIX = '.sha256'
+
+
+class _HashingFile:
+    """Faylga yozilayotgan (siqilgan) baytlarni bir vaqtda sha256 bilan hisoblash"""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.sha256 = hashlib.sha256()
+
+    def write(self, data):
+        self.sha256.update(data)
+        return self.raw.write(data)
+
+    def flush(self):
+        self.raw.flush()
+
+
+def _format_time(value):
+    return value.isoformat() if value else None
+
+
+def archive_dir(app=None):
+    from flask import current_app
+
+    config = (app or current_app).config
+    return Path(config.get('CLEANUP_ARCHIVE_DIR') or Path(__file__).parent / 'archives').resolve()
+
+
+def archive_users(criterion, max_id, path, chunk_size=5000):
+    """criterion ga mos (id <= max_id) foydalanuvchilarni gzip NDJSON ga yozish.
+    Fayl avval .part nomi bilan yoziladi - to'liq tugaganda qayta nomlanadi.
+    Natija: (qatorlar soni, sha256)"""
+    from models import db, User
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial = path.with_name(path.name + '.part')
+
+    statement = db.select(
+        User.id, User.full_name, User.room_number, User.created_at, User.last_active_at
+    ).where(criterion, User.id <= max_id).order_by(User.id).execution_options(
+        stream_results=True, max_row_buffer=chunk_size
+    )
+
+    rows = 0
+    with open(partial, 'wb') as raw:
+        hashing = _HashingFile(raw)
+        with gzip.GzipFile(fileobj=hashing, mode='wb', mtime=0) as archive:
+            for chunk in db.session.execute(statement).partitions(chunk_size):
+                lines = [
+                    json.dumps({
+                        'id': row.id,
+                        'full_name': row.full_name,
+                        'room_number': row.room_number,
+                        'created_at': _format_time(row.created_at),
+                        'last_active_at': _format_time(row.last_active_at)
+                    }, ensure_ascii=False)
+                    for row in chunk
+                ]
+                archive.write(('\n'.join(lines) + '\n').encode('utf-8'))
+                rows += len(lines)
+        os.fsync(raw.fileno())
+
+    os.replace(partial, path)
+    checksum = hashing.sha256.hexdigest()
+    write_checksum_file(path, checksum)
+    return rows, checksum
+
+
+def archive_cleanup(log, criterion):
+    """CleanupLog uchun arxiv: fayl yo'li va checksum o'chirishdan oldin commit qilinadi"""
+    from flask import current_app
+    from models import db
+
+    path = archive_dir() / f"cleanup-{log.id:06d}-{log.cleanup_time:%Y%m%d-%H%M%S}.ndjson.gz"
+    rows, checksum = archive_users(
+        criterion,
+        log.max_user_id or 0,
+        path,
+        current_app.config.get('CLEANUP_ARCHIVE_CHUNK', 5000)
+    )
+
+    log.archive_path = str(path)
+    log.archive_checksum = checksum
+    db.session.commit()
+    logger.info(f"🗄️  Arxiv: {path} ({rows} ta, sha256 {checksum[:12]}...)")
+    return rows
+
+
+def file_checksum(path):
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as stream:
+        for block in iter(lambda: stream.read(READ_CHUNK), b''):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+
+def checksum_path(path):
+    path = Path(path)
+    return path.with_name(path.name + CHECKSUM_SUFFIX)
+
+
+def write_checksum_file(path, checksum):
+    """'<arxiv>.sha256' - 'sha256sum -c' bilan ham tekshiriladi"""
+    target = checksum_path(path)
+    partial = target.with_name(target.name + '.part')
+    with open(partial, 'w', encoding='utf-8') as stream:
+        stream.write(f"{checksum}  {Path(path).name}\n")
+        stream.flush()
+        os.fsync(stream.fileno())
+    os.replace(partial, target)
+
+
+def read_checksum_file(path):
+    try:
+        content = checksum_path(path).read_text(encoding='utf-8').split()
+    except OSError:
+        return None
+    return content[0].lower() if content else None
+
+
+def verify(path):
+    """Fayl checksumini '<arxiv>.sha256' (bo'lmasa CleanupLog) dagi qiymat bilan solishtirish"""
+    from models import CleanupLog
+
+    path = Path(path).resolve()
+    log = CleanupLog.query.filter_by(archive_path=str(path)).order_by(CleanupLog.id.desc()).first()
+    expected, source = read_checksum_file(path), 'file'
+    if expected is None and log is not None:
+        # Eski arxivlar: checksum faqat CleanupLog da
+        expected, source = log.archive_checksum, 'cleanup_log'
+    actual = file_checksum(path)
+    return {
+        'path': str(path),
+        'checksum': actual,
+        'expected': expected,
+        'source': source if expected else None,
+        'log_id': log.id if log else None,
+        'valid': bool(expected and expected == actual)
+    }
+
+
+def restore(path, batch_size=5000, check=True):
+    """Arxivni ingest.py orqali qayta yuklash (room_number bo'yicha upsert)"""
+    from ingest import ingest
+
+    if check:
+        result = verify(path)
+        if not result['valid']:
+            raise ValueError(f"Arxiv checksumi mos emas yoki topilmadi (.sha256 / CleanupLog): {path}")
+
+    with gzip.open(path, 'rt', encoding='utf-8') as stream:
+        return ingest(stream, 'ndjson', batch_size)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Tozalash arxivlari")
+    parser.add_argument('command', choices=('verify', 'restore'))
+    parser.add_argument('path')
+    parser.add_argument('--batch-size', type=int, help="Standart: USERS_BULK_BATCH_SIZE")
+    parser.add_argument('--no-verify', action='store_true', help="Checksumni tekshirmasdan tiklash")
+    args = parser.parse_args()
+
+    from models import create_db_app
+
+    app = create_db_app()
+
+    with app.app_context():
+        if args.command == 'verify':
+            result = verify(args.path)
+            print(json.dumps(result, ensure_ascii=False, indent=2))
+            sys.exit(0 if result['valid'] else 1)
+
+        report = restore(
+            args.path,
+            args.batch_size or app.config.get('USERS_BULK_BATCH_SIZE', 5000),
+            check=not args.no_verify
+        )
+
+    print(f"📥 O'qilgan qatorlar: {report['rows']}")
+    print(f"➕ Qo'shilgan: {report['inserted']}")
+    print(f"✏️  Yangilangan: {report['updated']}")
+    print(f"⚠️  Rad etilgan: {report['rejected']}")
+    print(f"⏱️  Vaqt: {report['elapsed_ms']} ms")
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Statik fayllar: kontent xeshi bilan nomlash, oldindan siqish va immutable kesh
+static/ ichidagi fayllar static/dist/ ga 'style.<xesh>.css' nomi bilan
+ko'chiriladi, matnli fayllar uchun .gz (va brotli o'rnatilgan bo'lsa .br)
+nusxalari yoziladi, manifest.json esa asl nomni xeshli nomga bog'laydi.
+Build ilova ishga tushganda bajariladi (ASSETS_BUILD_ON_START) yoki qo'lda:
+    python assets.py
+
+/assets/<xeshli nom> Accept-Encoding bo'yicha .br / .gz / asl faylni
+'Cache-Control: public, max-age=31536000, immutable' bilan beradi - fayl
+o'zgarsa nomi ham o'zgaradi, shuning uchun brauzer uni qayta so'ramaydi.
+Shablonlarda url_for o'rniga: {{ asset_url('static', filename='style.css') }}
+"""
+
+import os
+import gzip
+import json
+import hashlib
+import logging
+import mimetypes
+from pathlib import Path
+
+from flask import current_app, request, send_from_directory, url_for, abort
+
+try:
+    import brotli
+except ImportError:
+    # brotli ixtiyoriy - bo'lmasa faqat gzip
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+DIST_DIR = 'dist'
+MANIFEST = 'manifest.json'
+HASH_LENGTH = 12
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+# Siqiladigan fayllar (rasmlar va shriftlar allaqachon siqilgan)
+COMPRESSIBLE = {'.css', '.js', '.json', '.svg', '.html', '.txt', '.map'}
+MIN_COMPRESS_SIZE = 256
+# Accept-Encoding bo'yicha afzallik tartibi: (kodlash, fayl qo'shimchasi)
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+# ============================================
+# BUILD
+# ============================================
+def _fingerprinted(name, digest):
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{digest}{ext}"
+
+
+def _write_atomic(path, data):
+    # Bir nechta gunicorn worker bir vaqtda build qilsa ham yarim yozilgan fayl ko'rinmaydi
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def _compressed_variants(suffix, data):
+    """{'.gz': bytes, '.br': bytes} - faqat asl fayldan kichik bo'lsa"""
+    if suffix not in COMPRESSIBLE or len(data) < MIN_COMPRESS_SIZE:
+        return {}
+    variants = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(data, quality=11)
+    return {ext: blob for ext, blob in variants.items() if len(blob) < len(data)}
+
+
+def build(static_dir, dist_dir=None):
+    """static_dir dagi fayllarni dist_dir ga xeshli nom bilan yozish.
+    Natija: (manifest, yangi yozilgan fayllar soni)"""
+    static_dir = Path(static_dir)
+    dist_dir = Path(dist_dir) if dist_dir else static_dir / DIST_DIR
+
+    manifest = {}
+    written = 0
+    for source in sorted(static_dir.rglob('*')):
+        if not source.is_file() or source.name.startswith('.') or dist_dir in source.parents:
+            continue
+        name = source.relative_to(static_dir).as_posix()
+        data = source.read_bytes()
+        hashed = _fingerprinted(name, hashlib.sha256(data).hexdigest()[:HASH_LENGTH])
+        manifest[name] = hashed
+
+        target = dist_dir / hashed
+        if target.exists():
+            # Nom kontentdan - mavjud bo'lsa o'zgarmagan
+            continue
+        target.parent.mkdir(parents=True, exist_ok=True)
+        for ext, blob in _compressed_variants(source.suffix, data).items():
+            _write_atomic(target.with_name(target.name + ext), blob)
+        # Asl nusxa oxirida: u bor bo'lsa siqilganlari ham tayyor
+        _write_atomic(target, data)
+        written += 1
+
+    dist_dir.mkdir(parents=True, exist_ok=True)
+    _write_atomic(dist_dir / MANIFEST, json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+    return manifest, written
+
+
+def load_manifest(dist_dir):
+    try:
+        return json.loads((Path(dist_dir) / MANIFEST).read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return {}
+
+
+# ============================================
+# XIZMAT QILISH
+# ============================================
+class AssetRegistry:
+    """Manifest va har bir fayl uchun mavjud siqilgan nusxalar (bir marta tekshiriladi)"""
+
+    def __init__(self, dist_dir, manifest):
+        self.dist_dir = Path(dist_dir)
+        self.manifest = manifest
+        self.encodings = {
+            hashed: [
+                (encoding, ext) for encoding, ext in ENCODINGS
+                if (self.dist_dir / (hashed + ext)).is_file()
+            ]
+            for hashed in manifest.values()
+        }
+        # Dashboard ETag'i bunga bog'liq - yangi deploy'dagi HTML eski xeshli manzillarni bermasin
+        self.version = hashlib.sha1(json.dumps(manifest, sort_keys=True).encode('utf-8')).hexdigest()[:HASH_LENGTH]
+
+
+def serve_asset(filename):
+    """/assets/<xeshli nom> - Accept-Encoding bo'yicha siqilgan nusxa, immutable kesh"""
+    registry = current_app.extensions.get('assets')
+    if registry is None or filename not in registry.encodings:
+        abort(404)
+
+    path, content_encoding = filename, None
+    for encoding, ext in registry.encodings[filename]:
+        if request.accept_encodings[encoding]:
+            path, content_encoding = filename + ext, encoding
+            break
+
+    response = send_from_directory(
+        registry.dist_dir,
+        path,
+        mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream',
+        max_age=IMMUTABLE_MAX_AGE
+    )
+    if content_encoding:
+        response.content_encoding = content_encoding
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+def asset_url(endpoint, **values):
+    """url_for bilan bir xil; static fayl manifestda bo'lsa xeshli /assets/ manzili"""
+    registry = current_app.extensions.get('assets')
+    if endpoint == 'static' and registry is not None:
+        hashed = registry.manifest.get(values.get('filename'))
+        if hashed:
+            return url_for('assets', **{**values, 'filename': hashed})
+    return url_for(endpoint, **values)
+
+
+def asset_version():
+    registry = current_app.extensions.get('assets')
+    return registry.version if registry is not None else ''
+
+
+def init_app(app):
+    """ASSETS_FINGERPRINT yoqilgan bo'lsa build + /assets/ route; asset_url har doim shablonlarda"""
+    app.jinja_env.globals['asset_url'] = asset_url
+
+    if not app.config.get('ASSETS_FINGERPRINT', True):
+        # Development: fayllar /static/ dan, o'zgarishlar darhol ko'rinadi
+        app.extensions['assets'] = None
+        return None
+
+    dist_dir = Path(app.static_folder) / DIST_DIR
+    if app.config.get('ASSETS_BUILD_ON_START', True):
+        try:
+            manifest, written = build(app.static_folder, dist_dir)
+            if written:
+                logger.info(f"📦 Statik fayllar: {written} ta yangi (jami {len(manifest)} ta)")
+        except OSError as e:
+            # Faqat o'qiladigan fayl tizimi va h.k. - oldindan yig'ilgan manifest ishlatiladi
+            logger.warning(f"⚠️  Statik fayllarni yig'ib bo'lmadi: {e}")
+
+    registry = AssetRegistry(dist_dir, load_manifest(dist_dir))
+    app.extensions['assets'] = registry
+    app.add_url_rule('/assets/<path:filename>', 'assets', serve_asset)
+    return registry
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    static_dir = Path(__file__).parent / 'static'
+    manifest, written = build(static_dir)
+
+    compression = 'gzip + brotli' if brotli is not None else "gzip (brotli o'rnatilmagan)"
+    print(f"📦 Statik fayllar: {len(manifest)} ta, yangi yozilgan: {written} ta")
+    print(f"🗜️  Siqish: {compression}")
+    for name, hashed in sorted(manifest.items()):
+        print(f"   {name} -> {DIST_DIR}/{hashed}")
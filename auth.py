@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Admin login ma'lumotlari (credential registry)
+Ro'yxat ilova ishga tushganda bir marta tuziladi: parollar xotirada faqat
+tuzli PBKDF2-SHA256 xesh ko'rinishida saqlanadi, tekshiruv
+hmac.compare_digest bilan. Login/dashboard so'rovlari env yoki faylni
+qayta o'qimaydi.
+
+Manba (birinchi mavjudi):
+- ADMIN_CREDENTIALS_FILE - har qatorda 'login:parol' yoki
+  'login:pbkdf2_sha256$<iteratsiya>$<tuz hex>$<xesh hex>' (# - izoh)
+- ADMIN_USERS='admin:parol,user2:parol2'
+- ADMIN_USERNAME / ADMIN_PASSWORD
+
+Fayl o'zgarsa (mtime, ADMIN_CREDENTIALS_CHECK_INTERVAL soniyada bir tekshiriladi)
+yoki jarayon SIGHUP olsa ro'yxat qayta tuziladi va bitta havola
+almashtirish bilan o'rnatiladi; xato bo'lsa eskisi qoladi.
+
+Fayl uchun xesh qatorini yaratish:
+    python auth.py <login>
+"""
+
+import os
+import hmac
+import time
+import signal
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+ALGORITHM = 'pbkdf2_sha256'
+DEFAULT_ITERATIONS = 200000
+SALT_BYTES = 16
+
+
+# ============================================
+# XESHLASH
+# ============================================
+def _derive(password, salt, iterations):
+    return hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, iterations)
+
+
+def hash_password(password, iterations=DEFAULT_ITERATIONS):
+    """'pbkdf2_sha256$<iteratsiya>$<tuz hex>$<xesh hex>'"""
+    salt = os.urandom(SALT_BYTES)
+    return f"{ALGORITHM}${iterations}${salt.hex()}${_derive(password, salt, iterations).hex()}"
+
+
+def _parse_hash(value):
+    """Xesh qatori -> (tuz, xesh, iteratsiya); oddiy parol bo'lsa None"""
+    parts = value.split('$')
+    if len(parts) != 4 or parts[0] != ALGORITHM:
+        return None
+    return bytes.fromhex(parts[2]), bytes.fromhex(parts[3]), int(parts[1])
+
+
+# ============================================
+# RO'YXAT
+# ============================================
+class _Snapshot:
+    """Bir martalik tuzilgan, o'zgarmaydigan ro'yxat va uning tekshiruv keshi"""
+
+    def __init__(self, records, source, signature, iterations=DEFAULT_ITERATIONS):
+        self.records = records  # login -> (tuz, xesh, iteratsiya)
+        self.usernames = tuple(records)
+        self.source = source
+        self.signature = signature
+        self.cache = OrderedDict()
+        # Noma'lum login uchun ham bir xil ish (vaqt bo'yicha loginlarni ajratib bo'lmasin):
+        # iteratsiya ro'yxatdagi eng kattasi - fayldagi xeshlar boshqa sonda bo'lishi mumkin
+        iterations = max((record[2] for record in records.values()), default=iterations)
+        dummy_salt = os.urandom(SALT_BYTES)
+        self.dummy = (dummy_salt, _derive('', dummy_salt, iterations), iterations)
+
+
+class CredentialRegistry:
+    def __init__(self, credentials_file=None, iterations=DEFAULT_ITERATIONS,
+                 cache_size=256, check_interval=5.0):
+        self.credentials_file = credentials_file
+        self.iterations = iterations
+        self.cache_size = cache_size
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._cache_lock = threading.Lock()
+        # Kesh kalitlari jarayonga xos HMAC - xotirada parolning o'zi saqlanmaydi
+        self._cache_key = os.urandom(32)
+        self._reload_requested = False
+        self._next_check = 0.0
+        try:
+            self._snapshot = self._build()
+        except (OSError, ValueError) as e:
+            # Fayl paydo bo'lganda/tuzatilganda mtime o'zgaradi va qayta yuklanadi
+            logger.error(f"❌ Admin ro'yxatini yuklab bo'lmadi: {e}")
+            self._snapshot = _Snapshot({}, self.credentials_file or 'ADMIN_USERS', None, self.iterations)
+
+    def _file_signature(self):
+        try:
+            stat = os.stat(self.credentials_file)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _read_entries(self):
+        """[(login, parol yoki xesh qatori)] va manba nomi"""
+        if self.credentials_file:
+            entries = []
+            with open(self.credentials_file, encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if line and not line.startswith('#') and ':' in line:
+                        username, secret = line.split(':', 1)
+                        entries.append((username.strip(), secret.strip()))
+            return entries, self.credentials_file
+
+        admin_users = os.getenv('ADMIN_USERS', '')
+        if admin_users:
+            entries = []
+            for user_pass in admin_users.split(','):
+                if ':' in user_pass:
+                    username, password = user_pass.split(':', 1)
+                    entries.append((username.strip(), password.strip()))
+            return entries, 'ADMIN_USERS'
+        return [(os.getenv('ADMIN_USERNAME'), os.getenv('ADMIN_PASSWORD'))], 'ADMIN_USERNAME'
+
+    def _build(self):
+        signature = self._file_signature() if self.credentials_file else None
+        entries, source = self._read_entries()
+
+        records = {}
+        for username, secret in entries:
+            if not username or not secret:
+                continue
+            parsed = _parse_hash(secret)
+            if parsed is None:
+                salt = os.urandom(SALT_BYTES)
+                parsed = (salt, _derive(secret, salt, self.iterations), self.iterations)
+            records[username] = parsed
+
+        if not records:
+            logger.warning(f"⚠️  Admin foydalanuvchilar topilmadi ({source})")
+        return _Snapshot(records, source, signature, self.iterations)
+
+    def reload(self):
+        """Ro'yxatni qayta tuzish. Xato bo'lsa eski ro'yxat qoladi."""
+        with self._lock:
+            self._reload_requested = False
+            try:
+                snapshot = self._build()
+            except (OSError, ValueError) as e:
+                logger.error(f"❌ Admin ro'yxatini qayta yuklab bo'lmadi: {e}")
+                return False
+            self._snapshot = snapshot
+        logger.info(f"🔑 Admin ro'yxati yangilandi: {len(snapshot.usernames)} ta ({snapshot.source})")
+        return True
+
+    def request_reload(self):
+        """SIGHUP ishlovchisi uchun - qayta tuzish keyingi so'rovda"""
+        self._reload_requested = True
+
+    def current(self):
+        """Joriy ro'yxat. Faylni vaqti-vaqti bilan faqat stat() qiladi."""
+        if self._reload_requested:
+            self.reload()
+        elif self.credentials_file:
+            now = time.monotonic()
+            if now >= self._next_check:
+                self._next_check = now + self.check_interval
+                if self._file_signature() != self._snapshot.signature:
+                    self.reload()
+        return self._snapshot
+
+    def usernames(self):
+        return self.current().usernames
+
+    def verify(self, username, password):
+        snapshot = self.current()
+        key = hmac.new(self._cache_key, f"{username}\0{password}".encode('utf-8'), hashlib.sha256).digest()
+
+        with self._cache_lock:
+            cached = snapshot.cache.get(key)
+            if cached is not None:
+                snapshot.cache.move_to_end(key)
+                return cached
+
+        record = snapshot.records.get(username)
+        salt, expected, iterations = record or snapshot.dummy
+        result = hmac.compare_digest(_derive(password, salt, iterations), expected) and record is not None
+
+        with self._cache_lock:
+            snapshot.cache[key] = result
+            if len(snapshot.cache) > self.cache_size:
+                snapshot.cache.popitem(last=False)
+        return result
+
+
+def _install_sighup(registry):
+    # Faqat asosiy oqimda va boshqa ishlovchi bo'lmasa (gunicorn master HUP ni o'zi boshqaradi)
+    if not hasattr(signal, 'SIGHUP') or threading.current_thread() is not threading.main_thread():
+        return False
+    if signal.getsignal(signal.SIGHUP) not in (signal.SIG_DFL, None):
+        return False
+    signal.signal(signal.SIGHUP, lambda signum, frame: registry.request_reload())
+    return True
+
+
+def init_app(app):
+    registry = CredentialRegistry(
+        credentials_file=app.config.get('ADMIN_CREDENTIALS_FILE'),
+        iterations=app.config.get('ADMIN_PASSWORD_ITERATIONS', DEFAULT_ITERATIONS),
+        cache_size=app.config.get('ADMIN_VERIFY_CACHE_SIZE', 256),
+        check_interval=app.config.get('ADMIN_CREDENTIALS_CHECK_INTERVAL', 5.0)
+    )
+    app.extensions['admin_credentials'] = registry
+    _install_sighup(registry)
+    return registry
+
+
+def get_registry():
+    return current_app.extensions['admin_credentials']
+
+
+if __name__ == '__main__':
+    import sys
+    import getpass
+
+    if len(sys.argv) != 2:
+        print("Foydalanish: python auth.py <login>")
+        sys.exit(1)
+
+    password = getpass.getpass('Parol: ')
+    if password != getpass.getpass('Parol (takror): '):
+        print("❌ Parollar mos emas")
+        sys.exit(1)
+    print(f"{sys.argv[1]}:{hash_password(password)}")
@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+"""
+Yuklama/benchmark skripti
+users, login_attempts va cleanup_logs jadvallarini berilgan hajmda to'ldirib,
+asosiy route'larni parallel so'rovlar bilan o'lchaydi va natijani JSON qilib chiqaradi:
+p50/p95/p99 kechikish, throughput, so'rov boshiga SQL soni va eng yuqori RSS.
+
+    python benchmark.py --sizes 1k,100k --concurrency 8 --requests 200
+    python benchmark.py --database postgresql://localhost/hotel_bench --sizes 1M -o bench.json
+    python benchmark.py --sizes 100k --cleanup-under-load --routes api_stats --skip-cleanup
+
+Diqqat: --database bazasidagi jadvallar tozalanadi va qayta to'ldiriladi.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import resource
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+SIZE_ALIASES = {'k': 1000, 'm': 1000000}
+SEED_CHUNK = 10000
+
+# (nomi, metod, yo'l)
+ROUTES = [
+    ('dashboard', 'GET', '/dashboard'),
+    ('api_users', 'GET', '/api/users'),
+    ('api_users_page', 'GET', '/api/users?limit=100'),
+    ('api_stats', 'GET', '/api/stats'),
+    ('login_failed', 'POST', '/login'),
+]
+
+
+def parse_size(text):
+    text = text.strip().lower()
+    if text[-1] in SIZE_ALIASES:
+        return int(float(text[:-1]) * SIZE_ALIASES[text[-1]])
+    return int(text)
+
+
+def percentile(values, percent):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def peak_rss_mb():
+    # Linux: kilobayt, macOS: bayt
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / 1024 / (1024 if sys.platform == 'darwin' else 1), 1)
+
+
+# ============================================
+# SQL SO'ROVLARNI SANASH
+# ============================================
+class QueryCounter:
+    """before_cursor_execute hodisasi - joriy oqimdagi so'rovlar soni"""
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+
+        self._local = threading.local()
+        event.listen(engine, 'before_cursor_execute', self._on_execute)
+
+    def _on_execute(self, *args):
+        self._local.count = getattr(self._local, 'count', 0) + 1
+
+    def reset(self):
+        self._local.count = 0
+
+    @property
+    def count(self):
+        return getattr(self._local, 'count', 0)
+
+
+# ============================================
+# MA'LUMOTLAR BILAN TO'LDIRISH
+# ============================================
+def seed(app, size):
+    """Jadvallarni tozalab, size ta foydalanuvchi va login urinishi bilan to'ldirish"""
+    from app import db, User, LoginAttempt, CleanupLog
+
+    rng = random.Random(size)
+    now = datetime.utcnow()
+
+    with app.app_context():
+        for model in (LoginAttempt, CleanupLog, User):
+            db.session.query(model).delete()
+        db.session.commit()
+
+        users_table = User.__table__
+        attempts_table = LoginAttempt.__table__
+        logs_table = CleanupLog.__table__
+
+        for start in range(0, size, SEED_CHUNK):
+            end = min(size, start + SEED_CHUNK)
+            db.session.execute(users_table.insert(), [
+                {
+                    'full_name': f'Mehmon {i}',
+                    'room_number': f'R{i:07d}',
+                    'created_at': now - timedelta(minutes=rng.randint(0, 60 * 24 * 30)),
+                    'last_active_at': now - timedelta(minutes=rng.randint(0, 60 * 24 * 14)),
+                }
+                for i in range(start, end)
+            ])
+            db.session.execute(attempts_table.insert(), [
+                {
+                    'username': rng.choice(('admin', 'manager', 'guest')),
+                    'ip_address': f'192.168.{rng.randint(0, 255)}.{rng.randint(0, 255)}',
+                    'attempt_time': now - timedelta(minutes=rng.randint(0, 60 * 24 * 60)),
+                    'successful': rng.random() < 0.7,
+                }
+                for _ in range(start, end)
+            ])
+            db.session.commit()
+
+        log_count = max(10, size // 100)
+        db.session.execute(logs_table.insert(), [
+            {
+                'cleanup_time': now - timedelta(days=7 * i),
+                'records_deleted': rng.randint(0, size),
+                'status': 'success',
+                'details': 'benchmark',
+            }
+            for i in range(log_count)
+        ])
+        db.session.commit()
+
+    return {'users': size, 'login_attempts': size, 'cleanup_logs': log_count}
+
+
+# ============================================
+# ROUTE'LARNI O'LCHASH
+# ============================================
+def bench_route(app, counter, method, path, total_requests, concurrency):
+    latencies = []
+    query_counts = []
+    statuses = {}
+    lock = threading.Lock()
+    local = threading.local()
+
+    def client():
+        if not hasattr(local, 'client'):
+            local.client = app.test_client()
+            # POST /login sessiyasiz bo'lishi kerak, aks holda dashboard'ga yo'naltiriladi
+            if method != 'POST':
+                with local.client.session_transaction() as sess:
+                    sess['user_id'] = 'benchmark'
+                    sess['username'] = 'benchmark'
+        return local.client
+
+    def one_request(number):
+        test_client = client()
+        counter.reset()
+        started = time.perf_counter()
+        if method == 'POST':
+            # Har xil IP - limiter bloklamasin, parol tekshiruvi o'lchansin
+            response = test_client.post(
+                path,
+                data={'username': 'admin', 'password': 'wrong'},
+                environ_base={'REMOTE_ADDR': f'10.{number // 65536 % 256}.{number // 256 % 256}.{number % 256}'}
+            )
+        else:
+            response = test_client.get(path)
+        response.get_data()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        with lock:
+            latencies.append(elapsed_ms)
+            query_counts.append(counter.count)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one_request, range(total_requests)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        'requests': total_requests,
+        'concurrency': concurrency,
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+        'max_ms': round(max(latencies), 2),
+        'throughput_rps': round(total_requests / elapsed, 1),
+        'queries_per_request': round(sum(query_counts) / len(query_counts), 2),
+        'statuses': {str(code): count for code, count in statuses.items()},
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def bench_cleanup(app, counter):
+    """cleanup.main(force=True) - bir marta (ma'lumotlarni o'chiradi)"""
+    import cleanup
+
+    with app.app_context():
+        counter.reset()
+        started = time.perf_counter()
+        result = cleanup.main(force=True)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+    return {
+        'elapsed_ms': round(elapsed_ms, 2),
+        'deleted': result.get('deleted', 0),
+        'batches': result.get('batches'),
+        'queries': counter.count,
+        'success': result.get('success', False),
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def bench_cleanup_under_load(app, counter, concurrency):
+    """cleanup.main(force=True) ishlayotganda /api/stats va boshqalarni to'xtovsiz so'rash.
+    O'quvchilar bloklanmasligi kerak: 200 dan boshqa javob yoki xatolik - muvaffaqiyatsiz"""
+    import cleanup
+
+    paths = ['/api/stats', '/api/users?limit=100', '/api/stats']
+    latencies = []
+    statuses = {}
+    errors = []
+    lock = threading.Lock()
+    done = threading.Event()
+    result = {}
+
+    def run_cleanup():
+        started = time.perf_counter()
+        try:
+            with app.app_context():
+                result.update(cleanup.main(force=True))
+        except Exception as e:
+            with lock:
+                errors.append(f"cleanup: {e}")
+        finally:
+            result['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 2)
+            done.set()
+
+    def reader(number):
+        test_client = app.test_client()
+        with test_client.session_transaction() as sess:
+            sess['user_id'] = 'benchmark'
+            sess['username'] = 'benchmark'
+        index = number
+        while not done.is_set():
+            path = paths[index % len(paths)]
+            index += 1
+            started = time.perf_counter()
+            try:
+                response = test_client.get(path)
+                response.get_data()
+                code = response.status_code
+            except Exception as e:
+                code = 'exception'
+                with lock:
+                    errors.append(f"{path}: {e}")
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            with lock:
+                latencies.append(elapsed_ms)
+                statuses[code] = statuses.get(code, 0) + 1
+
+    def writer():
+        # Tozalash vaqtida login urinishlari ham yoziladi (yozuvchilar navbati)
+        test_client = app.test_client()
+        number = 0
+        while not done.is_set():
+            number += 1
+            response = test_client.post(
+                '/login',
+                data={'username': 'admin', 'password': 'wrong'},
+                environ_base={'REMOTE_ADDR': f'10.99.{number // 256 % 256}.{number % 256}'}
+            )
+            with lock:
+                key = f"login_{response.status_code}"
+                statuses[key] = statuses.get(key, 0) + 1
+
+    threads = [threading.Thread(target=reader, args=(number,)) for number in range(concurrency)]
+    threads.append(threading.Thread(target=writer))
+    for thread in threads:
+        thread.start()
+    run_cleanup()
+    for thread in threads:
+        thread.join()
+
+    failed = sum(count for code, count in statuses.items() if code not in (200, 'login_200'))
+    return {
+        'cleanup_ms': result.get('elapsed_ms'),
+        'deleted': result.get('deleted', 0),
+        'batches': result.get('batches'),
+        'reads': len(latencies),
+        'p50_ms': round(percentile(latencies, 50), 2) if latencies else None,
+        'p99_ms': round(percentile(latencies, 99), 2) if latencies else None,
+        'max_ms': round(max(latencies), 2) if latencies else None,
+        'statuses': {str(code): count for code, count in statuses.items()},
+        'errors': errors[:20],
+        'ok': not errors and not failed and result.get('success', False),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Endpoint benchmark")
+    parser.add_argument('--sizes', default='1k', help="Vergul bilan: 1k,100k,1M")
+    parser.add_argument('--database', help="Baza URL (standart: vaqtinchalik SQLite fayl)")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=200, help="Har bir route uchun so'rovlar soni")
+    parser.add_argument('--routes', help="Faqat shu route'lar (vergul bilan), masalan api_stats,dashboard")
+    parser.add_argument('--skip-cleanup', action='store_true', help="cleanup.main() ni o'lchamaslik")
+    parser.add_argument('--cleanup-under-load', action='store_true',
+                        help="Tozalash vaqtida /api/stats ni so'rash (xatolik bo'lsa chiqish kodi 1)")
+    parser.add_argument('-o', '--output', help="JSON natija fayli (standart: stdout)")
+    args = parser.parse_args()
+
+    database = args.database or 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='hotel-bench-'), 'bench.db')
+    os.environ['DATABASE_URL'] = database
+    os.environ.setdefault('FLASK_CONFIG', 'production')
+    os.environ.setdefault('SCHEDULER_ENABLED', '0')
+
+    from app import app, db
+
+    with app.app_context():
+        counter = QueryCounter(db.engine)
+        database_url = db.engine.url.render_as_string(hide_password=True)
+
+    selected = set(args.routes.split(',')) if args.routes else None
+    report = {
+        'started_at': datetime.utcnow().isoformat(timespec='seconds'),
+        'database': database_url,
+        'python': sys.version.split()[0],
+        'runs': [],
+    }
+
+    for size_text in args.sizes.split(','):
+        size = parse_size(size_text)
+        print(f"🌱 {size} ta qator bilan to'ldirilmoqda...", file=sys.stderr)
+        seed_started = time.perf_counter()
+        seeded = seed(app, size)
+
+        run = {
+            'size': size,
+            'seeded': seeded,
+            'seed_seconds': round(time.perf_counter() - seed_started, 2),
+            'routes': {},
+        }
+        for name, method, path in ROUTES:
+            if selected and name not in selected:
+                continue
+            print(f"⏱️  {name} ({size})", file=sys.stderr)
+            run['routes'][name] = bench_route(app, counter, method, path, args.requests, args.concurrency)
+
+        if not args.skip_cleanup:
+            print(f"🧹 cleanup.main() ({size})", file=sys.stderr)
+            run['cleanup'] = bench_cleanup(app, counter)
+
+        if args.cleanup_under_load:
+            print(f"🔥 cleanup + /api/stats yuklamasi ({size})", file=sys.stderr)
+            seed(app, size)
+            run['cleanup_under_load'] = bench_cleanup_under_load(app, counter, args.concurrency)
+
+        report['runs'].append(run)
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(output + '\n', encoding='utf-8')
+    else:
+        print(output)
+
+    if any(not run['cleanup_under_load']['ok'] for run in report['runs'] if 'cleanup_under_load' in run):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,15 @@
 #!/usr/bin/env python3
 """
 Haftalik avtomatik tozalash skripti
-Har dushanba Moskva vaqti bilan 00:00 da ishga tushadi
+Har dushanba Moskva vaqti bilan 00:00 da ishga tushadi (CLEANUP_SCHEDULE).
+Kechikib ishga tushsa ham o'tkazib yuborilgan tozalash bajariladi;
+--force - jadvalga qaramasdan darhol tozalash.
 """
 
 import os
 import sys
+import json
+import time
 import logging
 from datetime import datetime, timedelta
 from pathlib import Path
@@ -13,136 +17,364 @@ from pathlib import Path
 # Loyiha yo'lini qo'shish
 sys.path.insert(0, str(Path(__file__).parent))
 
+import scheduler
+
 # Log konfiguratsiyasi
 log_file = Path(__file__).parent / 'cleanup.log'
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(log_file, encoding='utf-8'),
-        logging.StreamHandler()
-    ]
-)
 
 logger = logging.getLogger(__name__)
 
-def check_moscow_time():
-    """Moskva vaqti bilan dushanba 00:00 ekanligini tekshirish"""
-    try:
-        import pytz
-        # Agar pytz mavjud bo'lsa
-        moscow_tz = pytz.timezone('Europe/Moscow')
-        moscow_time = datetime.now(moscow_tz)
-        
-        # Dushanba (0 = dushanba) va soat 00:00-00:10 orasida
-        is_monday = moscow_time.weekday() == 0
-        is_midnight = moscow_time.hour == 0 and moscow_time.minute < 10
-        
-        logger.info(f"⏰ Moskva vaqti: {moscow_time.strftime('%Y-%m-%d %H:%M:%S')}")
-        logger.info(f"📅 Dushanba: {is_monday}, 00:00: {is_midnight}")
-        
-        return is_monday and is_midnight
-    except ImportError:
-        # Agar pytz mavjud bo'lmasa, UTC da hisoblaymiz (Moskva = UTC+3)
-        utc_time = datetime.utcnow()
-        # UTC 21:00 = Moskva 00:00 (oldingi kunning)
-        is_sunday = utc_time.weekday() == 6  # 6 = yakshanba
-        is_2100_utc = utc_time.hour == 21 and utc_time.minute < 10
-        
-        logger.info(f"⏰ UTC vaqti: {utc_time.strftime('%Y-%m-%d %H:%M:%S')}")
-        logger.info(f"📅 Yakshanba 21:00 UTC: {is_sunday and is_2100_utc}")
+def setup_logging():
+    """Skript sifatida ishga tushganda log faylini sozlash
+    (app.py dan import qilinganda veb-ilova loglariga tegmaydi)"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler(log_file, encoding='utf-8'),
+            logging.StreamHandler()
+        ]
+    )
+
+# Bo'lak vaqtlaridan nechtasini CleanupLog da saqlash
+RECENT_TIMINGS_LIMIT = 20
+
+def _record_batch_timing(log, rows, elapsed_ms):
+    """Bo'lak vaqtini CleanupLog.batch_timings (JSON) ga qo'shish"""
+    timings = json.loads(log.batch_timings) if log.batch_timings else {
+        'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'recent': []
+    }
+    timings['count'] += 1
+    timings['total_ms'] = round(timings['total_ms'] + elapsed_ms, 2)
+    timings['max_ms'] = round(max(timings['max_ms'], elapsed_ms), 2)
+    timings['recent'] = (timings['recent'] + [[rows, round(elapsed_ms, 2)]])[-RECENT_TIMINGS_LIMIT:]
+    log.batch_timings = json.dumps(timings)
+
+def run_cleanup(status='success', details=None, batch_size=None, pause=None, policy=None, building=None, run_id=None):
+    """Foydalanuvchilarni id bo'yicha bo'laklab (keyset) o'chirish.
+    
+    Har bir bo'lak alohida tranzaksiyada commit qilinadi, shuning uchun
+    users jadvali qulflari qisqa vaqt ushlanadi. Jarayon uzilib qolsa,
+    'running' holatidagi CleanupLog yozuvidan (o'sha siyosat bilan) davom ettiriladi.
+    
+    policy - policies.py dagi siyosat ('all', 'inactive:7', ...),
+    berilmasa CLEANUP_POLICY ishlatiladi.
+    details - yakuniy izoh, '{deleted}' o'rniga o'chirilganlar soni qo'yiladi.
+    building - faqat shu bino (partitions.py); None - butun jadval.
+    run_id - bitta ishga tushirishdagi binolar yozuvlarini bog'laydi.
+    Ilova konteksti ichida chaqirilishi kerak.
+    """
+    from flask import current_app
+    from models import db, User, CleanupLog
+    from metrics import cleanup_phase
+    from policies import parse_policy
+    from sqlite_mode import checkpoint
+    
+    if batch_size is None:
+        batch_size = current_app.config.get('CLEANUP_BATCH_SIZE', 1000)
+    if pause is None:
+        pause = current_app.config.get('CLEANUP_BATCH_PAUSE', 0)
+    
+    # 1. Uzilib qolgan tozalashni topish yoki yangisini boshlash
+    log = CleanupLog.query.filter_by(status='running', building=building).order_by(CleanupLog.id.desc()).first()
+    resumed = log is not None
+    
+    partition = User.building == building if building is not None else db.true()
+    label = f"[{building}] " if building is not None else ''
+    
+    if resumed:
+        logger.info(f"🔁 {label}Uzilib qolgan tozalash davom ettirilmoqda (log ID: {log.id}, id > {log.last_user_id})")
+        # Davom ettirgan ishga tushirishga bog'lash (jobs.job_status va run_id bo'yicha yig'indilar)
+        if run_id is not None and log.run_id != run_id:
+            log.run_id = run_id
+            db.session.commit()
+    else:
+        log = CleanupLog(
+            cleanup_time=datetime.utcnow(),
+            records_deleted=0,
+            status='running',
+            policy=parse_policy(policy or current_app.config.get('CLEANUP_POLICY')).spec,
+            building=building,
+            run_id=run_id,
+            last_user_id=0,
+            max_user_id=db.session.query(db.func.max(User.id)).filter(partition).scalar() or 0,
+            batches_done=0
+        )
+        db.session.add(log)
+        db.session.commit()
+    
+    max_id = log.max_user_id or 0
+    # Vaqtga bog'liq siyosatlar boshlanish vaqtiga nisbatan hisoblanadi (davom ettirishda ham bir xil)
+    criterion = db.and_(parse_policy(log.policy).criterion(now=log.cleanup_time), partition)
+    
+    # Arxiv - o'chirishdan oldin to'liq yoziladi; davom ettirishda qayta yozilmaydi
+    if current_app.config.get('CLEANUP_ARCHIVE_ENABLED', True) and not log.archive_path:
+        from archive import archive_cleanup
         
-        return is_sunday and is_2100_utc  # Yakshanba 21:00 UTC = Dushanba 00:00 MSK
+        with cleanup_phase('archive'):
+            archive_cleanup(log, criterion)
+    
+    # 2. O'chirish - tozalash boshlanganidan keyin qo'shilganlarga tegilmaydi
+    with cleanup_phase('delete'):
+        if batch_size <= 0:
+            started = time.perf_counter()
+            deleted = User.query.filter(criterion, User.id <= max_id).delete(synchronize_session=False)
+            log.records_deleted += deleted
+            log.last_user_id = max_id
+            log.batches_done = (log.batches_done or 0) + 1
+            _record_batch_timing(log, deleted, (time.perf_counter() - started) * 1000)
+            db.session.commit()
+        else:
+            while (log.last_user_id or 0) < max_id:
+                started = time.perf_counter()
+                last_id = log.last_user_id or 0
+            
+                # Bo'lakning yuqori chegarasi: navbatdagi batch_size-chi id
+                upper_id = db.session.query(User.id).filter(
+                    criterion,
+                    User.id > last_id,
+                    User.id <= max_id
+                ).order_by(User.id).offset(batch_size - 1).limit(1).scalar()
+                if upper_id is None:
+                    upper_id = max_id
+            
+                deleted = User.query.filter(
+                    criterion,
+                    User.id > last_id,
+                    User.id <= upper_id
+                ).delete(synchronize_session=False)
+            
+                log.records_deleted += deleted
+                log.last_user_id = upper_id
+                log.batches_done = (log.batches_done or 0) + 1
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                _record_batch_timing(log, deleted, elapsed_ms)
+                db.session.commit()
+            
+                logger.info(f"🧹 {label}Bo'lak #{log.batches_done}: {deleted} ta o'chirildi ({elapsed_ms:.1f} ms), id <= {upper_id}")
+            
+                if pause and upper_id < max_id:
+                    time.sleep(pause)
+    
+    # 3. Yakunlash
+    with cleanup_phase('log_commit'):
+        log.status = status
+        log.finished_at = datetime.utcnow()
+        if details:
+            log.details = details.format(deleted=log.records_deleted)
+        db.session.commit()
+    
+    # SQLite: o'chirishlar yig'ilgan WAL faylini asosiy bazaga ko'chirish
+    # (PASSIVE - o'quvchilarni kutmaydi va bloklamaydi)
+    try:
+        checkpoint(db.engine)
+    except Exception as e:
+        logger.warning(f"⚠️  WAL checkpoint bajarilmadi: {e}")
+    
+    return {
+        'deleted': log.records_deleted,
+        'batches': log.batches_done,
+        'building': building,
+        'resumed': resumed,
+        'policy': log.policy,
+        'log_id': log.id
+    }
 
-def main():
-    """Asosiy tozalash funksiyasi"""
+def run_retention_step():
+    """login_attempts/cleanup_logs retention - xatolik asosiy tozalashni buzmaydi"""
     try:
-        from app import app, db, User, CleanupLog
+        from retention import run_retention
+        return run_retention()
+    except Exception as e:
+        logger.error(f"❌ Retention xatoligi: {e}", exc_info=True)
+        return {'error': str(e)}
+
+def run_partitioned_cleanup(buildings, run_id, **options):
+    """Har bir bino uchun run_cleanup() - CLEANUP_PARALLELISM ta oqimda.
+    Har bir oqim o'z ilova kontekstida ishlaydi (alohida sessiya va ulanish),
+    sekin bino boshqalarini ushlab turmaydi. Bino xatosi boshqalarini to'xtatmaydi;
+    uning 'running' yozuvi keyingi tozalashda davom ettiriladi."""
+    from concurrent.futures import ThreadPoolExecutor
+    from flask import current_app
+    from models import CleanupLog
+    
+    app = current_app._get_current_object()
+    partitions = list(buildings)
+    # Bo'linishdan oldin boshlangan (building NULL) tozalash avval yakunlanadi
+    if None not in partitions and CleanupLog.query.filter_by(status='running', building=None).first():
+        run_cleanup(building=None, run_id=run_id, **options)
+    
+    def run_partition(building):
+        with app.app_context():
+            try:
+                return run_cleanup(building=building, run_id=run_id, **options)
+            except Exception as e:
+                logger.error(f"❌ [{building}] tozalash xatoligi: {e}", exc_info=True)
+                return {'building': building, 'deleted': 0, 'batches': 0, 'error': str(e)}
+    
+    workers = max(1, min(app.config.get('CLEANUP_PARALLELISM', 4), len(partitions)))
+    if workers == 1:
+        return [run_partition(building) for building in partitions]
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='cleanup-partition') as pool:
+        return list(pool.map(run_partition, partitions))
+
+def run_weekly_cleanup(policy=None, status='success', details=None, run_id=None, buildings=None):
+    """Haftalik tozalash qadamlari (ilova konteksti va qulf ichida chaqiriladi).
+    Qo'lda tozalash (jobs.py) ham shu yerdan o'tadi: policy, status='manual',
+    o'z izohi va run_id (vazifa id si) bilan.
+    buildings - tozalanadigan binolar (None - hammasi)."""
+    import uuid
+    from models import db, User, CleanupLog
+    from metrics import cleanup_phase
+    from partitions import backfill_buildings, list_buildings
+    
+    logger.info("=" * 60)
+    logger.info("🚀 Haftalik tozalash jarayoni boshlandi")
+    logger.info(f"📍 Jadval: {scheduler.get_schedule().expression} (Moskva vaqti)")
+    logger.info(f"📅 Vaqt: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    run_id = run_id or uuid.uuid4().hex
+    
+    # 2. Joriy holatni yozib olish (bino belgilanmagan eski qatorlar ham bo'lakka tushsin)
+    backfill_buildings()
+    with cleanup_phase('count'):
+        total_users = User.query.count()
+    
+    if total_users == 0:
+        logger.info("ℹ️  Tozalash uchun foydalanuvchi yo'q")
+        # Bo'sh tozalash logi
+        log = CleanupLog(
+            cleanup_time=datetime.utcnow(),
+            records_deleted=0,
+            status='skipped',
+            details="Tozalash uchun foydalanuvchi yo'q",
+            run_id=run_id
+        )
+        db.session.add(log)
+        db.session.commit()
         
-        # 1. Avval Moskva vaqtini tekshiramiz
-        if not check_moscow_time():
-            logger.info("⏳ Tozalash vaqti emas (Moskva vaqti bilan dushanba 00:00 kerak)")
-            return {
-                'success': False,
-                'skipped': True,
-                'message': 'Tozalash vaqti emas. Moskva vaqti bilan dushanba 00:00 da ishlaydi.'
-            }
+        return {
+            'success': True,
+            'deleted': 0,
+            'retention': run_retention_step(),
+            'message': 'Tozalash uchum foydalanuvchi yo\'q'
+        }
+    
+    logger.info(f"📊 Tozalanadigan foydalanuvchilar: {total_users} ta")
+    
+    # 3. Oxirgi faollik bo'yicha statistikalar
+    week_ago = datetime.utcnow() - timedelta(days=7)
+    with cleanup_phase('count'):
+        active_users = User.query.filter(
+            User.last_active_at >= week_ago
+        ).count()
+    inactive_users = total_users - active_users
+    
+    logger.info(f"📈 Faol foydalanuvchilar (oxirgi 7 kun): {active_users} ta")
+    logger.info(f"📉 Faol bo'lmagan foydalanuvchilar: {inactive_users} ta")
+    
+    # 4. TOZALASH STRATEGIYASI (CLEANUP_POLICY):
+    # 'all' - barcha foydalanuvchilar, 'inactive:7' - faqat faol bo'lmaganlar,
+    # 'created_before:YYYY-MM-DD' - sanadan oldin qo'shilganlar (policies.py)
+    # Tozalash logi run_cleanup ichida yuritiladi va har bo'lakda saqlanadi -
+    # har bir bino uchun alohida yozuv, parallel
+    if buildings is None:
+        buildings = list_buildings()
+    logger.info(f"🏢 Binolar: {', '.join(str(building) for building in buildings)}")
+    results = run_partitioned_cleanup(
+        buildings,
+        run_id,
+        policy=policy,
+        status=status,
+        details=details or f"Moskva vaqti bilan avtomatik tozalash. Jami: {total_users} ta, o'chirildi: {{deleted}} ta, faollar: {active_users} ta"
+    )
+    deleted_count = sum(result['deleted'] for result in results)
+    errors = {str(result['building']): result['error'] for result in results if result.get('error')}
+    
+    # 5. Natijalarni log qilish
+    for result in results:
+        if not result.get('error'):
+            logger.info(f"📝 [{result['building']}] {result['deleted']} ta, {result['batches']} bo'lak (log ID: {result['log_id']}, siyosat: {result['policy']})")
+    if errors:
+        logger.error(f"❌ Xatolik bo'lgan binolar: {', '.join(errors)}")
+    else:
+        logger.info(f"✅ MUVAFFAQIYATLI! {deleted_count} ta foydalanuvchi o'chirildi ({len(results)} ta bino)")
+    
+    # 6. Eski login urinishlari va tozalash loglarini ixchamlash
+    retention = run_retention_step()
+    logger.info("=" * 60)
+    
+    return {
+        'success': not errors,
+        'deleted': deleted_count,
+        'total_before': total_users,
+        'active_users': active_users,
+        'inactive_users': inactive_users,
+        'batches': sum(result['batches'] for result in results),
+        'resumed': any(result.get('resumed') for result in results),
+        'run_id': run_id,
+        'partitions': {
+            str(result['building']): {key: result.get(key) for key in ('deleted', 'batches', 'log_id', 'error')}
+            for result in results
+        },
+        'retention': retention,
+        'error': '; '.join(f"{building}: {error}" for building, error in errors.items()) or None,
+        'message': f'{deleted_count} ta foydalanuvchi o\'chirildi'
+    }
+
+def get_cleanup_app(app=None):
+    """Berilgan yoki joriy ilova; yo'q bo'lsa yengil ilova (veb-ilova import qilinmaydi)"""
+    from flask import current_app, has_app_context
+    
+    if app is not None:
+        return app
+    if has_app_context():
+        return current_app._get_current_object()
+    
+    from models import create_db_app
+    return create_db_app()
+
+def main(force=False, app=None, **options):
+    """Asosiy tozalash funksiyasi
+    
+    CLEANUP_SCHEDULE (yoki binoning CLEANUP_PARTITION_SCHEDULES dagi jadvali)
+    bo'yicha oxirgi rejalashtirilgan vaqtdan keyin tozalanmagan binolar
+    tozalanadi (kechikkan cron ham haftani o'tkazib yubormaydi).
+    Bir vaqtda faqat bitta jarayon bajaradi. force=True - jadvalga qaramasdan barcha binolar.
+    app - veb-ilova ichidan (scheduler, jobs) chaqirilganda uning o'zi.
+    options - run_weekly_cleanup() ga: policy, status, details, run_id.
+    """
+    try:
+        from models import db, CleanupLog
         
+        app = get_cleanup_app(app)
         with app.app_context():
-            logger.info("=" * 60)
-            logger.info("🚀 Haftalik tozalash jarayoni boshlandi")
-            logger.info("📍 Moskva vaqti bilan dushanba 00:00")
-            logger.info(f"📅 Vaqt: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-            
-            # 2. Joriy holatni yozib olish
-            total_users = User.query.count()
+            owner = scheduler.lock_owner()
             
-            if total_users == 0:
-                logger.info("ℹ️  Tozalash uchun foydalanuvchi yo'q")
-                # Bo'sh tozalash logi
-                log = CleanupLog(
-                    cleanup_time=datetime.utcnow(),
-                    records_deleted=0,
-                    status='skipped',
-                    details="Tozalash uchun foydalanuvchi yo'q"
-                )
-                db.session.add(log)
-                db.session.commit()
-                
+            if not scheduler.acquire_lock(scheduler.CLEANUP_LOCK, owner, app.config.get('SCHEDULER_LOCK_TTL', 7200)):
+                logger.info("🔒 Tozalash boshqa jarayonda bajarilmoqda")
                 return {
-                    'success': True,
-                    'deleted': 0,
-                    'message': 'Tozalash uchum foydalanuvchi yo\'q'
+                    'success': False,
+                    'skipped': True,
+                    'message': 'Tozalash boshqa jarayonda bajarilmoqda.'
                 }
             
-            logger.info(f"📊 Tozalanadigan foydalanuvchilar: {total_users} ta")
-            
-            # 3. Oxirgi faollik bo'yicha statistikalar
-            week_ago = datetime.utcnow() - timedelta(days=7)
-            active_users = User.query.filter(
-                User.last_active_at >= week_ago
-            ).count()
-            inactive_users = total_users - active_users
-            
-            logger.info(f"📈 Faol foydalanuvchilar (oxirgi 7 kun): {active_users} ta")
-            logger.info(f"📉 Faol bo'lmagan foydalanuvchilar: {inactive_users} ta")
-            
-            # 4. TOZALASH STRATEGIYASI:
-            # Variant A: Barcha foydalanuvchilarni o'chirish (hozir bu)
-            deleted_count = db.session.query(User).delete()
-            
-            # Variant B: Faqat faol bo'lmagan foydalanuvchilarni o'chirish
-            # uncomment qilish uchun:
-            # deleted_count = User.query.filter(
-            #     User.last_active_at < week_ago
-            # ).delete()
-            # logger.info(f"🗑️  Faqat faol bo'lmagan {deleted_count} ta foydalanuvchi o'chirildi")
-            
-            # 5. Tozalash logini yaratish
-            log = CleanupLog(
-                cleanup_time=datetime.utcnow(),
-                records_deleted=deleted_count,
-                status='success',
-                details=f"Moskva vaqti bilan avtomatik tozalash. Jami: {total_users} ta, o'chirildi: {deleted_count} ta, faollar: {active_users} ta"
-            )
-            db.session.add(log)
-            
-            # 6. O'zgarishlarni saqlash
-            db.session.commit()
-            
-            # 7. Natijalarni log qilish
-            logger.info(f"✅ MUVAFFAQIYATLI! {deleted_count} ta foydalanuvchi o'chirildi")
-            logger.info(f"📝 Log yozuvi qo'shildi (ID: {log.id})")
-            logger.info("=" * 60)
-            
-            return {
-                'success': True,
-                'deleted': deleted_count,
-                'total_before': total_users,
-                'active_users': active_users,
-                'inactive_users': inactive_users,
-                'message': f'{deleted_count} ta foydalanuvchi o\'chirildi'
-            }
+            try:
+                # 1. Avval jadval bo'yicha vaqti kelgan binolarni aniqlaymiz
+                from partitions import due_partitions
+                
+                buildings = None if force else due_partitions()
+                if buildings is not None and not buildings:
+                    next_fire = min(schedule.next_fire() for schedule in scheduler.all_schedules())
+                    logger.info(f"⏳ Tozalash vaqti emas. Keyingisi: {next_fire.strftime('%Y-%m-%d %H:%M')} UTC")
+                    return {
+                        'success': False,
+                        'skipped': True,
+                        'message': 'Tozalash vaqti emas. Moskva vaqti bilan dushanba 00:00 da ishlaydi.'
+                    }
+                
+                return run_weekly_cleanup(buildings=buildings, **options)
+            finally:
+                scheduler.release_lock(scheduler.CLEANUP_LOCK, owner)
             
     except Exception as e:
         logger.error(f"❌ TOZALASHDA XATOLIK: {str(e)}", exc_info=True)
@@ -167,12 +399,14 @@ def main():
         }
 
 if __name__ == '__main__':
+    setup_logging()
+    
     print("=" * 60)
     print("🏨 Yotoqxona Tozalash Skripti")
     print("📍 Moskva vaqti bilan har dushanba 00:00")
     print("=" * 60)
     
-    result = main()
+    result = main(force='--force' in sys.argv)
     
     print(f"\n📊 NATIJA:")
     if result.get('skipped'):
@@ -182,9 +416,15 @@ if __name__ == '__main__':
         print(f"🗑️  O'chirilgan foydalanuvchilar: {result.get('deleted', 0)} ta")
         print(f"📈 Jami (tozalashdan oldin): {result.get('total_before', 0)} ta")
         print(f"🏃 Faollar: {result.get('active_users', 0)} ta")
+        for building, partition in (result.get('partitions') or {}).items():
+            print(f"🏢 {building}: {partition['deleted']} ta ({partition['batches']} bo'lak)")
+        retention = result.get('retention') or {}
+        if 'error' not in retention:
+            print(f"🗄️  Ixchamlangan login urinishlari: {retention.get('login_attempts_compacted', 0)} ta ({retention.get('elapsed_ms', 0)} ms)")
     else:
         print(f"❌ XATOLIK")
-        print(f"⚠️  Xatolik: {result.get('error', 'Noma\'lum')}")
+        error_message = result.get('error', "Noma'lum")
+        print(f"⚠️  Xatolik: {error_message}")
     
     print("=" * 60)
     print(f"📁 Log fayli: {log_file}")
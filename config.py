@@ -3,6 +3,7 @@ Ilova sozlamalari fayli
 """
 
 import os
+from datetime import timedelta
 from dotenv import load_dotenv
 
 # .env faylidan o'qish
@@ -16,46 +17,160 @@ class Config:
     # Database konfiguratsiyasi
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL')
     
+    # O'qish replikalari (vergul bilan): dashboard va /api/* o'qishlari uchun
+    DATABASE_REPLICA_URLS = [url.strip() for url in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+    REPLICA_MAX_LAG_SECONDS = float(os.environ.get('REPLICA_MAX_LAG_SECONDS', '5'))
+    REPLICA_CHECK_INTERVAL = float(os.environ.get('REPLICA_CHECK_INTERVAL', '5'))
+    REPLICA_CONNECT_TIMEOUT = int(os.environ.get('REPLICA_CONNECT_TIMEOUT', '2'))
+    
+    # SQLite fayl bazasi (production rejimi): WAL, pragma'lar va yagona yozuvchi navbati
+    SQLITE_TUNED = os.environ.get('SQLITE_TUNED', '1') == '1'
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', '5000'))
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))
+    SQLITE_CACHE_SIZE_KB = int(os.environ.get('SQLITE_CACHE_SIZE_KB', str(64 * 1024)))
+    
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_ENGINE_OPTIONS = {
-        'pool_recycle': 300,
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', '300')),
         'pool_pre_ping': True,
-        'pool_size': 10,
-        'max_overflow': 20,
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', '10')),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', '20')),
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', '30')),
     }
     
     # Tozalash sozlamalari
-    CLEANUP_SCHEDULE = '0 0 * * 1'  # Har dushanba 00:00 (CRON format)
+    CLEANUP_SCHEDULE = os.environ.get('CLEANUP_SCHEDULE', '0 0 * * 1')  # Har dushanba 00:00 (CRON format)
+    CLEANUP_TIMEZONE = 'Europe/Moscow'
     CLEANUP_ENABLED = True
+    # Ichki rejalashtiruvchi (gunicorn workerlari ichida). Qulf tufayli
+    # tozalashni faqat bitta worker bajaradi; tashqi cron ham xavfsiz ishlaydi
+    SCHEDULER_ENABLED = os.environ.get('SCHEDULER_ENABLED', '0') == '1'
+    SCHEDULER_POLL_SECONDS = int(os.environ.get('SCHEDULER_POLL_SECONDS', '300'))
+    SCHEDULER_LOCK_TTL = int(os.environ.get('SCHEDULER_LOCK_TTL', '7200'))
+    # Tozalash siyosati: 'all', 'inactive:7', 'created_before:2026-01-01' (policies.py)
+    CLEANUP_POLICY = os.environ.get('CLEANUP_POLICY', 'all')
+    # Bo'laklab tozalash: bitta bo'lakdagi qatorlar soni (0 = bitta DELETE)
+    CLEANUP_BATCH_SIZE = int(os.environ.get('CLEANUP_BATCH_SIZE', '1000'))
+    # Bo'laklar orasidagi pauza (soniya) - dashboard so'rovlariga navbat berish uchun
+    CLEANUP_BATCH_PAUSE = float(os.environ.get('CLEANUP_BATCH_PAUSE', '0.05'))
+    # O'chirishdan oldingi arxiv (gzip NDJSON), standart: loyiha ichidagi archives/
+    CLEANUP_ARCHIVE_ENABLED = os.environ.get('CLEANUP_ARCHIVE_ENABLED', '1') == '1'
+    CLEANUP_ARCHIVE_DIR = os.environ.get('CLEANUP_ARCHIVE_DIR')
+    CLEANUP_ARCHIVE_CHUNK = int(os.environ.get('CLEANUP_ARCHIVE_CHUNK', '5000'))
+    # Binolar (partitions.py): room_number prefiksi -> bino, har bir bino parallel tozalanadi
+    BUILDING_PATTERN = os.environ.get('BUILDING_PATTERN', r'^([A-Za-z]+)')
+    DEFAULT_BUILDING = os.environ.get('DEFAULT_BUILDING', 'main')
+    CLEANUP_PARALLELISM = int(os.environ.get('CLEANUP_PARALLELISM', '4'))
+    # Binolarning o'z jadvali: 'A=0 0 * * 1; B=30 2 * * 1' (qolganlari CLEANUP_SCHEDULE)
+    CLEANUP_PARTITION_SCHEDULES = os.environ.get('CLEANUP_PARTITION_SCHEDULES', '')
+    
+    # Statik fayllar (assets.py): xeshli nomlar, gzip/brotli nusxalar va immutable kesh
+    ASSETS_FINGERPRINT = os.environ.get('ASSETS_FINGERPRINT', '1') == '1'
+    ASSETS_BUILD_ON_START = os.environ.get('ASSETS_BUILD_ON_START', '1') == '1'
     
     # Ilova sozlamalari
     DEBUG = os.environ.get('FLASK_DEBUG')
     HOST = '0.0.0.0'
     PORT = 5000
     
+    # Retention: login_attempts shu kundan eski yozuvlari soatlik jadvalga
+    # yig'ilib o'chiriladi, cleanup_logs dan faqat oxirgi N tasi qoldiriladi
+    LOGIN_ATTEMPT_RETENTION_DAYS = int(os.environ.get('LOGIN_ATTEMPT_RETENTION_DAYS', '30'))
+    CLEANUP_LOG_KEEP = int(os.environ.get('CLEANUP_LOG_KEEP', '500'))
+    
+    # Statistika keshi (soniya) - /api/stats va dashboard hisoblagichlari uchun
+    STATS_CACHE_TTL = float(os.environ.get('STATS_CACHE_TTL', '10'))
+    # ETag/304 va dashboard bo'laklari: versiyalar jarayonda shuncha soniya keshlanadi
+    # (boshqa worker/cron yozuvlari eng ko'pi shu kechikish bilan ko'rinadi)
+    DATA_VERSION_TTL = float(os.environ.get('DATA_VERSION_TTL', '2'))
+    DATA_FRAGMENT_TTL = float(os.environ.get('DATA_FRAGMENT_TTL', '60'))
+    
+    # Metrikalar: /api/metrics uchun Prometheus token va sekin so'rovlar chegarasi (0 = o'chiq)
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    METRICS_SLOW_QUERY_MS = float(os.environ.get('METRICS_SLOW_QUERY_MS', '0'))
+    
+    # /api/events (SSE): producer tekshiruv oralig'i, keep-alive, ulanish umri va mijozlar chegarasi
+    EVENTS_POLL_INTERVAL = float(os.environ.get('EVENTS_POLL_INTERVAL', '5'))
+    EVENTS_HEARTBEAT_SECONDS = int(os.environ.get('EVENTS_HEARTBEAT_SECONDS', '15'))
+    EVENTS_MAX_STREAM_SECONDS = int(os.environ.get('EVENTS_MAX_STREAM_SECONDS', '300'))
+    EVENTS_QUEUE_SIZE = 10
+    EVENTS_MAX_CLIENTS = int(os.environ.get('EVENTS_MAX_CLIENTS', '200'))
+    
     # Pagination
     USERS_PER_PAGE = 50
+    USERS_MAX_PAGE_SIZE = 1000
+    # /api/users?format=ndjson oqimida bitta so'rovda o'qiladigan qatorlar
+    USERS_STREAM_CHUNK_SIZE = int(os.environ.get('USERS_STREAM_CHUNK_SIZE', '1000'))
     LOGS_PER_PAGE = 20
+    # /api/users/bulk va ingest.py: bitta upsert bo'lagidagi qatorlar
+    USERS_BULK_BATCH_SIZE = int(os.environ.get('USERS_BULK_BATCH_SIZE', '5000'))
     
     # Session sozlamalari
-    PERMANENT_SESSION_LIFETIME = 3600  # 1 soat
+    PERMANENT_SESSION_LIFETIME = timedelta(
+        minutes=int(os.environ.get('SESSION_TIMEOUT_MINUTES', '30'))
+    )
+    
+    # Login cheklovlari
+    MAX_LOGIN_ATTEMPTS = int(os.environ.get('MAX_LOGIN_ATTEMPTS', '3'))
+    BLOCK_DURATION_MINUTES = int(os.environ.get('BLOCK_DURATION_MINUTES', '3'))
+    # Admin ro'yxati (auth.py): fayl o'zgarsa yoki SIGHUP da qayta yuklanadi
+    ADMIN_CREDENTIALS_FILE = os.environ.get('ADMIN_CREDENTIALS_FILE')
+    ADMIN_CREDENTIALS_CHECK_INTERVAL = float(os.environ.get('ADMIN_CREDENTIALS_CHECK_INTERVAL', '5'))
+    ADMIN_PASSWORD_ITERATIONS = int(os.environ.get('ADMIN_PASSWORD_ITERATIONS', '200000'))
+    ADMIN_VERIFY_CACHE_SIZE = int(os.environ.get('ADMIN_VERIFY_CACHE_SIZE', '256'))
+    # memory - har bir worker o'z hisobini yuritadi (bazaga so'rov yo'q)
+    # database - barcha workerlar login_attempts jadvalidan umumiy hisobni ko'radi
+    LOGIN_LIMITER_BACKEND = os.environ.get('LOGIN_LIMITER_BACKEND', 'memory')
+    
+    # Login urinishlarini buferlab yozish (bitta bulk INSERT)
+    LOGIN_LOG_BUFFERED = os.environ.get('LOGIN_LOG_BUFFERED', '1') == '1'
+    LOGIN_LOG_FLUSH_INTERVAL = float(os.environ.get('LOGIN_LOG_FLUSH_INTERVAL', '1.0'))
+    LOGIN_LOG_FLUSH_SIZE = int(os.environ.get('LOGIN_LOG_FLUSH_SIZE', '100'))
+    LOGIN_LOG_MAX_QUEUE = 10000
+    
+    # Heartbeat: last_active_at eng ko'p shuncha soniya kechikib yoziladi
+    HEARTBEAT_FLUSH_INTERVAL = float(os.environ.get('HEARTBEAT_FLUSH_INTERVAL', '30'))
+    HEARTBEAT_MAX_PENDING = int(os.environ.get('HEARTBEAT_MAX_PENDING', '50000'))
+    HEARTBEAT_TOKEN = os.environ.get('HEARTBEAT_TOKEN')
 
 class DevelopmentConfig(Config):
     """Rivojlanish muhiti"""
     DEBUG = True
     SQLALCHEMY_ECHO = True  # SQL so'rovlarni terminalda ko'rsatadi
+    # CSS/JS o'zgarishlari qayta ishga tushirmasdan ko'rinsin (/static/ dan)
+    ASSETS_FINGERPRINT = os.environ.get('ASSETS_FINGERPRINT', '0') == '1'
+    # Lokal ishlash uchun kichik pool
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        **Config.SQLALCHEMY_ENGINE_OPTIONS,
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', '2')),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', '3')),
+    }
 
 class ProductionConfig(Config):
     """Ishlab chiqarish muhiti"""
     DEBUG = False
     # Production uchun alohida database
     SQLALCHEMY_DATABASE_URI = os.environ.get('PRODUCTION_DATABASE_URL') or Config.SQLALCHEMY_DATABASE_URI
+    # Pool har bir gunicorn worker uchun alohida: jami ulanishlar =
+    # workerlar * (pool_size + max_overflow), baza max_connections dan oshmasin
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        **Config.SQLALCHEMY_ENGINE_OPTIONS,
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', '5')),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', '10')),
+    }
 
 class TestingConfig(Config):
     """Test muhiti"""
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    SQLALCHEMY_ENGINE_OPTIONS = {}
+    DATABASE_REPLICA_URLS = []
     WTF_CSRF_ENABLED = False
+    # Testlarda yozuvlar darhol ko'rinishi kerak
+    LOGIN_LOG_BUFFERED = False
+    DATA_VERSION_TTL = 0
+    ADMIN_PASSWORD_ITERATIONS = 1000
 
 # Konfiguratsiya obyekti
 config = {
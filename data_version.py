@@ -0,0 +1,202 @@
+"""
+Ma'lumotlar versiyasi, ETag va fragment keshi
+data_versions jadvalida har bir jadval ('users', 'cleanup_logs') uchun
+hisoblagich bor - shu jadvalga yozgan tranzaksiya uni o'sha tranzaksiya
+ichida oshiradi. Shuning uchun versiya barcha worker'lar va cron jarayonlari
+uchun umumiy.
+
+- /api/* JSON va dashboard HTML uchun ETag versiyalardan hisoblanadi;
+  If-None-Match mos kelsa view umuman chaqirilmaydi (304).
+- Dashboard'ning foydalanuvchilar jadvali va tozalash tarixi bo'laklari
+  versiya bo'yicha keshlanadi.
+- Versiyalarning o'zi jarayonda DATA_VERSION_TTL soniya keshlanadi (o'z
+  yozuvlaridan keyin darhol bekor qilinadi) - o'zgarmagan dashboard bazaga
+  umuman murojaat qilmaydi. Boshqa worker/cron yozuvlari shu muddat ichida
+  ko'rinadi.
+"""
+
+import time
+import hashlib
+import threading
+from functools import wraps
+
+from flask import current_app, request, session, make_response
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# Versiyasi yuritiladigan jadvallar
+SCOPES = ('users', 'cleanup_logs')
+
+_lock = threading.Lock()
+_cache = {'versions': None, 'expires_at': 0.0}
+_fragments = {}
+
+
+def current_versions():
+    """{'users': N, 'cleanup_logs': M} - jarayon keshi yoki bitta SELECT"""
+    now = time.monotonic()
+    with _lock:
+        if _cache['versions'] is not None and now < _cache['expires_at']:
+            return _cache['versions']
+
+    from models import db, DataVersion
+
+    # db.session orqali: @read_only route'da ma'lumot bilan bir xil manbadan
+    rows = db.session.execute(db.select(DataVersion.name, DataVersion.version)).all()
+    versions = {name: 0 for name in SCOPES}
+    versions.update({row.name: row.version for row in rows})
+
+    with _lock:
+        _cache['versions'] = versions
+        _cache['expires_at'] = now + current_app.config.get('DATA_VERSION_TTL', 2.0)
+    return versions
+
+
+def invalidate():
+    """O'z yozuvimizdan keyin versiyalarni qayta o'qish"""
+    with _lock:
+        _cache['versions'] = None
+        _cache['expires_at'] = 0.0
+
+
+def bump(conn, *scopes):
+    """Core yozuvlari uchun (engine.begin() bloki ichida) - versiyani oshirish"""
+    from models import DataVersion
+
+    for scope in scopes:
+        conn.execute(
+            DataVersion.__table__.update()
+            .where(DataVersion.name == scope)
+            .values(version=DataVersion.version + 1)
+        )
+
+
+def mark(db_session, *scopes):
+    """Raw cursor bilan yozilganda ORM hodisalari ishlamaydi - commit'da oshirish uchun belgilash"""
+    db_session.info.setdefault('data_version_dirty', set()).update(scopes)
+
+
+def seed(conn):
+    """Yetishmayotgan versiya qatorlarini yaratish (ensure_schema)"""
+    from models import DataVersion
+
+    existing = {row[0] for row in conn.execute(DataVersion.__table__.select().with_only_columns(DataVersion.name))}
+    missing = [{'name': scope, 'version': 1} for scope in SCOPES if scope not in existing]
+    if missing:
+        conn.execute(DataVersion.__table__.insert(), missing)
+
+
+# ============================================
+# ETAG VA FRAGMENTLAR
+# ============================================
+def make_etag(scopes, extra=''):
+    versions = current_versions()
+    from assets import asset_version
+
+    # Statik fayllar xeshi ham - yangi deploy'dan keyin HTML eski /assets/ manzillari bilan 304 bo'lmasin
+    parts = [request.full_path, session.get('username', ''), extra, asset_version()]
+    parts.extend(f"{scope}:{versions[scope]}" for scope in scopes)
+    return hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()[:20]
+
+
+def conditional(*scopes, ttl_config=None, vary=None):
+    """Versiya o'zgarmagan bo'lsa 304. ttl_config - vaqtga bog'liq javoblar
+    (masalan oxirgi 7 kun faollari) uchun shu sozlama soniyasida ETag almashadi.
+    vary - bazadan tashqari manbaga bog'liq qism uchun (masalan admin ro'yxati)
+    qiymati ETag ga qo'shiladigan funksiya."""
+    def decorator(view):
+        @wraps(view)
+        def decorated_function(*args, **kwargs):
+            # Flash xabarlari bir marta ko'rsatiladi - bunday sahifa keshlanmaydi
+            if session.get('_flashes'):
+                return view(*args, **kwargs)
+            try:
+                extra = ''
+                if ttl_config:
+                    extra = str(int(time.time() // max(current_app.config.get(ttl_config, 10), 1)))
+                if vary is not None:
+                    extra += f"|{vary()}"
+                etag = make_etag(scopes, extra)
+            except Exception:
+                # Versiya jadvali hali yo'q va h.k. - oddiy javob
+                return view(*args, **kwargs)
+
+            if etag in request.if_none_match:
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return decorated_function
+    return decorator
+
+
+def cached_fragment(name, scopes, render):
+    """render() natijasi versiyalar o'zgarguncha (eng ko'pi DATA_FRAGMENT_TTL soniya) qayta ishlatiladi"""
+    versions = current_versions()
+    key = tuple(versions[scope] for scope in scopes)
+    now = time.monotonic()
+    with _lock:
+        cached = _fragments.get(name)
+        if cached is not None and cached[0] == key and now < cached[2]:
+            return cached[1]
+
+    html = render()
+    with _lock:
+        _fragments[name] = (key, html, now + current_app.config.get('DATA_FRAGMENT_TTL', 60.0))
+    return html
+
+
+# ============================================
+# ORM YOZUVLARINI KUZATISH
+# ============================================
+def _table_name(obj):
+    return getattr(obj, '__tablename__', None)
+
+
+@event.listens_for(Session, 'after_flush')
+def _mark_on_flush(db_session, flush_context):
+    scopes = {
+        _table_name(obj)
+        for obj in list(db_session.new) + list(db_session.dirty) + list(db_session.deleted)
+    } & set(SCOPES)
+    if scopes:
+        mark(db_session, *scopes)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _mark_on_bulk(orm_execute_state):
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    name = getattr(getattr(orm_execute_state.statement, 'table', None), 'name', None)
+    if name in SCOPES:
+        mark(orm_execute_state.session, name)
+
+
+@event.listens_for(Session, 'before_commit')
+def _bump_on_commit(db_session):
+    # Kutilayotgan o'zgarishlar commit ichida flush qilinadi - avval belgilab olish uchun
+    db_session.flush()
+    scopes = db_session.info.pop('data_version_dirty', None)
+    if not scopes:
+        return
+    from models import db
+
+    # Versiya har doim asosiy bazada (replikaga yo'naltirilmasin)
+    bump(db_session.connection(bind_arguments={'bind': db.engine}), *sorted(scopes))
+    db_session.info['data_version_bumped'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_on_commit(db_session):
+    if db_session.info.pop('data_version_bumped', False):
+        invalidate()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _reset_on_rollback(db_session):
+    db_session.info.pop('data_version_dirty', None)
+    db_session.info.pop('data_version_bumped', None)
@@ -0,0 +1,174 @@
+"""
+Server-Sent Events (/api/events)
+Har bir worker'da bitta producer oqimi statistika snapshot'ini kuzatadi va
+o'zgarganda barcha obunachilarga tarqatadi - ochiq tablar soni bazaga
+tushadigan yukni oshirmaydi. Snapshot bekor qilinganda (tozalash, qo'lda
+tozalash, foydalanuvchi o'zgarishlari) producer darhol uyg'onadi.
+
+Har bir mijoz navbati cheklangan: sekin mijozda eski xabarlar tashlab
+yuboriladi (statistikada faqat oxirgi holat muhim).
+
+Diqqat: har bir ochiq ulanish bitta oqimni band qiladi - shuning uchun
+oqim EVENTS_MAX_STREAM_SECONDS dan keyin yopiladi (brauzer 'retry' bo'yicha
+qayta ulanadi) va gunicorn gthread worker'lari bilan ishga tushiriladi
+(gunicorn.conf.py).
+"""
+
+import os
+import json
+import time
+import queue
+import logging
+import threading
+
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+
+def build_stats_payload(snapshot):
+    """/api/stats bilan bir xil ko'rinish + tozalashlar soni"""
+    last_cleanup = snapshot['last_cleanup']
+    return {
+        'total_users': snapshot['total_users'],
+        'active_users': snapshot['active_users'],
+        'inactive_users': snapshot['inactive_users'],
+        'cleanup_count': snapshot['cleanup_count'],
+        'last_cleanup': last_cleanup['cleanup_time'].strftime('%Y-%m-%d %H:%M:%S') if last_cleanup else 'Hech qachon',
+        'records_deleted_last': last_cleanup['records_deleted'] if last_cleanup else 0,
+        'status': last_cleanup['status'] if last_cleanup else 'N/A'
+    }
+
+
+def format_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+class EventBroker:
+    """Bitta producer oqimi + obunachilarning cheklangan navbatlari"""
+
+    def __init__(self, app, poll_interval=5.0, queue_size=10, max_clients=200):
+        self.app = app
+        self.poll_interval = poll_interval
+        self.queue_size = queue_size
+        self.max_clients = max_clients
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._subscribers = set()
+        self._last_payload = None
+        self._thread = None
+        self._pid = None
+
+    def subscribe(self):
+        """Yangi obunachi navbati; limit to'lgan bo'lsa None"""
+        with self._lock:
+            if len(self._subscribers) >= self.max_clients:
+                return None
+            subscriber = queue.Queue(maxsize=self.queue_size)
+            self._subscribers.add(subscriber)
+        self._ensure_thread()
+        self._wakeup.set()
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def clients(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def latest(self):
+        return self._last_payload
+
+    def notify(self):
+        """Snapshot bekor qilindi - producer'ni darhol uyg'otish"""
+        self._wakeup.set()
+
+    def publish(self, message):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(message)
+            except queue.Full:
+                # Sekin mijoz: eng eski xabar o'rniga yangisi
+                try:
+                    subscriber.get_nowait()
+                except queue.Empty:
+                    pass
+                try:
+                    subscriber.put_nowait(message)
+                except queue.Full:
+                    pass
+
+    def _ensure_thread(self):
+        # gunicorn fork qilgandan keyin oqim yangi jarayonda qayta ishga tushiriladi
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='events-producer', daemon=True)
+            self._thread.start()
+
+    def poll(self):
+        """Snapshot o'zgargan bo'lsa 'stats' hodisasini tarqatish"""
+        from stats import get_stats_snapshot
+
+        with self.app.app_context():
+            payload = build_stats_payload(get_stats_snapshot())
+        if payload != self._last_payload:
+            self._last_payload = payload
+            self.publish(format_event('stats', payload))
+
+    def _run(self):
+        while True:
+            # Obunachi yo'q bo'lsa bazaga murojaat qilinmaydi
+            if self.clients():
+                try:
+                    self.poll()
+                except Exception:
+                    logger.exception("SSE producer xatoligi")
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+
+def stream(broker, subscriber, heartbeat_seconds=15, max_seconds=300):
+    """Mijozga yuboriladigan SSE oqimi: joriy holat, o'zgarishlar va keep-alive.
+    max_seconds dan keyin tugaydi - worker oqimi cheksiz band bo'lmasin."""
+    deadline = time.monotonic() + max_seconds
+    try:
+        yield "retry: 5000\n\n"
+        latest = broker.latest()
+        if latest is not None:
+            yield format_event('stats', latest)
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            try:
+                yield subscriber.get(timeout=min(heartbeat_seconds, remaining))
+            except queue.Empty:
+                yield ": keep-alive\n\n"
+    finally:
+        broker.unsubscribe(subscriber)
+
+
+def init_app(app):
+    from stats import add_invalidation_listener
+
+    broker = EventBroker(
+        app,
+        poll_interval=app.config.get('EVENTS_POLL_INTERVAL', 5.0),
+        queue_size=app.config.get('EVENTS_QUEUE_SIZE', 10),
+        max_clients=app.config.get('EVENTS_MAX_CLIENTS', 200)
+    )
+    app.extensions['event_broker'] = broker
+    add_invalidation_listener(broker.notify)
+    return broker
+
+
+def get_broker():
+    return current_app.extensions['event_broker']
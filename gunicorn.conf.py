@@ -0,0 +1,17 @@
+"""
+gunicorn sozlamalari (gunicorn app:app joriy papkadan o'zi o'qiydi)
+/api/events (SSE) ulanishi so'rov oqimini band qiladi - sync worker'da har bir
+ochiq tab butun worker'ni egallaydi. gthread worker'ida esa faqat bitta oqimni.
+Buyruq qatoridagi parametrlar (--workers, --bind, ...) bu fayldan ustun.
+"""
+
+import os
+import multiprocessing
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+workers = int(os.environ.get('WEB_CONCURRENCY', str(min(multiprocessing.cpu_count() * 2 + 1, 4))))
+# Har bir worker'dagi oqimlar: ochiq SSE tablar + oddiy so'rovlar.
+# DB pool (DB_POOL_SIZE + DB_MAX_OVERFLOW) oqimlar sonidan kam bo'lmasin
+threads = int(os.environ.get('GUNICORN_THREADS', '8'))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '60'))
@@ -0,0 +1,172 @@
+"""
+last_active_at yangilanishlarini birlashtirish (heartbeat)
+Har bir heartbeat faqat xotiradagi {room_number: vaqt} lug'atini yangilaydi;
+fon oqimi har HEARTBEAT_FLUSH_INTERVAL soniyada (eng ko'p eskirish muddati)
+hammasini bitta bulk UPDATE bilan yozadi. Heartbeatlar qancha ko'p kelmasin,
+bazaga yozish hajmi xonalar soniga bog'liq va deyarli o'zgarmas.
+Jarayon tugaganda qolganlari yoziladi.
+"""
+
+import os
+import hmac
+import atexit
+import logging
+import threading
+from datetime import datetime
+
+from flask import current_app, request, session
+
+logger = logging.getLogger(__name__)
+
+# Bitta UPDATE so'rovidagi xonalar (bind parametrlar chegarasi uchun)
+UPDATE_CHUNK = 500
+
+
+class HeartbeatBuffer:
+    """Xotiradagi touch lug'ati + fon oqimi"""
+
+    def __init__(self, app, flush_interval=30.0, max_pending=50000):
+        self.app = app
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._pending = {}
+        self._thread = None
+        self._pid = None
+        self._stopped = False
+
+    def touch(self, room_number, when=None):
+        """Faollikni yozib qo'yish - bir xona uchun faqat eng oxirgi vaqt saqlanadi"""
+        when = when or datetime.utcnow()
+        with self._lock:
+            previous = self._pending.get(room_number)
+            if previous is None or when > previous:
+                self._pending[room_number] = when
+            size = len(self._pending)
+        self._ensure_thread()
+        if size >= self.max_pending:
+            # Navbat chegarasi: fon oqimini kutmasdan shu yerda yozish (lug'at cheksiz o'smasin)
+            self.flush()
+
+    def pending(self):
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self):
+        """To'plangan vaqtlarni UPDATE bilan yozish. Yangilangan qatorlar soni."""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return 0
+
+            import data_version
+            from models import db
+            from stats import invalidate_stats
+
+            items = sorted(pending.items())
+            updated = 0
+            try:
+                with self.app.app_context():
+                    with db.engine.begin() as conn:
+                        for start in range(0, len(items), UPDATE_CHUNK):
+                            updated += _update_chunk(db, conn, items[start:start + UPDATE_CHUNK])
+                        data_version.bump(conn, 'users')
+            except Exception:
+                logger.exception("last_active_at yangilanishlarini saqlashda xatolik (%d ta)", len(items))
+                # Keyingi urinishda yoziladi - orada kelgan yangiroq vaqtlar ustun
+                with self._lock:
+                    for room_number, when in pending.items():
+                        if room_number not in self._pending or self._pending[room_number] < when:
+                            self._pending[room_number] = when
+                return 0
+
+            invalidate_stats()
+            data_version.invalidate()
+            return updated
+
+    def _ensure_thread(self):
+        # gunicorn fork qilgandan keyin oqim yangi jarayonda qayta ishga tushiriladi
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._stopped = False
+            self._thread = threading.Thread(target=self._run, name='heartbeat-writer', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stopped:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def stop(self):
+        """Oqimni to'xtatish va qolgan yozuvlarni saqlash"""
+        self._stopped = True
+        self._wakeup.set()
+        self.flush()
+
+
+def _update_chunk(db, conn, items):
+    """PostgreSQL: UPDATE ... FROM (VALUES ...), boshqalar: SET ... = CASE room_number ... END"""
+    from models import User
+
+    if conn.dialect.name == 'postgresql':
+        params = {}
+        values = []
+        for index, (room_number, when) in enumerate(items):
+            params[f'r{index}'] = room_number
+            params[f't{index}'] = when
+            values.append(f"(:r{index}, CAST(:t{index} AS timestamp))")
+        result = conn.execute(
+            db.text(
+                "UPDATE users SET last_active_at = v.ts "
+                f"FROM (VALUES {', '.join(values)}) AS v(room, ts) "
+                "WHERE users.room_number = v.room "
+                "AND (users.last_active_at IS NULL OR users.last_active_at < v.ts)"
+            ),
+            params
+        )
+        return result.rowcount
+
+    table = User.__table__
+    new_value = db.case(dict(items), value=table.c.room_number)
+    result = conn.execute(
+        table.update()
+        .where(
+            table.c.room_number.in_([room_number for room_number, _ in items]),
+            # PostgreSQL bilan bir xil: kechikkan flush vaqtni orqaga surmaydi
+            db.or_(table.c.last_active_at.is_(None), table.c.last_active_at < new_value)
+        )
+        .values(last_active_at=new_value)
+    )
+    return result.rowcount
+
+
+def is_authorized():
+    """Sessiya (admin) yoki HEARTBEAT_TOKEN bilan Bearer so'rov (xona qurilmalari uchun)"""
+    token = current_app.config.get('HEARTBEAT_TOKEN')
+    header = request.headers.get('Authorization', '')
+    if token and header.startswith('Bearer ') and hmac.compare_digest(header[7:].encode('utf-8'), token.encode('utf-8')):
+        return True
+    return 'user_id' in session
+
+
+def init_app(app):
+    buffer = HeartbeatBuffer(
+        app,
+        flush_interval=app.config.get('HEARTBEAT_FLUSH_INTERVAL', 30.0),
+        max_pending=app.config.get('HEARTBEAT_MAX_PENDING', 50000)
+    )
+    app.extensions['heartbeat_buffer'] = buffer
+    atexit.register(buffer.stop)
+    return buffer
+
+
+def get_buffer():
+    return current_app.extensions['heartbeat_buffer']
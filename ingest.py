@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Foydalanuvchilarni ommaviy yuklash (bulk ingestion)
+CSV yoki NDJSON oqim sifatida o'qiladi va room_number bo'yicha upsert qilinadi:
+yangi xona qo'shiladi, mavjud xonada full_name va last_active_at yangilanadi.
+
+- SQLite (va boshqalar): INSERT ... ON CONFLICT, executemany bilan bo'laklab
+- PostgreSQL: COPY vaqtinchalik staging jadvalga + INSERT ... ON CONFLICT
+
+Har bir bo'lak alohida commit qilinadi; natijada bo'laklar bo'yicha sonlar va xatolar.
+
+    python ingest.py mehmonlar.csv
+    cat mehmonlar.ndjson | python ingest.py - --format ndjson --batch-size 10000
+"""
+
+import io
+import sys
+import csv
+import json
+import time
+import logging
+import argparse
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ('csv', 'ndjson')
+
+# Javobda qaytariladigan qator xatolarining yuqori chegarasi
+MAX_REPORTED_ERRORS = 100
+
+
+# ============================================
+# OQIMNI O'QISH
+# ============================================
+def detect_format(content_type=None, filename=None):
+    """Content-Type yoki fayl kengaytmasidan format (standart: csv)"""
+    content_type = (content_type or '').lower()
+    filename = (filename or '').lower()
+    if 'ndjson' in content_type or 'jsonl' in content_type or filename.endswith(('.ndjson', '.jsonl')):
+        return 'ndjson'
+    return 'csv'
+
+
+def iter_records(stream, fmt='csv'):
+    """(qator raqami, dict) juftliklari - fayl butunlay xotiraga o'qilmaydi"""
+    if fmt not in FORMATS:
+        raise ValueError(f"Noma'lum format: {fmt} (csv yoki ndjson)")
+
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record
+        return
+
+    for line_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_number, e
+            continue
+        yield line_number, record
+
+
+def _parse_time(value):
+    if value in (None, ''):
+        return None
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value).strip().replace('Z', ''))
+
+
+def normalize(record, now):
+    """Bitta yozuvni tekshirish va users ustunlariga keltirish. Xato bo'lsa ValueError."""
+    if isinstance(record, Exception):
+        raise ValueError(f"JSON xatosi: {record}")
+    if not isinstance(record, dict):
+        raise ValueError("Yozuv obyekt bo'lishi kerak")
+
+    full_name = str(record.get('full_name') or '').strip()
+    room_number = str(record.get('room_number') or '').strip()
+    if not full_name:
+        raise ValueError("full_name bo'sh")
+    if not room_number:
+        raise ValueError("room_number bo'sh")
+    if len(full_name) > 100:
+        raise ValueError("full_name 100 belgidan uzun")
+    if len(room_number) > 10:
+        raise ValueError("room_number 10 belgidan uzun")
+
+    created_at = _parse_time(record.get('created_at')) or now
+    last_active_at = _parse_time(record.get('last_active_at')) or now
+    return {
+        'full_name': full_name,
+        'room_number': room_number,
+        'created_at': created_at,
+        'last_active_at': last_active_at
+    }
+
+
+# ============================================
+# UPSERT (dialektga mos)
+# ============================================
+def _existing_rooms(db, User, rooms):
+    return {
+        room for (room,) in db.session.query(User.room_number).filter(User.room_number.in_(rooms))
+    }
+
+
+def _upsert_generic(db, User, rows):
+    """INSERT ... ON CONFLICT (room_number) DO UPDATE - executemany bilan"""
+    table = User.__table__
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        return _upsert_fallback(db, User, rows)
+
+    existing = _existing_rooms(db, User, [row['room_number'] for row in rows])
+    statement = insert(table)
+    statement = statement.on_conflict_do_update(
+        index_elements=[table.c.room_number],
+        set_={
+            'full_name': statement.excluded.full_name,
+            'last_active_at': statement.excluded.last_active_at
+        }
+    )
+    db.session.execute(statement, rows)
+    return len(rows) - len(existing), len(existing)
+
+
+def _upsert_fallback(db, User, rows):
+    """ON CONFLICT bo'lmagan dialektlar: mavjudlarini UPDATE, qolganini INSERT"""
+    table = User.__table__
+    existing = _existing_rooms(db, User, [row['room_number'] for row in rows])
+    updates = [
+        {'b_room': row['room_number'], 'b_name': row['full_name'], 'b_active': row['last_active_at']}
+        for row in rows if row['room_number'] in existing
+    ]
+    inserts = [row for row in rows if row['room_number'] not in existing]
+
+    if updates:
+        db.session.execute(
+            table.update()
+            .where(table.c.room_number == db.bindparam('b_room'))
+            .values(full_name=db.bindparam('b_name'), last_active_at=db.bindparam('b_active')),
+            updates
+        )
+    if inserts:
+        db.session.execute(table.insert(), inserts)
+    return len(inserts), len(updates)
+
+
+def _upsert_postgres_copy(db, User, rows):
+    """COPY -> _users_staging (ON COMMIT DELETE ROWS) -> INSERT ... ON CONFLICT.
+    RETURNING (xmax = 0) yangi qo'shilgan qatorlarni ajratadi.
+    Drayverda copy_expert bo'lmasa (psycopg2 emas) - None."""
+    from data_version import mark
+    from partitions import building_for
+
+    connection = db.session.connection()
+    cursor = connection.connection.cursor()
+    if not hasattr(cursor, 'copy_expert'):
+        cursor.close()
+        return None
+    try:
+        cursor.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS _users_staging ("
+            " full_name varchar(100), room_number varchar(10),"
+            " created_at timestamp, last_active_at timestamp, building varchar(20)"
+            ") ON COMMIT DELETE ROWS"
+        )
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow([
+                row['full_name'], row['room_number'], row['created_at'].isoformat(), row['last_active_at'].isoformat(),
+                building_for(row['room_number'])
+            ])
+        buffer.seek(0)
+        cursor.copy_expert(
+            "COPY _users_staging (full_name, room_number, created_at, last_active_at, building) FROM STDIN WITH (FORMAT csv)",
+            buffer
+        )
+
+        cursor.execute(
+            "INSERT INTO users (full_name, room_number, created_at, last_active_at, building) "
+            "SELECT full_name, room_number, created_at, last_active_at, building FROM _users_staging "
+            "ON CONFLICT (room_number) DO UPDATE SET "
+            " full_name = EXCLUDED.full_name, last_active_at = EXCLUDED.last_active_at "
+            "RETURNING (xmax = 0)"
+        )
+        inserted = sum(1 for (is_new,) in cursor.fetchall() if is_new)
+    finally:
+        cursor.close()
+
+    # Raw cursor ORM hodisalarini chaqirmaydi - statistika keshi va versiya qo'lda
+    db.session.info['stats_dirty'] = True
+    mark(db.session, 'users')
+    return inserted, len(rows) - inserted
+
+
+def upsert_users(rows):
+    """Bitta bo'lakni yozish: (qo'shilgan, yangilangan)"""
+    from models import db, User
+
+    if db.engine.dialect.name == 'postgresql':
+        counts = _upsert_postgres_copy(db, User, rows)
+        if counts is not None:
+            return counts
+    return _upsert_generic(db, User, rows)
+
+
+# ============================================
+# YUKLASH
+# ============================================
+def ingest(stream, fmt='csv', batch_size=5000):
+    """Oqimni bo'laklab upsert qilish. Bo'lak xatosi keyingilarini to'xtatmaydi."""
+    from models import db
+
+    started = time.perf_counter()
+    now = datetime.utcnow()
+    report = {
+        'format': fmt,
+        'rows': 0,
+        'inserted': 0,
+        'updated': 0,
+        'rejected': 0,
+        'batches': [],
+        'errors': []
+    }
+
+    def add_error(line, message):
+        report['rejected'] += 1
+        if len(report['errors']) < MAX_REPORTED_ERRORS:
+            report['errors'].append({'line': line, 'error': message})
+
+    def flush(pending, first_line, last_line):
+        # Bo'lak ichida bir xil xona takrorlansa - oxirgisi qoladi
+        rows = list(pending.values())
+        batch = {'batch': len(report['batches']) + 1, 'lines': [first_line, last_line], 'rows': len(rows)}
+        batch_started = time.perf_counter()
+        try:
+            inserted, updated = upsert_users(rows)
+            db.session.commit()
+            batch.update(inserted=inserted, updated=updated)
+            report['inserted'] += inserted
+            report['updated'] += updated
+        except Exception as e:
+            db.session.rollback()
+            batch['error'] = str(e)
+            report['rejected'] += len(rows)
+            logger.error(f"❌ Bo'lak #{batch['batch']} yozilmadi: {e}")
+        batch['elapsed_ms'] = round((time.perf_counter() - batch_started) * 1000, 2)
+        report['batches'].append(batch)
+
+    pending = {}
+    first_line = last_line = None
+    for line_number, record in iter_records(stream, fmt):
+        report['rows'] += 1
+        try:
+            row = normalize(record, now)
+        except ValueError as e:
+            add_error(line_number, str(e))
+            continue
+
+        pending[row['room_number']] = row
+        first_line = first_line or line_number
+        last_line = line_number
+        if len(pending) >= batch_size:
+            flush(pending, first_line, last_line)
+            pending = {}
+            first_line = None
+
+    if pending:
+        flush(pending, first_line, last_line)
+
+    report['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 2)
+    return report
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Foydalanuvchilarni CSV/NDJSON dan yuklash")
+    parser.add_argument('path', help="Fayl yo'li yoki '-' (stdin)")
+    parser.add_argument('--format', choices=FORMATS, help="Standart: fayl kengaytmasidan")
+    parser.add_argument('--batch-size', type=int, help="Standart: USERS_BULK_BATCH_SIZE")
+    args = parser.parse_args()
+
+    from models import create_db_app
+
+    app = create_db_app()
+
+    fmt = args.format or detect_format(filename=args.path)
+    with app.app_context():
+        batch_size = args.batch_size or app.config.get('USERS_BULK_BATCH_SIZE', 5000)
+        if args.path == '-':
+            report = ingest(io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8-sig'), fmt, batch_size)
+        else:
+            with open(args.path, encoding='utf-8-sig', newline='') as stream:
+                report = ingest(stream, fmt, batch_size)
+
+    print(f"📥 O'qilgan qatorlar: {report['rows']}")
+    print(f"➕ Qo'shilgan: {report['inserted']}")
+    print(f"✏️  Yangilangan: {report['updated']}")
+    print(f"⚠️  Rad etilgan: {report['rejected']}")
+    for error in report['errors'][:10]:
+        print(f"   {error['line']}-qator: {error['error']}")
+    print(f"⏱️  Vaqt: {report['elapsed_ms']} ms ({len(report['batches'])} bo'lak)")
@@ -0,0 +1,192 @@
+"""
+Qo'lda tozalash - fon vazifasi (job)
+POST /api/cleanup/manual vazifani cleanup_jobs jadvaliga yozadi va bitta
+oqimli executor'ga qo'yadi, javob darhol qaytadi (202 + job id). Vazifa
+cleanup.main(force=True) orqali bajariladi - avtomatik tozalash bilan bir xil
+qulf, arxiv, bo'laklab o'chirish va retention.
+
+Bir vaqtda faqat bitta vazifa: navbatda/ishlayotgan vazifa bo'lsa yangisi
+yaratilmaydi, boshqa worker yoki cron ichidagi tozalashdan scheduler qulfi
+himoya qiladi.
+
+Holat (/api/cleanup/jobs/<id>) vazifaning CleanupLog yozuvlaridan (har bir
+bino - bittadan, run_id = job id) hisoblanadi - ular har bo'lakda commit
+qilinadi, shuning uchun so'rov qaysi worker'ga tushsa ham o'chirilganlar
+soni, tezlik va ETA bir xil.
+"""
+
+import os
+import time
+import uuid
+import logging
+import threading
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ('queued', 'running')
+# Tekshirish + yaratish bir butun bo'lishi uchun qisqa qulf (scheduler_locks jadvali)
+SUBMIT_LOCK = 'cleanup_job_submit'
+SUBMIT_LOCK_TTL = 30
+SUBMIT_LOCK_WAIT = 5.0
+
+
+class JobRunner:
+    """Bitta oqimli executor (har bir jarayonda alohida)"""
+
+    def __init__(self, app):
+        self.app = app
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+
+    def _get_executor(self):
+        # gunicorn fork qilgandan keyin executor yangi jarayonda qayta yaratiladi
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='cleanup-job')
+            return self._executor
+
+    def submit(self, policy=None, requested_by=None):
+        """(vazifa, yangi_yaratildi) - faol vazifa bo'lsa o'sha qaytariladi.
+        Parallel POST'lar (boshqa worker'larda ham) SUBMIT_LOCK orqali navbat bilan
+        tekshiriladi - faqat bittasi vazifa yaratadi, qolganlari uni ko'radi (409)."""
+        import scheduler
+        from models import db, CleanupJob
+
+        owner = scheduler.lock_owner()
+        deadline = time.monotonic() + SUBMIT_LOCK_WAIT
+        while not scheduler.acquire_lock(SUBMIT_LOCK, owner, SUBMIT_LOCK_TTL):
+            if time.monotonic() >= deadline:
+                raise RuntimeError("Tozalash vazifasi navbati band, birozdan keyin qayta urinib ko'ring")
+            time.sleep(0.05)
+
+        try:
+            active = active_job()
+            if active is not None:
+                return active, False
+
+            job = CleanupJob(id=uuid.uuid4().hex, status='queued', policy=policy, requested_by=requested_by)
+            db.session.add(job)
+            db.session.commit()
+        finally:
+            scheduler.release_lock(SUBMIT_LOCK, owner)
+        self._get_executor().submit(self._run, job.id, policy, requested_by)
+        logger.info(f"📥 Qo'lda tozalash navbatga qo'yildi (job {job.id}, admin: {requested_by})")
+        return job, True
+
+    def _run(self, job_id, policy, requested_by):
+        import cleanup
+
+        self._update(job_id, status='running', started_at=datetime.utcnow())
+
+        try:
+            result = cleanup.main(
+                force=True,
+                app=self.app,
+                policy=policy,
+                status='manual',
+                details=f"Qo'lda tozalash. {{deleted}} ta foydalanuvchi o'chirildi. Admin: {requested_by}",
+                run_id=job_id
+            )
+        except Exception as e:
+            logger.exception("Qo'lda tozalash vazifasida xatolik")
+            result = {'success': False, 'error': str(e)}
+
+        if result.get('skipped'):
+            status = 'skipped'
+        elif result.get('success'):
+            status = 'done'
+        else:
+            status = 'failed'
+        values = {
+            'status': status,
+            'finished_at': datetime.utcnow(),
+            'message': (result.get('message') or result.get('error') or '')[:500]
+        }
+        self._update(job_id, **values)
+
+    def _update(self, job_id, **values):
+        from models import db, CleanupJob
+
+        with self.app.app_context():
+            with db.engine.begin() as conn:
+                conn.execute(CleanupJob.__table__.update().where(CleanupJob.id == job_id).values(**values))
+
+
+def active_job():
+    """Navbatdagi yoki ishlayotgan vazifa. Worker o'lib qolgan bo'lsa vazifa
+    SCHEDULER_LOCK_TTL dan keyin faol hisoblanmaydi."""
+    from models import CleanupJob
+
+    stale_before = datetime.utcnow() - timedelta(seconds=current_app.config.get('SCHEDULER_LOCK_TTL', 7200))
+    return CleanupJob.query.filter(
+        CleanupJob.status.in_(ACTIVE_STATUSES),
+        CleanupJob.created_at >= stale_before
+    ).order_by(CleanupJob.created_at.desc()).first()
+
+
+def _format_time(value):
+    return value.strftime('%Y-%m-%d %H:%M:%S') if value else None
+
+
+def job_status(job_id):
+    """Vazifa holati va jarayon: o'chirilganlar, tezlik (qator/s), ETA. Topilmasa None"""
+    from models import db, CleanupJob, CleanupLog
+
+    job = db.session.get(CleanupJob, job_id)
+    if job is None:
+        return None
+    logs = CleanupLog.query.filter_by(run_id=job.id).order_by(CleanupLog.id).all()
+
+    data = {
+        'id': job.id,
+        'status': job.status,
+        'policy': job.policy or (logs[0].policy if logs else None),
+        'requested_by': job.requested_by,
+        'created_at': _format_time(job.created_at),
+        'started_at': _format_time(job.started_at),
+        'finished_at': _format_time(job.finished_at),
+        'message': job.message,
+        'deleted': sum(log.records_deleted for log in logs),
+        'batches': sum(log.batches_done or 0 for log in logs),
+        'partitions': {
+            log.building or '': {'deleted': log.records_deleted, 'status': log.status, 'log_id': log.id}
+            for log in logs
+        },
+        'rate_per_second': None,
+        'progress': None,
+        'eta_seconds': None,
+    }
+    if job.started_at is None:
+        return data
+
+    elapsed = ((job.finished_at or datetime.utcnow()) - job.started_at).total_seconds()
+    if elapsed > 0:
+        data['rate_per_second'] = round(data['deleted'] / elapsed, 1)
+
+    if job.status == 'done':
+        data['progress'] = 1.0
+        data['eta_seconds'] = 0
+    elif job.status in ACTIVE_STATUSES and logs:
+        # Bo'laklar id bo'yicha ketadi - binolar bo'yicha id oralig'ining o'tilgan qismi (o'rtacha)
+        fractions = [min(1.0, (log.last_user_id or 0) / log.max_user_id) if log.max_user_id else 1.0 for log in logs]
+        fraction = sum(fractions) / len(fractions)
+        data['progress'] = round(fraction, 4)
+        if fraction > 0:
+            data['eta_seconds'] = round(elapsed * (1 - fraction) / fraction, 1)
+    return data
+
+
+def init_app(app):
+    runner = JobRunner(app)
+    app.extensions['cleanup_jobs'] = runner
+    return runner
+
+
+def get_runner():
+    return current_app.extensions['cleanup_jobs']
@@ -0,0 +1,119 @@
+"""
+LoginAttempt yozuvlarini buferlab yozish (write-behind)
+Login so'rovi faqat navbatga qo'shadi; fon oqimi yozuvlarni har
+LOGIN_LOG_FLUSH_INTERVAL soniyada yoki LOGIN_LOG_FLUSH_SIZE ta to'planganda
+bitta bulk INSERT bilan saqlaydi (login_daily yig'indisi ham shu tranzaksiyada
+oshiriladi). Jarayon tugaganda qolganlari yoziladi.
+"""
+
+import os
+import atexit
+import logging
+import threading
+
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+
+class LoginAttemptWriter:
+    """Xotiradagi navbat + fon oqimi"""
+
+    def __init__(self, app, flush_interval=1.0, flush_size=100, max_queue=10000):
+        self.app = app
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self.max_queue = max_queue
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._buffer = []
+        self._thread = None
+        self._pid = None
+        self._stopped = False
+
+    def add(self, row):
+        """Yozuvni navbatga qo'shish. Navbat to'lib ketsa, chaqiruvchi o'zi yozadi."""
+        with self._lock:
+            self._buffer.append(row)
+            size = len(self._buffer)
+        self._ensure_thread()
+
+        if size >= self.max_queue:
+            self.flush()
+        elif size >= self.flush_size:
+            self._wakeup.set()
+
+    def pending(self):
+        with self._lock:
+            return len(self._buffer)
+
+    def flush(self):
+        """Navbatdagi barcha yozuvlarni bitta INSERT bilan saqlash"""
+        with self._flush_lock:
+            with self._lock:
+                rows, self._buffer = self._buffer, []
+            if not rows:
+                return 0
+
+            from models import db, LoginAttempt
+            from analytics import record_logins
+
+            try:
+                with self.app.app_context():
+                    with db.engine.begin() as conn:
+                        conn.execute(LoginAttempt.__table__.insert(), rows)
+                        # Kunlik yig'indi shu tranzaksiyada (analytics.py)
+                        record_logins(conn, rows)
+            except Exception:
+                logger.exception("LoginAttempt yozuvlarini saqlashda xatolik (%d ta)", len(rows))
+                # Keyingi urinish uchun qaytarish (navbat chegarasigacha)
+                with self._lock:
+                    self._buffer = (rows + self._buffer)[-self.max_queue:]
+                return 0
+            return len(rows)
+
+    def _ensure_thread(self):
+        # gunicorn fork qilgandan keyin oqim yangi jarayonda qayta ishga tushiriladi
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._stopped = False
+            self._thread = threading.Thread(target=self._run, name='login-log-writer', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stopped:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def stop(self):
+        """Oqimni to'xtatish va qolgan yozuvlarni saqlash"""
+        self._stopped = True
+        self._wakeup.set()
+        self.flush()
+
+
+def init_app(app):
+    """LOGIN_LOG_BUFFERED yoqilgan bo'lsa yozuvchini yaratish"""
+    if not app.config.get('LOGIN_LOG_BUFFERED', True):
+        app.extensions['login_log_writer'] = None
+        return None
+
+    writer = LoginAttemptWriter(
+        app,
+        flush_interval=app.config.get('LOGIN_LOG_FLUSH_INTERVAL', 1.0),
+        flush_size=app.config.get('LOGIN_LOG_FLUSH_SIZE', 100),
+        max_queue=app.config.get('LOGIN_LOG_MAX_QUEUE', 10000)
+    )
+    app.extensions['login_log_writer'] = writer
+    atexit.register(writer.stop)
+    return writer
+
+
+def get_writer():
+    return current_app.extensions.get('login_log_writer')
@@ -0,0 +1,227 @@
+"""
+So'rovlar, SQL va pool metrikalari (Prometheus text formatida)
+- har bir route uchun kechikish histogrammasi
+- so'rov boshiga SQL soni va umumiy DB vaqti
+- connection pool kutish vaqti (pool_stats.py dan)
+- cleanup bosqichlari vaqti (count / delete / log_commit)
+- ixtiyoriy sekin so'rovlar logi (METRICS_SLOW_QUERY_MS)
+
+Metrikalar har bir worker jarayoni uchun alohida yig'iladi.
+"""
+
+import os
+import time
+import hmac
+import logging
+import threading
+from contextlib import contextmanager
+
+from flask import g, request, session, has_request_context
+from sqlalchemy import event
+
+import pool_stats
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+CLEANUP_BUCKETS = (0.01, 0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 300.0, 900.0, 3600.0)
+
+
+class Histogram:
+    """Label'lar bo'yicha Prometheus histogrammasi"""
+
+    def __init__(self, name, help_text, buckets, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['buckets'][index] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, series in sorted(self._series.items()):
+                base = _format_labels(self.label_names, labels)
+                for bound, count in zip(self.buckets, series['buckets']):
+                    bucket_labels = _join_labels(base, 'le="%s"' % bound)
+                    lines.append(f"{self.name}_bucket{bucket_labels} {count}")
+                bucket_labels = _join_labels(base, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {series['count']}")
+                lines.append(f"{self.name}_sum{_wrap(base)} {series['sum']:.6f}")
+                lines.append(f"{self.name}_count{_wrap(base)} {series['count']}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_wrap(_format_labels(self.label_names, labels))} {value}")
+        return lines
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values):
+    return ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+def _join_labels(base, extra):
+    return '{' + (f"{base},{extra}" if base else extra) + '}'
+
+
+def _wrap(base):
+    return '{' + base + '}' if base else ''
+
+
+# ============================================
+# METRIKALAR
+# ============================================
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', "So'rov davomiyligi", LATENCY_BUCKETS, ('route', 'method', 'status'))
+REQUEST_QUERIES = Histogram(
+    'http_request_db_queries', "Bitta so'rovdagi SQL so'rovlar soni", QUERY_COUNT_BUCKETS, ('route',))
+REQUEST_DB_TIME = Histogram(
+    'http_request_db_duration_seconds', "Bitta so'rovdagi umumiy DB vaqti", LATENCY_BUCKETS, ('route',))
+SLOW_QUERIES = Counter('db_slow_queries_total', "Chegaradan sekin SQL so'rovlar")
+CLEANUP_PHASES = Histogram(
+    'cleanup_phase_duration_seconds', "Tozalash bosqichlari davomiyligi", CLEANUP_BUCKETS, ('phase',))
+
+_engines = {}
+
+
+@contextmanager
+def cleanup_phase(phase):
+    """with cleanup_phase('delete'): ... - bosqich vaqtini yozish"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        CLEANUP_PHASES.observe(time.perf_counter() - started, phase)
+
+
+# ============================================
+# FLASK VA SQLALCHEMY HODISALARI
+# ============================================
+def _before_request():
+    g.metrics_started = time.perf_counter()
+    g.metrics_queries = 0
+    g.metrics_db_time = 0.0
+
+
+def _after_request(response):
+    started = g.pop('metrics_started', None)
+    if started is None:
+        return response
+
+    route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    REQUEST_LATENCY.observe(time.perf_counter() - started, route, request.method, str(response.status_code))
+    REQUEST_QUERIES.observe(g.pop('metrics_queries', 0), route)
+    REQUEST_DB_TIME.observe(g.pop('metrics_db_time', 0.0), route)
+    return response
+
+
+def instrument_engine(engine, slow_query_ms=0, bind='primary'):
+    """before/after_cursor_execute - SQL soni, vaqti va sekin so'rovlar"""
+    if engine in _engines:
+        return
+    _engines[engine] = bind
+    slow_seconds = slow_query_ms / 1000 if slow_query_ms else None
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('metrics_started', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        stack = conn.info.get('metrics_started')
+        if not stack:
+            return
+        elapsed = time.perf_counter() - stack.pop()
+
+        if has_request_context() and 'metrics_started' in g:
+            g.metrics_queries = g.get('metrics_queries', 0) + 1
+            g.metrics_db_time = g.get('metrics_db_time', 0.0) + elapsed
+
+        if slow_seconds is not None and elapsed >= slow_seconds:
+            SLOW_QUERIES.inc()
+            logger.warning("🐢 Sekin so'rov (%.1f ms): %s", elapsed * 1000, ' '.join(statement.split())[:500])
+
+
+def render():
+    """Barcha metrikalar - Prometheus text exposition format"""
+    lines = []
+    for metric in (REQUEST_LATENCY, REQUEST_QUERIES, REQUEST_DB_TIME, SLOW_QUERIES, CLEANUP_PHASES):
+        lines.extend(metric.render())
+
+    pool_lines = {
+        'db_pool_checked_out': ('gauge', "Hozir band ulanishlar"),
+        'db_pool_overflow': ('gauge', "pool_size dan ortiqcha ochilgan ulanishlar"),
+        'db_pool_checkouts_total': ('counter', "Pool'dan olingan ulanishlar"),
+        'db_pool_timeouts_total': ('counter', "Ulanish kutish muddati tugagan holatlar"),
+        'db_pool_wait_seconds_total': ('counter', "Bo'sh ulanishni kutishga ketgan umumiy vaqt"),
+        'db_pool_wait_seconds_max': ('gauge', "Eng uzoq kutish"),
+    }
+    samples = {name: [] for name in pool_lines}
+    for engine, bind in list(_engines.items()):
+        stats = pool_stats.collect(engine)
+        labels = f'{{pid="{os.getpid()}",bind="{_escape(bind)}",database="{_escape(engine.url.database or engine.url.host or "")}"}}'
+        samples['db_pool_checked_out'].append(f"{labels} {stats.get('checked_out', 0)}")
+        samples['db_pool_overflow'].append(f"{labels} {max(stats.get('overflow', 0), 0)}")
+        samples['db_pool_checkouts_total'].append(f"{labels} {stats['checkouts']}")
+        samples['db_pool_timeouts_total'].append(f"{labels} {stats['timeouts']}")
+        samples['db_pool_wait_seconds_total'].append(f"{labels} {stats['wait_total_ms'] / 1000:.6f}")
+        samples['db_pool_wait_seconds_max'].append(f"{labels} {stats['wait_max_ms'] / 1000:.6f}")
+
+    for name, (metric_type, help_text) in pool_lines.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        lines.extend(f"{name}{sample}" for sample in samples[name])
+
+    return '\n'.join(lines) + '\n'
+
+
+def is_authorized():
+    """Sessiya (admin) yoki METRICS_TOKEN bilan Bearer so'rov"""
+    from flask import current_app
+
+    token = current_app.config.get('METRICS_TOKEN')
+    header = request.headers.get('Authorization', '')
+    if token and header.startswith('Bearer ') and hmac.compare_digest(header[7:].encode('utf-8'), token.encode('utf-8')):
+        return True
+    return 'user_id' in session
+
+
+def init_app(app, engines):
+    """engines - {bind nomi: engine} (asosiy baza uchun kalit None)"""
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    for bind, engine in engines.items():
+        instrument_engine(engine, app.config.get('METRICS_SLOW_QUERY_MS', 0), bind or 'primary')
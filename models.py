@@ -0,0 +1,326 @@
+"""
+Ma'lumotlar bazasi: db obyekti, modellar va sxema
+Veb-ilova (app.py) ham, cron/CLI skriptlari (cleanup.py, retention.py, ...) ham
+shu moduldan foydalanadi. Bu yerda faqat Flask yadrosi va Flask-SQLAlchemy
+yuklanadi - route'lar, shablonlar va fon oqimlari yo'q.
+
+Sxema tekshiruvi (create_all + yangi ustun/indekslar) har importda emas:
+schema_stamps jadvalidagi versiya modellar bilan mos bo'lsa bitta SELECT
+bilan o'tkazib yuboriladi, ya'ni migratsiya har deploy'da bir marta ishlaydi.
+"""
+
+import os
+import hashlib
+import logging
+from datetime import datetime
+
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+
+import analytics
+import data_version
+import pool_stats
+import replicas
+import sqlite_mode
+from config import config
+
+logger = logging.getLogger(__name__)
+
+# Ilova create_app() / create_db_app() ichida yaratiladi, db unga keyin ulanadi.
+# RoutingSession: @read_only route'larda o'qishlar replikaga (replicas.py)
+db = SQLAlchemy(session_options={'class_': replicas.RoutingSession})
+
+# ============================================
+# MODELLAR
+# ============================================
+def _default_building(context):
+    """INSERT da building berilmasa room_number prefiksidan (partitions.py)"""
+    from partitions import building_for
+    return building_for(context.get_current_parameters().get('room_number'))
+
+class User(db.Model):
+    __tablename__ = 'users'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    full_name = db.Column(db.String(100), nullable=False)
+    room_number = db.Column(db.String(10), nullable=False, unique=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    last_active_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    # Bino (partition): tozalash har bir bino uchun alohida va parallel
+    building = db.Column(db.String(20), default=_default_building, index=True)
+    
+    def __repr__(self):
+        return f"<User {self.room_number}: {self.full_name}>"
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'full_name': self.full_name,
+            'room_number': self.room_number,
+            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S') if self.created_at else None,
+            'last_active_at': self.last_active_at.strftime('%Y-%m-%d %H:%M:%S') if self.last_active_at else None
+        }
+
+class CleanupLog(db.Model):
+    __tablename__ = 'cleanup_logs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    cleanup_time = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    records_deleted = db.Column(db.Integer, nullable=False)
+    status = db.Column(db.String(50), default='success')
+    details = db.Column(db.Text)
+    policy = db.Column(db.String(50))  # policies.py dagi siyosat, masalan 'inactive:7'
+    
+    # Bo'laklab tozalash jarayoni (uzilib qolsa shu yerdan davom ettiriladi)
+    last_user_id = db.Column(db.Integer)
+    max_user_id = db.Column(db.Integer)
+    batches_done = db.Column(db.Integer, default=0)
+    batch_timings = db.Column(db.Text)  # JSON: bo'laklar vaqti (ms)
+    finished_at = db.Column(db.DateTime)
+    
+    # O'chirilgan qatorlar arxivi (archive.py): gzip NDJSON fayl va uning sha256
+    archive_path = db.Column(db.String(255))
+    archive_checksum = db.Column(db.String(64))
+    
+    # Bino bo'yicha tozalash: har bir bino - alohida yozuv, bitta ishga
+    # tushirishdagi yozuvlar run_id bilan bog'lanadi (building NULL - butun jadval)
+    building = db.Column(db.String(20), index=True)
+    run_id = db.Column(db.String(32), index=True)
+
+class LoginAttempt(db.Model):
+    """Foydalanuvchi kirish urinishlarini kuzatish"""
+    __tablename__ = 'login_attempts'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    username = db.Column(db.String(100), nullable=False)
+    ip_address = db.Column(db.String(45), nullable=False)
+    attempt_time = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    successful = db.Column(db.Boolean, default=False)
+    
+    # Login cheklovi uchun: WHERE ip_address = ? AND successful = ? AND attempt_time > ?
+    __table_args__ = (
+        db.Index('ix_login_attempts_ip_successful_time', 'ip_address', 'successful', 'attempt_time'),
+    )
+    
+    def __repr__(self):
+        status = "Muvaffaqiyatli" if self.successful else "Noto'g'ri"
+        return f"<LoginAttempt {self.username} - {status} at {self.attempt_time}>"
+
+class LoginAttemptHourly(db.Model):
+    """Eski login urinishlarining soatlik yig'indisi (retention.py to'ldiradi)"""
+    __tablename__ = 'login_attempts_hourly'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    hour = db.Column(db.DateTime, nullable=False, index=True)
+    ip_address = db.Column(db.String(45), nullable=False)
+    username = db.Column(db.String(100), nullable=False)
+    success_count = db.Column(db.Integer, nullable=False, default=0)
+    failure_count = db.Column(db.Integer, nullable=False, default=0)
+    
+    __table_args__ = (
+        db.UniqueConstraint('hour', 'ip_address', 'username', name='uq_login_attempts_hourly'),
+    )
+
+class CleanupWeekly(db.Model):
+    """Haftalik tozalash yig'indisi (analytics.py yozuv paytida yangilaydi)"""
+    __tablename__ = 'cleanup_weekly'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    week = db.Column(db.Date, nullable=False)  # Hafta dushanbasi (CLEANUP_TIMEZONE)
+    runs = db.Column(db.Integer, nullable=False, default=0)
+    errors = db.Column(db.Integer, nullable=False, default=0)
+    records_deleted = db.Column(db.BigInteger, nullable=False, default=0)
+    
+    __table_args__ = (
+        db.UniqueConstraint('week', name='uq_cleanup_weekly_week'),
+    )
+
+class CleanupRun(db.Model):
+    """cleanup_weekly.runs da har bir run_id bir marta hisoblanishi uchun (analytics.py)"""
+    __tablename__ = 'cleanup_runs'
+    
+    run_id = db.Column(db.String(32), primary_key=True)
+    week = db.Column(db.Date, nullable=False)
+
+class LoginDaily(db.Model):
+    """Kunlik login urinishlari (IP bo'yicha) - analytics.py yozuv paytida yangilaydi"""
+    __tablename__ = 'login_daily'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False, index=True)
+    ip_address = db.Column(db.String(45), nullable=False)
+    success_count = db.Column(db.Integer, nullable=False, default=0)
+    failure_count = db.Column(db.Integer, nullable=False, default=0)
+    
+    __table_args__ = (
+        db.UniqueConstraint('day', 'ip_address', name='uq_login_daily_day_ip'),
+    )
+
+class SchedulerLock(db.Model):
+    """Bir nechta worker ichidan faqat bittasi tozalashni bajarishi uchun qulf"""
+    __tablename__ = 'scheduler_locks'
+    
+    name = db.Column(db.String(50), primary_key=True)
+    owner = db.Column(db.String(150))
+    locked_until = db.Column(db.DateTime)
+
+
+class CleanupJob(db.Model):
+    """Qo'lda tozalash vazifasi (jobs.py). Jarayon holati run_id = id bo'lgan
+    CleanupLog yozuvlaridan o'qiladi - istalgan worker javob bera oladi."""
+    __tablename__ = 'cleanup_jobs'
+    
+    id = db.Column(db.String(32), primary_key=True)
+    status = db.Column(db.String(20), nullable=False, default='queued', index=True)
+    policy = db.Column(db.String(50))
+    requested_by = db.Column(db.String(100))
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    message = db.Column(db.Text)
+
+class DataVersion(db.Model):
+    """Jadval ma'lumotlari versiyasi - ETag va fragment keshi uchun (data_version.py)"""
+    __tablename__ = 'data_versions'
+    
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=1)
+
+
+class SchemaStamp(db.Model):
+    """Qo'llangan sxema versiyasi (ensure_schema)"""
+    __tablename__ = 'schema_stamps'
+    
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.String(64), nullable=False)
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+# /api/users va qidiruv uchun faqat kerakli ustunlar (ORM obyektlarisiz)
+USER_COLUMNS = (User.id, User.full_name, User.room_number, User.created_at, User.last_active_at)
+
+# ============================================
+# SXEMA
+# ============================================
+def upgrade_schema():
+    """Mavjud jadvallarga yangi ustun va indekslarni qo'shish (create_all buni qilmaydi)"""
+    from sqlalchemy import inspect
+    
+    inspector = inspect(db.engine)
+    with db.engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=db.engine.dialect)
+                    conn.execute(db.text(
+                        f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'
+                    ))
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+
+def schema_version():
+    """Modellar (jadval, ustun, indeks) va qidiruv indeksidan hisoblangan versiya"""
+    from search import SEARCH_SCHEMA_VERSION
+    
+    parts = [SEARCH_SCHEMA_VERSION]
+    for table in db.metadata.sorted_tables:
+        parts.append(table.name)
+        parts.extend(f"{column.name}:{column.type!r}:{column.nullable}" for column in table.columns)
+        parts.extend(sorted(index.name for index in table.indexes))
+    return hashlib.sha256('|'.join(parts).encode('utf-8')).hexdigest()[:16]
+
+def _stamped_version():
+    try:
+        with db.engine.connect() as conn:
+            return conn.execute(
+                db.select(SchemaStamp.version).where(SchemaStamp.name == 'schema')
+            ).scalar()
+    except Exception:
+        # Jadval hali yo'q (yangi baza yoki eski versiya)
+        return None
+
+def ensure_schema(app):
+    """Sxemani bir marta tayyorlash (ilova konteksti ichida).
+    Versiya mos bo'lsa - bitta SELECT; aks holda create_all, upgrade_schema,
+    qidiruv indeksi va yangi versiya yoziladi."""
+    if app.extensions.get('schema_ready'):
+        return False
+    
+    version = schema_version()
+    if _stamped_version() == version:
+        app.extensions['schema_ready'] = True
+        return False
+    
+    from search import setup_search_index
+    
+    logger.info(f"🛠️  Sxema yangilanmoqda (versiya {version})")
+    try:
+        # Faqat asosiy baza - replikalar unga ergashadi
+        db.create_all(bind_key=None)
+        upgrade_schema()
+        setup_search_index(db.engine)
+        
+        from partitions import backfill_buildings
+        backfill_buildings()
+        
+        with db.engine.begin() as conn:
+            data_version.seed(conn)
+            updated = conn.execute(
+                db.update(SchemaStamp).where(SchemaStamp.name == 'schema')
+                .values(version=version, applied_at=datetime.utcnow())
+            ).rowcount
+            if not updated:
+                conn.execute(db.insert(SchemaStamp).values(name='schema', version=version, applied_at=datetime.utcnow()))
+    except Exception as e:
+        # Bir vaqtda ishga tushgan boshqa worker migratsiyani bajarayotgan bo'lishi mumkin
+        logger.warning(f"⚠️  Sxemani yangilashda xatolik: {e}")
+        return False
+    
+    app.extensions['schema_ready'] = True
+    return True
+
+# ============================================
+# YENGIL ILOVA (CLI / cron uchun)
+# ============================================
+def configure_db(app):
+    """Pool sozlamalarini drayverga moslab db ni ulash (SQLite QueuePool argumentlarini olmaydi).
+    DATABASE_REPLICA_URLS - har biri alohida bind (replica_0, replica_1, ...)"""
+    engine_options = app.config['SQLALCHEMY_ENGINE_OPTIONS']
+    if app.config.get('DATABASE_REPLICA_URLS'):
+        app.config['SQLALCHEMY_BINDS'] = {
+            **app.config.get('SQLALCHEMY_BINDS', {}),
+            **replicas.replica_binds(
+                app.config['DATABASE_REPLICA_URLS'],
+                engine_options,
+                app.config.get('REPLICA_CONNECT_TIMEOUT', 2)
+            )
+        }
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = pool_stats.engine_options_for(
+        app.config['SQLALCHEMY_DATABASE_URI'],
+        engine_options
+    )
+    db.init_app(app)
+
+def setup_engines(app):
+    """Har bir engine'ga pool statistikasi va (SQLite fayl bo'lsa) WAL/pragma'lar
+    hamda yagona yozuvchi navbati (ilova konteksti ichida, ulanishdan oldin)"""
+    for engine in db.engines.values():
+        pool_stats.instrument(engine)
+        sqlite_mode.configure_engine(engine, app.config)
+
+def create_db_app(config_name=None):
+    """Faqat config + db - route'lar, shablonlar va fon oqimlarisiz.
+    cleanup.py va boshqa CLI skriptlari shu bilan ishlaydi."""
+    config_name = config_name or os.getenv('FLASK_CONFIG', 'default')
+    
+    app = Flask(__name__)
+    app.config.from_object(config[config_name])
+    configure_db(app)
+    
+    with app.app_context():
+        setup_engines(app)
+        ensure_schema(app)
+    
+    return app
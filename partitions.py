@@ -0,0 +1,90 @@
+"""
+Binolar (partition) - users.building
+Bino room_number prefiksidan aniqlanadi (BUILDING_PATTERN, standart:
+boshidagi harflar - 'A101' -> 'A', 'B-204' -> 'B'); prefiks bo'lmasa
+DEFAULT_BUILDING. Ustun INSERT paytida avtomatik to'ldiriladi (models.User),
+eski qatorlar ensure_schema va tozalash boshida backfill_buildings() bilan.
+
+Tozalash har bir bino uchun alohida CleanupLog bilan, parallel bajariladi
+(cleanup.run_partitioned_cleanup); har bir binoning o'z jadvali bo'lishi
+mumkin (CLEANUP_PARTITION_SCHEDULES).
+"""
+
+import re
+import logging
+from functools import lru_cache
+
+from flask import current_app, has_app_context
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATTERN = r'^([A-Za-z]+)'
+DEFAULT_BUILDING = 'main'
+BACKFILL_CHUNK = 5000
+
+
+@lru_cache(maxsize=8)
+def _compile(pattern):
+    return re.compile(pattern)
+
+
+def building_for(room_number):
+    """room_number -> bino nomi"""
+    config = current_app.config if has_app_context() else {}
+    default = config.get('DEFAULT_BUILDING', DEFAULT_BUILDING)
+    if not room_number:
+        return default
+    match = _compile(config.get('BUILDING_PATTERN', DEFAULT_PATTERN)).match(room_number)
+    if not match or not match.group(1):
+        return default
+    return match.group(1).upper()[:20]
+
+
+def backfill_buildings(chunk_size=BACKFILL_CHUNK):
+    """building NULL bo'lgan qatorlarni id bo'yicha bo'laklab to'ldirish. Yangilanganlar soni."""
+    from models import db, User
+
+    table = User.__table__
+    updated = 0
+    while True:
+        with db.engine.begin() as conn:
+            rows = conn.execute(
+                db.select(table.c.id, table.c.room_number)
+                .where(table.c.building.is_(None))
+                .order_by(table.c.id)
+                .limit(chunk_size)
+            ).all()
+            if not rows:
+                break
+            conn.execute(
+                table.update()
+                .where(table.c.id == db.bindparam('b_id'))
+                .values(building=db.bindparam('b_building')),
+                [{'b_id': row.id, 'b_building': building_for(row.room_number)} for row in rows]
+            )
+        updated += len(rows)
+
+    if updated:
+        logger.info(f"🏢 {updated} ta foydalanuvchiga bino belgilandi")
+    return updated
+
+
+def list_buildings():
+    """Foydalanuvchisi bor binolar (ix_users_building)"""
+    from models import db, User
+
+    return [
+        building for (building,) in
+        db.session.query(User.building).filter(User.building.isnot(None)).distinct().order_by(User.building)
+    ]
+
+
+def due_partitions(now=None):
+    """Jadvali bo'yicha tozalash vaqti kelgan binolar.
+    Foydalanuvchi yo'q bo'lsa umumiy jadval: [None] yoki []"""
+    from scheduler import is_cleanup_due
+
+    buildings = list_buildings()
+    if not buildings:
+        return [None] if is_cleanup_due(now) else []
+    return [building for building in buildings if is_cleanup_due(now, building)]
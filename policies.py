@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Tozalash siyosatlari (retention policies)
+Siyosat matn ko'rinishida beriladi (Config.CLEANUP_POLICY yoki API orqali):
+
+    all                       - barcha foydalanuvchilar (standart)
+    inactive:7                - last_active_at 7 kundan eski bo'lganlar
+    created_before:2026-01-01 - shu sanadan oldin qo'shilganlar
+
+Har bir siyosat users jadvalidagi indeksli ustun bo'yicha WHERE shartiga
+aylanadi; o'chirish cleanup.run_cleanup() orqali bo'laklab bajariladi.
+"""
+
+import sys
+import json
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+
+class Policy:
+    """Nomlangan siyosat: users uchun WHERE sharti va tavsif"""
+
+    def __init__(self, name, argument=None):
+        self.name = name
+        self.argument = argument
+
+    @property
+    def spec(self):
+        return f"{self.name}:{self.argument}" if self.argument is not None else self.name
+
+    def criterion(self, now=None):
+        raise NotImplementedError
+
+    def describe(self):
+        raise NotImplementedError
+
+
+class DeleteAllPolicy(Policy):
+    def criterion(self, now=None):
+        from sqlalchemy import true
+        return true()
+
+    def describe(self):
+        return "barcha foydalanuvchilar"
+
+
+class InactivePolicy(Policy):
+    """last_active_at N kundan eski (ix_users_last_active_at)"""
+
+    def __init__(self, name, argument=None):
+        days = int(argument) if argument is not None else 7
+        if days <= 0:
+            raise ValueError("inactive siyosati uchun kunlar soni musbat bo'lishi kerak")
+        super().__init__(name, days)
+
+    def criterion(self, now=None):
+        from models import User
+        cutoff = (now or datetime.utcnow()) - timedelta(days=self.argument)
+        return User.last_active_at < cutoff
+
+    def describe(self):
+        return f"{self.argument} kundan beri faol bo'lmaganlar"
+
+
+class CreatedBeforePolicy(Policy):
+    """created_at berilgan sanadan oldin (ix_users_created_at)"""
+
+    def __init__(self, name, argument=None):
+        if not argument:
+            raise ValueError("created_before siyosati uchun sana kerak (YYYY-MM-DD)")
+        super().__init__(name, datetime.fromisoformat(str(argument)).date().isoformat())
+
+    def criterion(self, now=None):
+        from models import User
+        return User.created_at < datetime.fromisoformat(self.argument)
+
+    def describe(self):
+        return f"{self.argument} dan oldin qo'shilganlar"
+
+
+POLICIES = {
+    'all': DeleteAllPolicy,
+    'inactive': InactivePolicy,
+    'created_before': CreatedBeforePolicy,
+}
+
+
+def parse_policy(spec):
+    """'inactive:7' -> InactivePolicy. Noto'g'ri siyosat uchun ValueError."""
+    spec = (spec or 'all').strip()
+    name, _, argument = spec.partition(':')
+    if name not in POLICIES:
+        raise ValueError(f"Noma'lum tozalash siyosati: {name}")
+    return POLICIES[name](name, argument or None)
+
+
+def explain(statement):
+    """Bazaning so'rov rejasi (SQLite: EXPLAIN QUERY PLAN, boshqalar: EXPLAIN)"""
+    from models import db
+
+    engine = db.engine
+    compiled = statement.compile(dialect=engine.dialect)
+    params = compiled.construct_params()
+    if compiled.positional:
+        params = tuple(params[name] for name in compiled.positiontup)
+
+    prefix = 'EXPLAIN QUERY PLAN ' if engine.dialect.name == 'sqlite' else 'EXPLAIN '
+    rows = db.session.connection().exec_driver_sql(prefix + str(compiled), params).fetchall()
+    return [' | '.join(str(value) for value in row) for row in rows]
+
+
+def dry_run(spec):
+    """O'chirmasdan: siyosatga mos qatorlar soni va DELETE so'rovining rejasi"""
+    from models import db, User
+
+    policy = parse_policy(spec)
+    criterion = policy.criterion()
+
+    return {
+        'policy': policy.spec,
+        'description': policy.describe(),
+        'affected': db.session.query(db.func.count(User.id)).filter(criterion).scalar(),
+        'plan': explain(db.delete(User).where(criterion))
+    }
+
+
+if __name__ == '__main__':
+    from models import create_db_app
+
+    app = create_db_app()
+
+    spec = sys.argv[1] if len(sys.argv) > 1 else None
+    with app.app_context():
+        print(json.dumps(dry_run(spec or app.config.get('CLEANUP_POLICY')), ensure_ascii=False, indent=2))
@@ -0,0 +1,125 @@
+"""
+Connection pool statistikasi
+Har bir gunicorn worker o'z pool'ini ushlaydi, shuning uchun raqamlar
+jarayon (pid) bo'yicha qaytariladi - pool_size ni shu raqamlardan tanlash mumkin.
+"""
+
+import os
+import time
+import threading
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+
+class PoolStats:
+    """Bitta engine pool'i bo'yicha yig'ilgan hisoblagichlar"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.timeouts = 0
+        self.wait_count = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record_wait(self, seconds, timed_out=False):
+        with self.lock:
+            self.wait_count += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+    def incr(self, name):
+        with self.lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool - bo'sh ulanishni kutish vaqtini o'lchaydi"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except Exception:
+            timed_out = True
+            raise
+        finally:
+            stats = getattr(self, '_stats', None)
+            if stats is not None:
+                stats.record_wait(time.perf_counter() - started, timed_out)
+
+    def recreate(self):
+        new_pool = super().recreate()
+        new_pool._stats = getattr(self, '_stats', None)
+        return new_pool
+
+
+def engine_options_for(uri, options):
+    """Drayverga mos engine sozlamalari.
+    Xotiradagi SQLite QueuePool argumentlarini (pool_size, max_overflow) qabul
+    qilmaydi. Qolganlarida (SQLite fayl bazasi ham) kutish vaqtini o'lchaydigan
+    pool ishlatiladi - SQLite ulanishlari qayta ishlatilsa pragma'lar,
+    sahifa keshi va mmap har so'rovda qaytadan ochilmaydi.
+    """
+    options = dict(options or {})
+    if uri and uri.startswith('sqlite'):
+        if make_url(uri).database in (None, '', ':memory:'):
+            for key in ('pool_size', 'max_overflow', 'pool_timeout', 'poolclass'):
+                options.pop(key, None)
+            return options
+        # Ulanish pool orqali boshqa oqimga o'tishi mumkin
+        options['connect_args'] = {'check_same_thread': False, **options.get('connect_args', {})}
+    if 'poolclass' not in options:
+        options['poolclass'] = TimedQueuePool
+    return options
+
+
+def instrument(engine):
+    """Engine pool'iga hodisa tinglovchilarini ulash (bir marta)"""
+    pool = engine.pool
+    if getattr(pool, '_stats', None) is not None:
+        return pool._stats
+
+    stats = PoolStats()
+    pool._stats = stats
+
+    event.listen(engine, 'connect', lambda *args: stats.incr('connects'))
+    event.listen(engine, 'checkout', lambda *args: stats.incr('checkouts'))
+    event.listen(engine, 'checkin', lambda *args: stats.incr('checkins'))
+    return stats
+
+
+def collect(engine):
+    """Engine pool'ining joriy holati va yig'ilgan statistikasi"""
+    pool = engine.pool
+    stats = getattr(pool, '_stats', None) or PoolStats()
+
+    with stats.lock:
+        data = {
+            'pid': os.getpid(),
+            'pool_class': type(pool).__name__,
+            'connects': stats.connects,
+            'checkouts': stats.checkouts,
+            'checkins': stats.checkins,
+            'timeouts': stats.timeouts,
+            'wait_avg_ms': round(stats.wait_total / stats.wait_count * 1000, 3) if stats.wait_count else 0.0,
+            'wait_max_ms': round(stats.wait_max * 1000, 3),
+            'wait_total_ms': round(stats.wait_total * 1000, 3),
+        }
+
+    if isinstance(pool, QueuePool):
+        data.update({
+            'pool_size': pool.size(),
+            'checked_out': pool.checkedout(),
+            'checked_in': pool.checkedin(),
+            'overflow': pool.overflow(),
+            'max_overflow': pool._max_overflow,
+        })
+    return data
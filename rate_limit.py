@@ -0,0 +1,137 @@
+"""
+Login urinishlarini cheklash (IP bo'yicha)
+Ikki backend bir xil qoida bilan ishlaydi: oxirgi 1 soatda MAX_LOGIN_ATTEMPTS
+ta muvaffaqiyatsiz urinish bo'lsa, IP oxirgi xatodan keyin
+BLOCK_DURATION_MINUTES daqiqaga bloklanadi.
+
+- memory   - jarayon ichidagi sliding window (standart, bazaga so'rov yo'q)
+- database - login_attempts jadvalidan bitta indeksli aggregate so'rov
+             (bir nechta gunicorn worker bitta hisobni ko'rishi kerak bo'lsa)
+"""
+
+import threading
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+# Muvaffaqiyatsiz urinishlar hisoblanadigan oyna
+WINDOW = timedelta(hours=1)
+
+
+class LoginLimiter:
+    """Umumiy bloklash qoidasi - backendlar faqat _failures() ni beradi"""
+
+    # True bo'lsa, muvaffaqiyatsiz urinishlar bazaga darhol yozilishi kerak
+    reads_database = False
+
+    def __init__(self, max_attempts, block_minutes):
+        self.max_attempts = max_attempts
+        self.block_minutes = block_minutes
+
+    def _failures(self, ip_address, now):
+        """(oynadagi xatolar soni, oxirgi xato vaqti)"""
+        raise NotImplementedError
+
+    def record_failure(self, ip_address, when=None):
+        """Muvaffaqiyatsiz urinishni hisobga olish"""
+
+    def failed_count(self, ip_address):
+        return self._failures(ip_address, datetime.utcnow())[0]
+
+    def check(self, ip_address):
+        """(ruxsat, xabar) - check_login_attempts() bilan bir xil format"""
+        now = datetime.utcnow()
+        count, last_failed_time = self._failures(ip_address, now)
+
+        if count >= self.max_attempts and last_failed_time is not None:
+            block_until = last_failed_time + timedelta(minutes=self.block_minutes)
+
+            if now < block_until:
+                remaining_seconds = int((block_until - now).total_seconds())
+                minutes = remaining_seconds // 60
+                seconds = remaining_seconds % 60
+                return False, f"IP manzilingiz {self.block_minutes} daqiqaga bloklangan. {minutes} daqiqa {seconds} soniya qoldi."
+
+        return True, ""
+
+
+class MemoryLoginLimiter(LoginLimiter):
+    """Har bir IP uchun xato vaqtlari navbati (sliding window).
+    Kuzatiladigan IP'lar soni max_tracked bilan cheklangan (eng eskisi chiqariladi)."""
+
+    def __init__(self, max_attempts, block_minutes, max_tracked=10000):
+        super().__init__(max_attempts, block_minutes)
+        self.max_tracked = max_tracked
+        self._lock = threading.Lock()
+        self._failed = OrderedDict()
+
+    def record_failure(self, ip_address, when=None):
+        when = when or datetime.utcnow()
+        with self._lock:
+            times = self._failed.pop(ip_address, None) or deque()
+            times.append(when)
+            self._prune(times, when)
+            self._failed[ip_address] = times
+            while len(self._failed) > self.max_tracked:
+                self._failed.popitem(last=False)
+
+    def _prune(self, times, now):
+        cutoff = now - WINDOW
+        while times and times[0] <= cutoff:
+            times.popleft()
+
+    def _failures(self, ip_address, now):
+        with self._lock:
+            times = self._failed.get(ip_address)
+            if not times:
+                return 0, None
+            self._prune(times, now)
+            if not times:
+                del self._failed[ip_address]
+                return 0, None
+            return len(times), times[-1]
+
+
+class DatabaseLoginLimiter(LoginLimiter):
+    """login_attempts jadvalidan hisoblash. So'rov
+    ix_login_attempts_ip_successful_time (ip_address, successful, attempt_time)
+    indeksi bo'yicha bajariladi - jadvalni to'liq skanerlamaydi."""
+
+    reads_database = True
+
+    def _failures(self, ip_address, now):
+        from models import db, LoginAttempt
+
+        count, last_failed_time = db.session.query(
+            db.func.count(LoginAttempt.id),
+            db.func.max(LoginAttempt.attempt_time)
+        ).filter(
+            LoginAttempt.ip_address == ip_address,
+            LoginAttempt.successful == False,
+            LoginAttempt.attempt_time > now - WINDOW
+        ).one()
+        return count, last_failed_time
+
+
+BACKENDS = {
+    'memory': MemoryLoginLimiter,
+    'database': DatabaseLoginLimiter,
+}
+
+
+def init_app(app):
+    """LOGIN_LIMITER_BACKEND bo'yicha limiter yaratib, ilovaga biriktirish"""
+    backend = app.config.get('LOGIN_LIMITER_BACKEND', 'memory')
+    if backend not in BACKENDS:
+        raise ValueError(f"Noma'lum LOGIN_LIMITER_BACKEND: {backend}")
+
+    app.extensions['login_limiter'] = BACKENDS[backend](
+        app.config['MAX_LOGIN_ATTEMPTS'],
+        app.config['BLOCK_DURATION_MINUTES']
+    )
+    return app.extensions['login_limiter']
+
+
+def get_limiter():
+    return current_app.extensions['login_limiter']
@@ -0,0 +1,196 @@
+"""
+O'qish uchun replikalar (read replicas)
+DATABASE_REPLICA_URLS berilsa, @read_only bilan belgilangan route'lardagi
+so'rovlar replikaga yuboriladi; yozuvlar (login urinishlari, tozalash,
+flush) har doim asosiy bazada.
+
+- Replika kechikishi (lag) REPLICA_CHECK_INTERVAL da bir marta tekshiriladi;
+  REPLICA_MAX_LAG_SECONDS dan kechikkan yoki ishlamayotgan replika
+  o'tkazib yuboriladi, mos replika bo'lmasa - asosiy baza.
+  Tekshiruvni bitta so'rov qulfdan tashqarida bajaradi, qolganlari keshdagi
+  holatdan foydalanadi; ulanish REPLICA_CONNECT_TIMEOUT soniya bilan cheklangan.
+- Foydalanuvchi o'zi yozgan narsani ko'rishi uchun: yozuvdan keyin
+  REPLICA_MAX_LAG_SECONDS davomida uning o'qishlari ham asosiy bazadan.
+"""
+
+import time
+import logging
+import itertools
+import threading
+from functools import wraps
+
+from flask import current_app, g, has_app_context, has_request_context, session
+from flask_sqlalchemy.session import Session as FlaskSession
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+BIND_PREFIX = 'replica_'
+
+POSTGRES_LAG_QUERY = (
+    "SELECT CASE"
+    " WHEN NOT pg_is_in_recovery() THEN 0"
+    " WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0"
+    " ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)"
+    " END"
+)
+
+
+def _with_connect_timeout(url, options, connect_timeout):
+    # Osilib qolgan replika ulanishi so'rovni uzoq ushlab turmasin
+    if connect_timeout and url.startswith('postgres'):
+        options['connect_args'] = {'connect_timeout': int(connect_timeout), **options.get('connect_args', {})}
+    return options
+
+
+def replica_binds(urls, engine_options, connect_timeout=2):
+    """SQLALCHEMY_BINDS uchun: {'replica_0': {'url': ..., **pool sozlamalari}}"""
+    from pool_stats import engine_options_for
+
+    return {
+        f"{BIND_PREFIX}{index}": {
+            'url': url,
+            **_with_connect_timeout(url, engine_options_for(url, engine_options), connect_timeout)
+        }
+        for index, url in enumerate(urls)
+    }
+
+
+class ReplicaRouter:
+    """Replikalar holati (lag keshi) va navbatma-navbat tanlash"""
+
+    def __init__(self, keys, max_lag=5.0, check_interval=5.0):
+        self.keys = list(keys)
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._status = {key: {'healthy': None, 'lag_seconds': None, 'checked_at': 0.0, 'error': None} for key in self.keys}
+        self._checking = set()
+        self._counter = itertools.count()
+
+    def _check(self, key, engine):
+        """Bitta replikani tekshirish - qulfsiz (ulanish osilib qolishi mumkin)"""
+        try:
+            with engine.connect() as conn:
+                if conn.dialect.name == 'postgresql':
+                    lag = float(conn.exec_driver_sql(POSTGRES_LAG_QUERY).scalar() or 0)
+                else:
+                    # Boshqa dialektlarda lag o'lchanmaydi - faqat ulanish tekshiriladi
+                    conn.exec_driver_sql("SELECT 1")
+                    lag = 0.0
+            result = {'healthy': lag <= self.max_lag, 'lag_seconds': round(lag, 3), 'error': None}
+        except Exception as e:
+            if self._status[key]['healthy'] is not False:
+                logger.warning(f"⚠️  Replika {key} ishlamayapti: {e}")
+            result = {'healthy': False, 'lag_seconds': None, 'error': str(e)[:200]}
+
+        with self._lock:
+            self._status[key].update(result, checked_at=time.monotonic())
+            self._checking.discard(key)
+
+    def healthy_keys(self, engines):
+        """Mos replikalar. Muddati o'tganlarini shu so'rov tekshiradi, agar boshqa
+        so'rov allaqachon tekshirayotgan bo'lmasa - qolganlar kutmaydi."""
+        now = time.monotonic()
+        with self._lock:
+            due = [
+                key for key in self.keys
+                if key not in self._checking and now - self._status[key]['checked_at'] >= self.check_interval
+            ]
+            self._checking.update(due)
+
+        for key in due:
+            self._check(key, engines[key])
+
+        with self._lock:
+            return [key for key in self.keys if self._status[key]['healthy']]
+
+    def pick(self, engines):
+        """Mos replika engine'i yoki None (asosiy bazaga qaytish)"""
+        keys = self.healthy_keys(engines)
+        if not keys:
+            return None
+        return engines[keys[next(self._counter) % len(keys)]]
+
+    def status(self):
+        with self._lock:
+            return {
+                key: {name: value for name, value in status.items() if name != 'checked_at'}
+                for key, status in self._status.items()
+            }
+
+
+def _use_replica(db_session):
+    if not has_request_context() or not g.get('db_read_only'):
+        return False
+    if db_session._flushing or db_session.new or db_session.dirty or db_session.deleted:
+        return False
+    # O'z yozuvini ko'rish: yaqinda yozgan foydalanuvchi asosiy bazadan o'qiydi
+    return session.get('db_primary_until', 0) <= time.time()
+
+
+class RoutingSession(FlaskSession):
+    """@read_only route'larda o'qishlarni replikaga yo'naltiruvchi sessiya"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_app_context():
+            router = current_app.extensions.get('replica_router')
+            if router is not None and _use_replica(self):
+                engine = router.pick(self._db.engines)
+                if engine is not None:
+                    return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _mark_write():
+    if has_request_context():
+        g.db_wrote = True
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _write_on_flush(db_session, flush_context):
+    _mark_write()
+
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def _write_on_bulk(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        _mark_write()
+
+
+def read_only(view):
+    """Route faqat o'qiydi - replika ishlatilishi mumkin"""
+    @wraps(view)
+    def decorated_function(*args, **kwargs):
+        g.db_read_only = True
+        return view(*args, **kwargs)
+    return decorated_function
+
+
+def _remember_write(response):
+    if g.get('db_wrote'):
+        router = current_app.extensions.get('replica_router')
+        session['db_primary_until'] = time.time() + router.max_lag
+    return response
+
+
+def init_app(app, db):
+    """Replikalar sozlangan bo'lsa router'ni yaratish (db.init_app dan keyin)"""
+    keys = [key for key in db.engines if isinstance(key, str) and key.startswith(BIND_PREFIX)]
+    if not keys:
+        app.extensions['replica_router'] = None
+        return None
+
+    router = ReplicaRouter(
+        keys,
+        max_lag=app.config.get('REPLICA_MAX_LAG_SECONDS', 5.0),
+        check_interval=app.config.get('REPLICA_CHECK_INTERVAL', 5.0)
+    )
+    app.extensions['replica_router'] = router
+    app.after_request(_remember_write)
+    logger.info(f"📚 O'qish replikalari: {len(keys)} ta")
+    return router
+
+
+def get_router():
+    return current_app.extensions.get('replica_router')
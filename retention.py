@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+login_attempts va cleanup_logs jadvallarini cheklash (retention)
+- LOGIN_ATTEMPT_RETENTION_DAYS dan eski login urinishlari soatlik
+  login_attempts_hourly jadvaliga (IP/username, muvaffaqiyatli/xato soni)
+  yig'iladi, xom yozuvlar esa bo'laklab o'chiriladi
+- cleanup_logs dan faqat oxirgi CLEANUP_LOG_KEEP ta yozuv qoldiriladi
+Haftalik tozalash (cleanup.main) tarkibida ishlaydi, alohida ham ishga tushirish mumkin.
+"""
+
+import sys
+import time
+import logging
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+logger = logging.getLogger(__name__)
+
+# Rollup yozuvlarini bitta INSERT da yuborish hajmi
+ROLLUP_INSERT_CHUNK = 1000
+
+
+def delete_in_batches(model, criterion, batch_size=1000, pause=0):
+    """criterion ga mos qatorlarni id bo'yicha bo'laklab o'chirish.
+    Har bir bo'lak alohida commit qilinadi - qulflar qisqa ushlanadi."""
+    from models import db
+
+    deleted = 0
+    last_id = 0
+    while True:
+        ids = db.session.query(model.id).filter(criterion, model.id > last_id)
+        upper_id = ids.order_by(model.id).offset(batch_size - 1).limit(1).scalar()
+        if upper_id is None:
+            upper_id = db.session.query(db.func.max(model.id)).filter(criterion, model.id > last_id).scalar()
+            if upper_id is None:
+                break
+
+        deleted += model.query.filter(
+            criterion,
+            model.id > last_id,
+            model.id <= upper_id
+        ).delete(synchronize_session=False)
+        db.session.commit()
+        last_id = upper_id
+
+        if pause:
+            time.sleep(pause)
+    return deleted
+
+
+def _hour_bucket(db, column):
+    """Vaqtni soat boshigacha qisqartirish (dialektga mos)"""
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        return db.func.date_trunc('hour', column)
+    if dialect == 'sqlite':
+        return db.func.strftime('%Y-%m-%d %H:00:00', column)
+    return db.func.date_format(column, '%Y-%m-%d %H:00:00')
+
+
+def _as_datetime(value):
+    if isinstance(value, str):
+        return datetime.strptime(value, '%Y-%m-%d %H:%M:%S')
+    return value
+
+
+def compact_login_attempts(retention_days, batch_size=1000, pause=0):
+    """Eski login urinishlarini soatlik jadvalga yig'ish va xom yozuvlarni o'chirish.
+
+    Rollup jadvalidagi eng oxirgi soatgacha bo'lgan xom yozuvlar allaqachon
+    hisoblangan deb olinadi - jarayon o'rtada uzilsa, qayta hisoblanmaydi.
+    """
+    from models import db, LoginAttempt, LoginAttemptHourly
+
+    cutoff = (datetime.utcnow() - timedelta(days=retention_days)).replace(minute=0, second=0, microsecond=0)
+
+    last_hour = db.session.query(db.func.max(LoginAttemptHourly.hour)).scalar()
+    rolled_until = _as_datetime(last_hour) + timedelta(hours=1) if last_hour else None
+
+    # 1. Hali yig'ilmagan soatlarni rollup jadvaliga yozish
+    bucket = _hour_bucket(db, LoginAttempt.attempt_time).label('hour')
+    query = db.session.query(
+        bucket,
+        LoginAttempt.ip_address,
+        LoginAttempt.username,
+        db.func.sum(db.case((LoginAttempt.successful == True, 1), else_=0)),
+        db.func.sum(db.case((LoginAttempt.successful == True, 0), else_=1))
+    ).filter(LoginAttempt.attempt_time < cutoff)
+    if rolled_until is not None:
+        query = query.filter(LoginAttempt.attempt_time >= rolled_until)
+
+    rollup_rows = [
+        {
+            'hour': _as_datetime(hour),
+            'ip_address': ip_address,
+            'username': username,
+            'success_count': int(success_count or 0),
+            'failure_count': int(failure_count or 0)
+        }
+        for hour, ip_address, username, success_count, failure_count
+        in query.group_by(bucket, LoginAttempt.ip_address, LoginAttempt.username)
+    ]
+
+    for start in range(0, len(rollup_rows), ROLLUP_INSERT_CHUNK):
+        db.session.execute(LoginAttemptHourly.__table__.insert(), rollup_rows[start:start + ROLLUP_INSERT_CHUNK])
+    db.session.commit()
+
+    # 2. Yig'ilgan xom yozuvlarni o'chirish
+    compacted = delete_in_batches(LoginAttempt, LoginAttempt.attempt_time < cutoff, batch_size, pause)
+
+    return {'rows_compacted': compacted, 'rollup_rows': len(rollup_rows), 'cutoff': cutoff}
+
+
+def trim_cleanup_logs(keep, batch_size=1000, pause=0):
+    """cleanup_logs dan oxirgi keep ta yozuvni qoldirib, qolganini o'chirish.
+    Davom etayotgan ('running') tozalash logiga tegilmaydi."""
+    from models import db, CleanupLog
+
+    if keep <= 0:
+        return 0
+
+    boundary = db.session.query(CleanupLog.id).order_by(CleanupLog.id.desc()).offset(keep - 1).limit(1).scalar()
+    if boundary is None:
+        return 0
+
+    return delete_in_batches(
+        CleanupLog,
+        db.and_(CleanupLog.id < boundary, CleanupLog.status != 'running'),
+        batch_size,
+        pause
+    )
+
+
+def run_retention():
+    """Barcha retention qadamlari. Ilova konteksti ichida chaqirilishi kerak."""
+    from flask import current_app
+
+    config = current_app.config
+    batch_size = config.get('CLEANUP_BATCH_SIZE') or 1000
+    pause = config.get('CLEANUP_BATCH_PAUSE', 0)
+
+    started = time.perf_counter()
+    login_report = compact_login_attempts(config.get('LOGIN_ATTEMPT_RETENTION_DAYS', 30), batch_size, pause)
+    logs_deleted = trim_cleanup_logs(config.get('CLEANUP_LOG_KEEP', 500), batch_size, pause)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    logger.info(
+        f"🗄️  Retention: {login_report['rows_compacted']} ta login urinishi "
+        f"{login_report['rollup_rows']} ta soatlik yozuvga yig'ildi, "
+        f"{logs_deleted} ta eski tozalash logi o'chirildi ({elapsed_ms:.1f} ms)"
+    )
+
+    return {
+        'login_attempts_compacted': login_report['rows_compacted'],
+        'rollup_rows': login_report['rollup_rows'],
+        'cleanup_logs_deleted': logs_deleted,
+        'elapsed_ms': round(elapsed_ms, 2)
+    }
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    from models import create_db_app
+
+    app = create_db_app()
+
+    with app.app_context():
+        report = run_retention()
+
+    print(f"📊 Yig'ilgan login urinishlari: {report['login_attempts_compacted']} ta")
+    print(f"🧮 Soatlik yozuvlar: {report['rollup_rows']} ta")
+    print(f"🗑️  O'chirilgan tozalash loglari: {report['cleanup_logs_deleted']} ta")
+    print(f"⏱️  Vaqt: {report['elapsed_ms']} ms")
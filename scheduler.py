@@ -0,0 +1,336 @@
+"""
+Ichki rejalashtiruvchi (scheduler)
+Config.CLEANUP_SCHEDULE (CRON format) Europe/Moscow vaqtida hisoblanadi,
+binolar o'z jadvaliga ega bo'lishi mumkin (CLEANUP_PARTITION_SCHEDULES).
+O'tkazib yuborilgan ishga tushirishlar CleanupLog tarixidan aniqlanadi,
+bir nechta gunicorn worker bo'lsa ham tozalashni faqat bittasi bajaradi
+(scheduler_locks jadvalidagi qulf yozuvi orqali).
+"""
+
+import os
+import socket
+import logging
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta, timezone
+
+logger = logging.getLogger(__name__)
+
+CLEANUP_LOCK = 'weekly_cleanup'
+
+# Tozalash muvaffaqiyatli o'tgan deb hisoblanadigan CleanupLog holatlari
+COMPLETED_STATUSES = ('success', 'skipped')
+
+# Tarix bo'lmaganda tozalash qabul qilinadigan oyna (eski cron tekshiruvi kabi 10 daqiqa)
+FIRST_RUN_WINDOW = timedelta(minutes=10)
+
+
+# ============================================
+# CRON IFODASI
+# ============================================
+class CronSchedule:
+    """'daqiqa soat kun oy hafta_kuni' ifodasi - maydonlar bir marta
+    tartiblangan ro'yxatlarga aylantiriladi, keyingi vaqt kunma-kun sakrab topiladi."""
+
+    FIELDS = (
+        ('minute', 0, 59),
+        ('hour', 0, 23),
+        ('day', 1, 31),
+        ('month', 1, 12),
+        ('weekday', 0, 7),
+    )
+
+    def __init__(self, expression, tz_name='Europe/Moscow'):
+        parts = expression.split()
+        if len(parts) != 5:
+            raise ValueError(f"CRON ifodasi 5 ta maydondan iborat bo'lishi kerak: {expression!r}")
+
+        self.expression = expression
+        values = {}
+        for (name, low, high), part in zip(self.FIELDS, parts):
+            values[name] = tuple(sorted(self._parse_field(part, low, high)))
+
+        self.minutes = values['minute']
+        self.hours = values['hour']
+        self.days = frozenset(values['day'])
+        self.months = frozenset(values['month'])
+        # CRON: 0 va 7 = yakshanba; Python weekday(): 0 = dushanba
+        self.weekdays = frozenset((value - 1) % 7 for value in values['weekday'])
+        # Ikkalasi ham cheklangan bo'lsa, CRON ulardan istalganini qabul qiladi
+        self.day_any = parts[2] != '*' and parts[4] != '*'
+        self.day_restricted = parts[2] != '*'
+        self.weekday_restricted = parts[4] != '*'
+        self.tz = _get_timezone(tz_name)
+
+    @staticmethod
+    def _parse_field(part, low, high):
+        result = set()
+        for item in part.split(','):
+            step = 1
+            if '/' in item:
+                item, step_text = item.split('/', 1)
+                step = int(step_text)
+                if step <= 0:
+                    raise ValueError(f"Noto'g'ri qadam: {part!r}")
+
+            if item == '*':
+                start, end = low, high
+            elif '-' in item:
+                start_text, end_text = item.split('-', 1)
+                start, end = int(start_text), int(end_text)
+            else:
+                start = int(item)
+                end = high if step > 1 else start
+
+            if start < low or end > high or start > end:
+                raise ValueError(f"Qiymat chegaradan tashqarida: {part!r}")
+            result.update(range(start, end + 1, step))
+        return result
+
+    def _day_matches(self, moment):
+        day_ok = moment.day in self.days
+        weekday_ok = moment.weekday() in self.weekdays
+        if self.day_any:
+            return day_ok or weekday_ok
+        return (day_ok or not self.day_restricted) and (weekday_ok or not self.weekday_restricted)
+
+    def _next_local(self, moment):
+        moment = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        # 5 yil ichida mos kun topilmasa, ifoda hech qachon ishlamaydi (masalan 30-fevral)
+        for _ in range(366 * 5 * 24):
+            if moment.month not in self.months or not self._day_matches(moment):
+                moment = (moment + timedelta(days=1)).replace(hour=0, minute=0)
+                continue
+
+            index = bisect_left(self.hours, moment.hour)
+            if index == len(self.hours):
+                moment = (moment + timedelta(days=1)).replace(hour=0, minute=0)
+                continue
+            if self.hours[index] != moment.hour:
+                moment = moment.replace(hour=self.hours[index], minute=0)
+
+            index = bisect_left(self.minutes, moment.minute)
+            if index == len(self.minutes):
+                moment = moment.replace(minute=0) + timedelta(hours=1)
+                continue
+            return moment.replace(minute=self.minutes[index])
+        raise ValueError(f"CRON ifodasi uchun vaqt topilmadi: {self.expression!r}")
+
+    def _previous_local(self, moment):
+        moment = moment.replace(second=0, microsecond=0)
+        for _ in range(366 * 5 * 24):
+            if moment.month not in self.months or not self._day_matches(moment):
+                moment = moment.replace(hour=0, minute=0) - timedelta(minutes=1)
+                continue
+
+            index = bisect_right(self.hours, moment.hour)
+            if index == 0:
+                moment = moment.replace(hour=0, minute=0) - timedelta(minutes=1)
+                continue
+            if self.hours[index - 1] != moment.hour:
+                moment = moment.replace(hour=self.hours[index - 1], minute=59)
+
+            index = bisect_right(self.minutes, moment.minute)
+            if index == 0:
+                moment = moment.replace(minute=0) - timedelta(minutes=1)
+                continue
+            return moment.replace(minute=self.minutes[index - 1])
+        raise ValueError(f"CRON ifodasi uchun vaqt topilmadi: {self.expression!r}")
+
+    def next_fire(self, after=None):
+        """after (UTC, naive) dan keyingi ishga tushish vaqti - UTC, naive"""
+        return self._to_utc(self._next_local(self._to_local(after or datetime.utcnow())))
+
+    def previous_fire(self, before=None):
+        """before (UTC, naive) gacha bo'lgan oxirgi ishga tushish vaqti - UTC, naive"""
+        return self._to_utc(self._previous_local(self._to_local(before or datetime.utcnow())))
+
+    def _to_local(self, moment):
+        return moment.replace(tzinfo=timezone.utc).astimezone(self.tz).replace(tzinfo=None)
+
+    def _to_utc(self, moment):
+        if hasattr(self.tz, 'localize'):
+            aware = self.tz.localize(moment)
+        else:
+            aware = moment.replace(tzinfo=self.tz)
+        return aware.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _get_timezone(name):
+    try:
+        import pytz
+        return pytz.timezone(name)
+    except ImportError:
+        # pytz bo'lmasa: Moskva = UTC+3 (2014 yildan beri yozgi vaqt yo'q)
+        return timezone(timedelta(hours=3))
+
+
+# ============================================
+# TAQSIMLANGAN QULF (scheduler_locks jadvali)
+# ============================================
+def lock_owner():
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+def acquire_lock(name, owner, ttl_seconds=7200):
+    """Qulfni olish: yozuv yo'q, muddati o'tgan yoki o'zimizniki bo'lsa"""
+    from sqlalchemy.exc import IntegrityError
+    from models import db, SchedulerLock
+
+    now = datetime.utcnow()
+    locked_until = now + timedelta(seconds=ttl_seconds)
+
+    result = db.session.execute(
+        db.update(SchedulerLock)
+        .where(
+            SchedulerLock.name == name,
+            db.or_(SchedulerLock.locked_until < now, SchedulerLock.owner == owner)
+        )
+        .values(owner=owner, locked_until=locked_until)
+    )
+    if result.rowcount == 1:
+        db.session.commit()
+        return True
+    db.session.rollback()
+
+    try:
+        db.session.add(SchedulerLock(name=name, owner=owner, locked_until=locked_until))
+        db.session.commit()
+        return True
+    except IntegrityError:
+        # Boshqa jarayon ushlab turibdi
+        db.session.rollback()
+        return False
+
+
+def release_lock(name, owner):
+    from models import db, SchedulerLock
+
+    db.session.rollback()
+    db.session.execute(
+        db.update(SchedulerLock)
+        .where(SchedulerLock.name == name, SchedulerLock.owner == owner)
+        .values(locked_until=datetime.utcnow())
+    )
+    db.session.commit()
+
+
+# ============================================
+# JADVAL BO'YICHA TEKSHIRISH
+# ============================================
+def get_schedule(app=None, building=None):
+    """Umumiy jadval yoki binoning o'z jadvali (CLEANUP_PARTITION_SCHEDULES)"""
+    from flask import current_app
+
+    config = (app or current_app).config
+    tz_name = config.get('CLEANUP_TIMEZONE', 'Europe/Moscow')
+    if building is not None:
+        expression = parse_partition_schedules(config.get('CLEANUP_PARTITION_SCHEDULES')).get(building)
+        if expression:
+            return CronSchedule(expression, tz_name)
+    return CronSchedule(config.get('CLEANUP_SCHEDULE', '0 0 * * 1'), tz_name)
+
+
+def parse_partition_schedules(spec):
+    """'A=0 0 * * 1; B=30 2 * * 1' -> {'A': '0 0 * * 1', 'B': '30 2 * * 1'}"""
+    schedules = {}
+    for item in (spec or '').split(';'):
+        building, _, expression = item.partition('=')
+        if building.strip() and expression.strip():
+            schedules[building.strip()] = expression.strip()
+    return schedules
+
+
+def all_schedules(app=None):
+    """Umumiy va binolarning jadvallari (rejalashtiruvchi eng yaqin vaqtgacha kutadi)"""
+    from flask import current_app
+
+    config = (app or current_app).config
+    schedules = [get_schedule(app)]
+    for building in parse_partition_schedules(config.get('CLEANUP_PARTITION_SCHEDULES')):
+        schedules.append(get_schedule(app, building))
+    return schedules
+
+
+def last_completed_cleanup(building=None):
+    """Oxirgi yakunlangan tozalash vaqti. building berilsa - shu bino yoki
+    butun jadval (building NULL, bo'linmagan eski tozalashlar) bo'yicha"""
+    from models import db, CleanupLog
+
+    query = db.session.query(db.func.max(CleanupLog.cleanup_time)).filter(
+        CleanupLog.status.in_(COMPLETED_STATUSES)
+    )
+    if building is not None:
+        query = query.filter(db.or_(CleanupLog.building == building, CleanupLog.building.is_(None)))
+    return query.scalar()
+
+
+def is_cleanup_due(now=None, building=None):
+    """Oxirgi rejalashtirilgan vaqtdan keyin tozalash bajarilmagan bo'lsa - True
+    (kechikib ishga tushgan yoki o'tkazib yuborilgan hafta ham qoplanadi)"""
+    now = now or datetime.utcnow()
+    scheduled = get_schedule(building=building).previous_fire(now)
+    last_run = last_completed_cleanup(building)
+    if last_run is None:
+        # Tarix bo'sh (yangi baza): faqat rejalashtirilgan vaqtdan keyingi
+        # FIRST_RUN_WINDOW ichida - yangi o'rnatilgan tizim darhol tozalanmasin
+        return now - scheduled <= FIRST_RUN_WINDOW
+    return last_run < scheduled
+
+
+class CleanupScheduler:
+    """Fon oqimi: keyingi ishga tushish vaqtigacha (yoki poll oralig'igacha)
+    kutadi, vaqti kelgan bo'lsa cleanup.main() ni chaqiradi."""
+
+    def __init__(self, app):
+        self.app = app
+        self.poll_seconds = app.config.get('SCHEDULER_POLL_SECONDS', 300)
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    def ensure_started(self):
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        self._pid = os.getpid()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='cleanup-scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        from cleanup import main
+        from partitions import due_partitions
+
+        schedules = all_schedules(self.app)
+        logger.info(f"⏰ Scheduler ishga tushdi: {', '.join(schedule.expression for schedule in schedules)} ({self.app.config.get('CLEANUP_TIMEZONE')})")
+
+        while not self._stop.is_set():
+            try:
+                with self.app.app_context():
+                    due = due_partitions()
+                if due:
+                    # main() qulfni olib, vaqti kelgan binolarni qayta aniqlaydi
+                    main(app=self.app)
+            except Exception:
+                logger.exception("Scheduler xatoligi")
+
+            next_fire = min(schedule.next_fire() for schedule in schedules)
+            wait = (next_fire - datetime.utcnow()).total_seconds()
+            self._stop.wait(max(1.0, min(wait, self.poll_seconds)))
+
+
+def init_app(app):
+    """SCHEDULER_ENABLED bo'lsa har bir worker'da rejalashtiruvchini ishga tushirish"""
+    if not app.config.get('SCHEDULER_ENABLED') or not app.config.get('CLEANUP_ENABLED', True):
+        return None
+
+    cleanup_scheduler = CleanupScheduler(app)
+    app.extensions['cleanup_scheduler'] = cleanup_scheduler
+
+    # gunicorn --preload: fork'dan keyin oqim birinchi so'rovda qayta ishga tushadi
+    app.before_request(cleanup_scheduler.ensure_started)
+    cleanup_scheduler.ensure_started()
+    return cleanup_scheduler
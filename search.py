@@ -0,0 +1,183 @@
+"""
+Foydalanuvchilarni qidirish (typeahead)
+room_number va full_name bo'yicha prefiks qidiruv:
+
+- SQLite: users_fts (FTS5, external content) - triggerlar orqali users bilan
+  sinxron, jumladan ingest upsert va cleanup DELETE'lari
+- PostgreSQL: pg_trgm GIN indeksi (lower(full_name)) va room_number uchun
+  upper(room_number) varchar_pattern_ops indeksi - oddiy indekslar, alohida sinxron kerak emas
+- boshqalar (yoki FTS5/pg_trgm yo'q bo'lsa): LIKE prefiks
+
+room_number prefiksi katta-kichik harfga qaramaydi: upper(room_number)
+ifoda indeksi bo'yicha (SQLite: >= / < oraliq, PostgreSQL: LIKE 'X%').
+"""
+
+import re
+import logging
+
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+# Indeks tuzilishi o'zgarsa oshiriladi - models.schema_version() ga kiradi
+SEARCH_SCHEMA_VERSION = '2'
+
+# Prefiks oralig'ining yuqori chegarasi uchun
+PREFIX_SENTINEL = '\U0010ffff'
+
+SQLITE_FTS_SETUP = (
+    "CREATE VIRTUAL TABLE users_fts USING fts5("
+    " full_name, room_number, content='users', content_rowid='id', prefix='1 2 3')",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_insert AFTER INSERT ON users BEGIN"
+    " INSERT INTO users_fts(rowid, full_name, room_number) VALUES (new.id, new.full_name, new.room_number);"
+    " END",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_delete AFTER DELETE ON users BEGIN"
+    " INSERT INTO users_fts(users_fts, rowid, full_name, room_number) VALUES ('delete', old.id, old.full_name, old.room_number);"
+    " END",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_update AFTER UPDATE OF full_name, room_number ON users BEGIN"
+    " INSERT INTO users_fts(users_fts, rowid, full_name, room_number) VALUES ('delete', old.id, old.full_name, old.room_number);"
+    " INSERT INTO users_fts(rowid, full_name, room_number) VALUES (new.id, new.full_name, new.room_number);"
+    " END",
+    # Mavjud qatorlarni indeksga yuklash
+    "INSERT INTO users_fts(users_fts) VALUES ('rebuild')",
+)
+
+SQLITE_ROOM_SETUP = (
+    "CREATE INDEX IF NOT EXISTS ix_users_room_number_upper ON users (upper(room_number))",
+)
+
+POSTGRES_SETUP = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_users_full_name_trgm ON users USING gin (lower(full_name) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_users_room_number_upper ON users (upper(room_number) varchar_pattern_ops)",
+    # Oldingi versiyadagi katta-kichik harfga sezgir indeks
+    "DROP INDEX IF EXISTS ix_users_room_number_prefix",
+)
+
+
+def setup_search_index(engine):
+    """Qidiruv indeksini yaratish (bir marta). Natija: 'fts5', 'trigram' yoki 'like'"""
+    dialect = engine.dialect.name
+
+    if dialect == 'sqlite':
+        with engine.begin() as conn:
+            for statement in SQLITE_ROOM_SETUP:
+                conn.exec_driver_sql(statement)
+            exists = conn.exec_driver_sql(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'users_fts'"
+            ).scalar()
+        if exists:
+            return 'fts5'
+        try:
+            with engine.begin() as conn:
+                for statement in SQLITE_FTS_SETUP:
+                    conn.exec_driver_sql(statement)
+            return 'fts5'
+        except Exception as e:
+            logger.warning(f"⚠️  FTS5 mavjud emas, LIKE qidiruvi ishlatiladi: {e}")
+            return 'like'
+
+    if dialect == 'postgresql':
+        try:
+            with engine.begin() as conn:
+                for statement in POSTGRES_SETUP:
+                    conn.exec_driver_sql(statement)
+            return 'trigram'
+        except Exception as e:
+            logger.warning(f"⚠️  pg_trgm yoqilmadi, LIKE qidiruvi ishlatiladi: {e}")
+            return 'like'
+
+    return 'like'
+
+
+def _escape_like(text):
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _fts_query(text):
+    """'ali val' -> '"ali"* "val"*' - har bir so'z prefiks sifatida"""
+    tokens = re.findall(r'\w+', text, flags=re.UNICODE)
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def _name_ids(db, text, limit, backend):
+    """Ism bo'yicha mos id'lar - full_name tartibida birinchi limit tasi"""
+    from models import User
+
+    if backend == 'fts5':
+        match = _fts_query(text)
+        if not match:
+            return []
+        rows = db.session.execute(
+            db.text(
+                "SELECT users.id FROM users_fts JOIN users ON users.id = users_fts.rowid"
+                " WHERE users_fts MATCH :match ORDER BY users.full_name, users.id LIMIT :limit"
+            ),
+            {'match': match, 'limit': limit}
+        )
+        return [row[0] for row in rows]
+
+    pattern = _escape_like(text.lower())
+    name = db.func.lower(User.full_name)
+    condition = name.like(pattern + '%', escape='\\')
+    if backend == 'trigram':
+        # So'z boshidan ham: "Valiyev" -> "ali valiyev"
+        condition = db.or_(condition, name.like('% ' + pattern + '%', escape='\\'))
+    rows = db.session.query(User.id).filter(condition).order_by(User.full_name, User.id).limit(limit)
+    return [row.id for row in rows]
+
+
+def search_users(text, limit=20):
+    """Avval room_number prefiksi, keyin ism bo'yicha mosliklar (takrorlarsiz)"""
+    from models import db, User, USER_COLUMNS
+
+    text = text.strip()
+    if not text:
+        return []
+    backend = get_backend()
+
+    # Ikkala tomon ham katta harfda: 'a10' -> 'A101' (indeks upper(room_number) bo'yicha)
+    room = db.func.upper(User.room_number)
+    room_text = text.upper()
+    if backend == 'trigram':
+        # varchar_pattern_ops indeksi LIKE 'X%' uchun
+        room_prefix = room.like(_escape_like(room_text) + '%', escape='\\')
+    else:
+        room_prefix = db.and_(room >= room_text, room < room_text + PREFIX_SENTINEL)
+    by_room = db.session.query(*USER_COLUMNS).filter(room_prefix).order_by(room).limit(limit).all()
+
+    results = list(by_room)
+    if len(results) < limit:
+        seen = {row.id for row in results}
+        # Xona bo'yicha topilganlar ham mos kelishi mumkin - ular chiqarilgandan keyin ham yetarli bo'lsin
+        ids = [user_id for user_id in _name_ids(db, text, limit + len(seen), backend) if user_id not in seen]
+        if ids:
+            by_name = db.session.query(*USER_COLUMNS).filter(User.id.in_(ids)).order_by(User.full_name).all()
+            results.extend(by_name[:limit - len(results)])
+    return results
+
+
+def detect_backend(engine):
+    """Mavjud indekslarga qarab: 'fts5', 'trigram' yoki 'like'"""
+    dialect = engine.dialect.name
+    with engine.connect() as conn:
+        if dialect == 'sqlite':
+            found = conn.exec_driver_sql(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'users_fts'"
+            ).scalar()
+            return 'fts5' if found else 'like'
+        if dialect == 'postgresql':
+            found = conn.exec_driver_sql(
+                "SELECT 1 FROM pg_indexes WHERE indexname = 'ix_users_full_name_trgm'"
+            ).scalar()
+            return 'trigram' if found else 'like'
+    return 'like'
+
+
+def get_backend():
+    """Birinchi qidiruvda aniqlanadi va ilova uchun saqlanadi"""
+    backend = current_app.extensions.get('search_backend')
+    if backend is None:
+        from models import db
+        backend = current_app.extensions['search_backend'] = detect_backend(db.engine)
+    return backend
@@ -0,0 +1,126 @@
+"""
+SQLite production rejimi
+Fayl bazasi uchun har bir yangi ulanishda:
+- journal_mode=WAL - o'quvchilar yozuvchini (masalan dushanba tozalashini) kutmaydi
+- synchronous=NORMAL, busy_timeout, mmap_size, cache_size
+
+Yozuvlar jarayon ichida bitta navbatdan o'tadi (single writer): birinchi
+INSERT/UPDATE/DELETE dan oldin navbat olinadi, ulanish pool'ga qaytganda
+(commit/rollback dan keyin) bo'shatiladi. Shu sababli oqimlar bir-birini
+"database is locked" bilan to'xtatmaydi; boshqa jarayonlar bilan raqobatni
+busy_timeout hal qiladi.
+"""
+
+import re
+import time
+import logging
+import threading
+
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+
+logger = logging.getLogger(__name__)
+
+WRITE_STATEMENT = re.compile(r'^\s*(INSERT|UPDATE|DELETE|REPLACE|CREATE|DROP|ALTER)\b', re.IGNORECASE)
+
+
+class WriterQueue:
+    """Jarayon ichidagi yagona yozuvchi navbati (kutish statistikasi bilan)"""
+
+    def __init__(self, timeout=5.0):
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.acquired = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def acquire(self):
+        started = time.perf_counter()
+        ok = self._lock.acquire(timeout=self.timeout)
+        waited = time.perf_counter() - started
+        with self._stats_lock:
+            if ok:
+                self.acquired += 1
+                self.wait_total += waited
+                self.wait_max = max(self.wait_max, waited)
+            else:
+                self.timeouts += 1
+        return ok
+
+    def release(self):
+        self._lock.release()
+
+    def collect(self):
+        with self._stats_lock:
+            return {
+                'writes': self.acquired,
+                'timeouts': self.timeouts,
+                'wait_avg_ms': round(self.wait_total / self.acquired * 1000, 3) if self.acquired else 0.0,
+                'wait_max_ms': round(self.wait_max * 1000, 3),
+            }
+
+
+def is_file_database(engine):
+    return engine.dialect.name == 'sqlite' and engine.url.database not in (None, '', ':memory:')
+
+
+def configure_engine(engine, config):
+    """SQLite fayl bazasi bo'lsa pragma'lar va yozuvchi navbatini ulash (bir marta)"""
+    if not is_file_database(engine) or not config.get('SQLITE_TUNED', True):
+        return None
+    if getattr(engine, '_sqlite_writer', None) is not None:
+        return engine._sqlite_writer
+
+    busy_timeout_ms = config.get('SQLITE_BUSY_TIMEOUT_MS', 5000)
+    pragmas = (
+        ('journal_mode', 'WAL'),
+        ('synchronous', config.get('SQLITE_SYNCHRONOUS', 'NORMAL')),
+        ('busy_timeout', busy_timeout_ms),
+        ('mmap_size', config.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+        # Manfiy qiymat - KiB
+        ('cache_size', -int(config.get('SQLITE_CACHE_SIZE_KB', 64 * 1024))),
+        ('temp_store', 'MEMORY'),
+    )
+
+    @event.listens_for(engine, 'connect')
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas:
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+    writer = WriterQueue(timeout=busy_timeout_ms / 1000)
+    engine._sqlite_writer = writer
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _acquire_writer(conn, cursor, statement, parameters, context, executemany):
+        if conn.info.get('sqlite_writer') or not WRITE_STATEMENT.match(statement):
+            return
+        if not writer.acquire():
+            raise OperationalError(statement, parameters, TimeoutError("SQLite yozuvchi navbati band (busy_timeout)"))
+        conn.info['sqlite_writer'] = True
+
+    @event.listens_for(engine.pool, 'checkin')
+    def _release_writer(dbapi_connection, connection_record):
+        if connection_record is not None and connection_record.info.pop('sqlite_writer', False):
+            writer.release()
+
+    logger.info(f"🗄️  SQLite: WAL, synchronous={pragmas[1][1]}, busy_timeout={busy_timeout_ms} ms")
+    return writer
+
+
+def writer_stats(engine):
+    writer = getattr(engine, '_sqlite_writer', None)
+    return writer.collect() if writer is not None else None
+
+
+def checkpoint(engine, mode='PASSIVE'):
+    """Katta o'chirishlardan keyin WAL faylini asosiy bazaga ko'chirish"""
+    if not is_file_database(engine):
+        return None
+    with engine.connect() as conn:
+        return tuple(conn.exec_driver_sql(f"PRAGMA wal_checkpoint({mode})").one())
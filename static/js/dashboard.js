@@ -0,0 +1,260 @@
+// Dashboard: statistika, qidiruv va qo'lda tozalash (templates/dashboard.html)
+
+// Element sahifada bo'lsa matnini o'zgartirish (hamma sahifada ham barcha hisoblagichlar yo'q)
+function setText(id, value) {
+    const element = document.getElementById(id);
+    if (element) {
+        element.textContent = value;
+    }
+}
+
+// Vaqtni yangilash
+function updateTime() {
+    const now = new Date();
+    setText('current-time', now.toISOString().slice(0, 19).replace('T', ' '));
+}
+setInterval(updateTime, 1000);
+
+// Statistikani sahifaga qo'yish
+function applyStats(data) {
+    setText('total-users', data.total_users);
+    setText('stats-total', data.total_users);
+    setText('stats-active', data.active_users || 0);
+    setText('stats-inactive', data.inactive_users || 0);
+
+    // Tozalashlar soni
+    if (data.cleanup_count !== undefined) {
+        setText('stats-cleanups', data.cleanup_count || 0);
+    }
+
+    const lastCleanup = document.getElementById('last-cleanup');
+    if (lastCleanup && data.last_cleanup && data.last_cleanup !== 'Hech qachon') {
+        lastCleanup.innerHTML = 
+            `<h6>${data.last_cleanup}</h6>
+             <p class="mb-0"><small>${data.records_deleted_last} ta yozuv tozalandi</small></p>`;
+    }
+}
+
+// Statistika yuklash (EventSource bo'lmagan brauzerlar uchun)
+async function loadStats() {
+    try {
+        const response = await fetch('/api/stats');
+        if (!response.ok) throw new Error('Server xatosi');
+
+        const data = await response.json();
+
+        // Tozalashlar soni
+        const logsResponse = await fetch('/api/cleanup/count');
+        if (logsResponse.ok) {
+            const logsData = await logsResponse.json();
+            data.cleanup_count = logsData.count;
+        }
+
+        applyStats(data);
+    } catch (error) {
+        console.error('Statistika yuklashda xatolik:', error);
+    }
+}
+
+// Server-Sent Events: statistika o'zgarganda server o'zi yuboradi
+function subscribeStats() {
+    const source = new EventSource('/api/events');
+    source.addEventListener('stats', function(event) {
+        applyStats(JSON.parse(event.data));
+    });
+    source.onerror = function() {
+        // Brauzer o'zi qayta ulanadi (retry); sessiya tugagan bo'lsa to'xtatamiz
+        if (source.readyState === EventSource.CLOSED) {
+            console.error('Statistika oqimi yopildi');
+        }
+    };
+    return source;
+}
+
+// Foydalanuvchi qidirish (typeahead)
+function escapeHtml(value) {
+    const div = document.createElement('div');
+    div.textContent = value == null ? '' : value;
+    return div.innerHTML;
+}
+
+const userSearch = document.getElementById('user-search');
+const usersTbody = document.getElementById('users-tbody');
+const usersCount = document.getElementById('users-count');
+if (userSearch && usersTbody) {
+    const initialRows = usersTbody.innerHTML;
+    const initialCount = usersCount.textContent;
+    let searchTimer = null;
+    let searchSeq = 0;
+
+    userSearch.addEventListener('input', function() {
+        clearTimeout(searchTimer);
+        const query = this.value.trim();
+        if (!query) {
+            usersTbody.innerHTML = initialRows;
+            usersCount.textContent = initialCount;
+            return;
+        }
+        searchTimer = setTimeout(async () => {
+            const seq = ++searchSeq;
+            try {
+                const response = await fetch('/api/users/search?limit=50&q=' + encodeURIComponent(query));
+                if (!response.ok) throw new Error('Server xatosi');
+                const data = await response.json();
+                if (seq !== searchSeq) return;
+
+                usersTbody.innerHTML = data.users.map(user => {
+                    const [date, time] = (user.created_at || ' ').split(' ');
+                    return `<tr>
+                        <td><span class="badge bg-secondary">${user.id}</span></td>
+                        <td class="fw-bold">${escapeHtml(user.full_name)}</td>
+                        <td><span class="room-badge">${escapeHtml(user.room_number)}</span></td>
+                        <td><small class="text-muted">${date}<br>${(time || '').slice(0, 5)}</small></td>
+                    </tr>`;
+                }).join('');
+                usersCount.textContent = data.users.length + ' ta';
+            } catch (error) {
+                console.error('Qidiruvda xatolik:', error);
+            }
+        }, 200);
+    });
+}
+
+// Qo'lda tozalash
+document.getElementById('manual-cleanup').addEventListener('click', async function() {
+    const result = await Swal.fire({
+        title: 'Tozalashni boshlaymizmi?',
+        html: `<div class="text-start">
+                  <p><strong>Diqqat!</strong> Bu amal:</p>
+                  <ul>
+                    <li>Barcha foydalanuvchilarni o'chirib tashlaydi</li>
+                    <li>Ortga qaytarib bo'lmaydi</li>
+                    <li>Tozalash tarixiga yoziladi</li>
+                  </ul>
+                  <p class="text-danger"><i class="fas fa-exclamation-triangle me-1"></i> Admin: <strong>${document.querySelector('.navbar-brand + .navbar-collapse .nav-link').textContent.trim()}</strong></p>
+               </div>`,
+        icon: 'warning',
+        showCancelButton: true,
+        confirmButtonColor: '#f72585',
+        cancelButtonColor: '#6c757d',
+        confirmButtonText: 'Ha, tozalash',
+        cancelButtonText: 'Bekor qilish',
+        reverseButtons: true
+    });
+
+    if (!result.isConfirmed) return;
+
+    // Tugmani bloklash
+    this.disabled = true;
+    this.innerHTML = '<i class="fas fa-spinner fa-spin me-2"></i> Tozalanmoqda...';
+
+    try {
+        const response = await fetch('/api/cleanup/manual', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            }
+        });
+
+        const result = await response.json();
+
+        // 409 - tozalash allaqachon ishlayapti: o'sha vazifani kuzatamiz
+        if (!result.job_id) {
+            throw new Error(result.message);
+        }
+
+        const job = await waitForCleanupJob(result.status_url, this);
+
+        if (job.status === 'done') {
+            await Swal.fire({
+                title: 'Muvaffaqiyatli!',
+                text: job.message || `${job.deleted} ta foydalanuvchi o'chirildi`,
+                icon: 'success',
+                confirmButtonColor: '#4361ee'
+            });
+
+            // Sahifani yangilash
+            location.reload();
+        } else {
+            throw new Error(job.message);
+        }
+
+    } catch (error) {
+        await Swal.fire({
+            title: 'Xatolik!',
+            text: error.message || 'Noma\'lum xatolik yuz berdi',
+            icon: 'error',
+            confirmButtonColor: '#dc3545'
+        });
+
+        // Tugmani qayta faollashtirish
+        this.disabled = false;
+        this.innerHTML = '<i class="fas fa-play-circle me-2"></i> HOZIR TOZALASH';
+    }
+});
+
+// Tozalash vazifasi tugaguncha holatini so'rash (o'chirilganlar, tezlik, ETA)
+async function waitForCleanupJob(statusUrl, button) {
+    while (true) {
+        const response = await fetch(statusUrl, { cache: 'no-store' });
+        const job = await response.json();
+        if (job.error) {
+            throw new Error(job.error);
+        }
+        if (job.status !== 'queued' && job.status !== 'running') {
+            return job;
+        }
+
+        let text = `${job.deleted} ta o'chirildi`;
+        if (job.progress !== null) {
+            text += ` (${Math.round(job.progress * 100)}%`;
+            if (job.eta_seconds !== null) {
+                text += `, ~${Math.ceil(job.eta_seconds)} s qoldi`;
+            }
+            text += ')';
+        }
+        button.innerHTML = `<i class="fas fa-spinner fa-spin me-2"></i> ${text}`;
+        await new Promise(resolve => setTimeout(resolve, 1000));
+    }
+}
+
+// Keyingi tozalash vaqtini hisoblash
+function calculateNextCleanup() {
+    const now = new Date();
+    const daysUntilMonday = (8 - now.getDay()) % 7 || 7;
+    const nextMonday = new Date(now);
+    nextMonday.setDate(now.getDate() + daysUntilMonday);
+    nextMonday.setHours(0, 0, 0, 0);
+
+    const options = { weekday: 'long', year: 'numeric', month: 'long', day: 'numeric' };
+    const nextCleanupEl = document.getElementById('next-cleanup');
+    if (nextCleanupEl) {
+        nextCleanupEl.textContent = nextMonday.toLocaleDateString('uz-UZ', options) + ' 00:00';
+    }
+}
+
+// Sahifa yuklanganda
+document.addEventListener('DOMContentLoaded', function() {
+    updateTime();
+    calculateNextCleanup();
+
+    if (window.EventSource) {
+        subscribeStats();
+    } else {
+        // Eski brauzerlar: har 30 soniyada statistika yangilash
+        loadStats();
+        setInterval(loadStats, 30000);
+    }
+
+    // Auto logout after 30 minutes
+    setTimeout(() => {
+        Swal.fire({
+            title: 'Sessiya muddati tugadi',
+            text: 'Xavfsizlik uchun siz avtomatik ravishda tizimdan chiqarildingiz.',
+            icon: 'info',
+            confirmButtonText: 'Yana kirish'
+        }).then(() => {
+            window.location.href = '/logout';
+        });
+    }, 30 * 60 * 1000); // 30 minutes
+});
@@ -0,0 +1,15 @@
+// Login sahifasi (templates/login.html)
+
+// Formani yuborishda loading holati
+document.querySelector('form').addEventListener('submit', function(e) {
+    const submitBtn = this.querySelector('.btn-login');
+    submitBtn.innerHTML = '<i class="fas fa-spinner fa-spin me-2"></i> Kirilmoqda...';
+    submitBtn.disabled = true;
+});
+
+// Parolni ko'rsatish/yashirish
+document.getElementById('password').addEventListener('keyup', function(e) {
+    if (e.key === 'Enter') {
+        document.querySelector('form').submit();
+    }
+});
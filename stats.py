@@ -0,0 +1,141 @@
+"""
+Statistika snapshot'i
+Dashboard va /api/* endpointlari uchun jami/faol foydalanuvchilar, oxirgi
+tozalash va tozalashlar sonini bitta so'rov bilan hisoblab, qisqa muddat keshlaydi.
+users yoki cleanup_logs jadvaliga yozilganda kesh bekor qilinadi.
+"""
+
+import time
+import threading
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import event, select, func
+from sqlalchemy.orm import Session, aliased
+
+# Kesh o'zgaradigan jadvallar
+TRACKED_TABLES = {'users', 'cleanup_logs'}
+
+_lock = threading.Lock()
+# generation - har bekor qilishda oshadi: hisoblash paytida bekor qilingan snapshot keshlanmaydi
+_cache = {'snapshot': None, 'expires_at': 0.0, 'generation': 0, 'invalidated_at': 0.0}
+_listeners = []
+
+
+def compute_snapshot():
+    """Barcha ko'rsatkichlarni bitta aggregate so'rov bilan hisoblash"""
+    from models import db, User, CleanupLog
+
+    week_ago = datetime.utcnow() - timedelta(days=7)
+
+    # Faollar soni ix_users_last_active_at indeksi bo'yicha alohida subquery'da sanaladi
+    users_agg = select(
+        func.count(User.id).label('total'),
+        select(func.count(User.id)).where(User.last_active_at >= week_ago).correlate(None).scalar_subquery().label('active')
+    ).subquery()
+    cleanup_count = select(func.count(CleanupLog.id)).scalar_subquery()
+    last_cleanup_id = select(CleanupLog.id).order_by(CleanupLog.cleanup_time.desc()).limit(1).scalar_subquery()
+    # Binolar bo'yicha tozalash: o'sha ishga tushirishdagi (run_id) barcha yozuvlar yig'indisi
+    run_logs = aliased(CleanupLog)
+    run_deleted = select(func.sum(run_logs.records_deleted)).where(run_logs.run_id == CleanupLog.run_id).scalar_subquery()
+
+    row = db.session.execute(
+        select(
+            users_agg.c.total,
+            users_agg.c.active,
+            cleanup_count.label('cleanups'),
+            CleanupLog.cleanup_time,
+            func.coalesce(run_deleted, CleanupLog.records_deleted).label('records_deleted'),
+            CleanupLog.status
+        ).select_from(users_agg).outerjoin(CleanupLog, CleanupLog.id == last_cleanup_id)
+    ).one()
+
+    last_cleanup = None
+    if row.cleanup_time is not None:
+        last_cleanup = {
+            'cleanup_time': row.cleanup_time,
+            'records_deleted': row.records_deleted,
+            'status': row.status
+        }
+
+    return {
+        'total_users': row.total,
+        'active_users': int(row.active),
+        'inactive_users': row.total - int(row.active),
+        'cleanup_count': row.cleanups,
+        'last_cleanup': last_cleanup,
+        'computed_at': datetime.utcnow()
+    }
+
+
+def get_stats_snapshot():
+    """Keshdagi snapshot (STATS_CACHE_TTL soniya), eskirgan bo'lsa qayta hisoblanadi"""
+    now = time.monotonic()
+    with _lock:
+        if _cache['snapshot'] is not None and now < _cache['expires_at']:
+            return _cache['snapshot']
+        generation = _cache['generation']
+
+    snapshot = compute_snapshot()
+    expires_at = now + current_app.config.get('STATS_CACHE_TTL', 10)
+    router = current_app.extensions.get('replica_router')
+
+    with _lock:
+        if router is not None:
+            # Replikadan o'qilgan bo'lishi mumkin: bekor qilishdan keyingi lag oynasida
+            # snapshot faqat shu oyna tugaguncha keshlanadi
+            expires_at = min(expires_at, max(now, _cache['invalidated_at'] + router.max_lag))
+        # Hisoblash paytida invalidate_stats() chaqirilgan bo'lsa - eski natija keshlanmaydi
+        if _cache['generation'] == generation:
+            _cache['snapshot'] = snapshot
+            _cache['expires_at'] = expires_at
+    return snapshot
+
+
+def invalidate_stats():
+    """Keshni bekor qilish - keyingi so'rov yangidan hisoblaydi"""
+    with _lock:
+        _cache['snapshot'] = None
+        _cache['expires_at'] = 0.0
+        _cache['generation'] += 1
+        _cache['invalidated_at'] = time.monotonic()
+    for listener in list(_listeners):
+        listener()
+
+
+def add_invalidation_listener(listener):
+    """Kesh bekor qilinganda chaqiriladigan funksiya (masalan SSE producer'ni uyg'otish)"""
+    _listeners.append(listener)
+
+
+# ============================================
+# KESHNI AVTOMATIK BEKOR QILISH
+# ============================================
+# Oddiy ORM add()/delete() - flush paytida aniqlanadi
+@event.listens_for(Session, 'after_flush')
+def _mark_dirty_on_flush(session, flush_context):
+    for obj in list(session.new) + list(session.deleted):
+        if getattr(obj, '__tablename__', None) in TRACKED_TABLES:
+            session.info['stats_dirty'] = True
+            return
+
+
+# Query.delete() / session.execute(insert(...)) kabi to'plamli amallar
+@event.listens_for(Session, 'do_orm_execute')
+def _mark_dirty_on_bulk(orm_execute_state):
+    if not (orm_execute_state.is_insert or orm_execute_state.is_delete or orm_execute_state.is_update):
+        return
+    table = getattr(orm_execute_state.statement, 'table', None)
+    if getattr(table, 'name', None) in TRACKED_TABLES:
+        orm_execute_state.session.info['stats_dirty'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_on_commit(session):
+    if session.info.pop('stats_dirty', False):
+        invalidate_stats()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _reset_on_rollback(session):
+    session.info.pop('stats_dirty', None)